@@ -0,0 +1,253 @@
+"""
+Асинхронное взаимодействие с Google Sheets (для бота на AsyncTeleBot)
+"""
+import asyncio
+from datetime import datetime
+from time import monotonic
+from cachetools import TTLCache
+from google.oauth2.service_account import Credentials
+from gspread.utils import absolute_range_name, rowcol_to_a1
+from async_sheets import AsyncSheetsClient, is_transient_error
+from days_cache import DaysCache
+from schedule_mirror import ScheduleMirror, parse_date, values_to_records
+from session_state import SessionState
+from retry_policy import CircuitBreaker, RetryPolicy
+from single_flight import AsyncSingleFlight
+from sheet_config import myscope, tz, CREDENTIALS_FILE, SPREADSHEET_KEY, IGNOR_WORKSHEETS, \
+    NAME_SHEET_WORKERS, NAME_COL_SERVICE, NAME_COL_MASTER, AVAILABILITY_DAYS, RETRY_ATTEMPTS, RETRY_BASE_SECONDS, \
+    RETRY_MAX_SECONDS, CIRCUIT_FAILURES, CIRCUIT_RESET_SECONDS
+
+creds = Credentials.from_service_account_file(CREDENTIALS_FILE, scopes=myscope)
+# Предохранитель и ограниченные повторы временных ошибок для всех запросов к api
+SHEETS_BREAKER = CircuitBreaker(CIRCUIT_FAILURES, CIRCUIT_RESET_SECONDS)
+SHEETS_RETRY = RetryPolicy(RETRY_ATTEMPTS, RETRY_BASE_SECONDS, RETRY_MAX_SECONDS, is_transient_error)
+client_main = AsyncSheetsClient(creds, SPREADSHEET_KEY, retry=SHEETS_RETRY, breaker=SHEETS_BREAKER)
+
+# Кэш листов с TTL (временем жизни) в 12 часов
+CACHE_WORKSHEETS = TTLCache(maxsize=2, ttl=12 * 60 * 60)
+# Кэш доступных дат по ключу (услуга, мастер) с TTL (временем жизни) в 15 минут
+CACHE_DAYS = DaysCache(maxsize=256, ttl=15 * 60)
+# Зеркало расписания всех листов-дат, из него отвечают все запросы на чтение
+SCHEDULE = ScheduleMirror(NAME_COL_SERVICE, NAME_COL_MASTER)
+# Периодичность фонового обновления зеркала в секундах
+SCHEDULE_REFRESH_SECONDS = 60
+# Периодичность предзагрузки списка листов и услуг в секундах (меньше TTL CACHE_WORKSHEETS)
+PREFETCH_SHEETS_SECONDS = 6 * 60 * 60
+# Блокировки записи по листам
+WRITE_LOCKS = {}
+# Счётчик изменений зеркала записью/отменой: снимок таблицы, загруженный во время записи, устарел
+WRITE_GENERATION = 0
+# Объединение одновременных загрузок: при всплеске запросов один запрос к api на ключ
+SHEET_FLIGHT = AsyncSingleFlight()
+
+
+def get_write_lock(title: str) -> asyncio.Lock:
+    """Блокировка записи в лист (записи в один лист выполняются строго по очереди)"""
+    if title not in WRITE_LOCKS:
+        WRITE_LOCKS[title] = asyncio.Lock()
+    return WRITE_LOCKS[title]
+
+
+async def get_sheet_names() -> list[str]:
+    """
+    Запрашивает все имена листов таблицы
+    """
+    if 'worksheets' in CACHE_WORKSHEETS:
+        return CACHE_WORKSHEETS['worksheets']
+    return await SHEET_FLIGHT.do('worksheets', _fetch_sheet_names)
+
+
+async def _fetch_sheet_names() -> list[str]:
+    """Загружает список листов в CACHE_WORKSHEETS (один вызов на все одновременно ожидающие корутины)"""
+    worksheets = await client_main.worksheet_titles()
+    CACHE_WORKSHEETS['worksheets'] = worksheets
+    return worksheets
+
+
+async def get_cache_services() -> dict:
+    """
+    Запрашивает все услуги
+    """
+    if 'services' in CACHE_WORKSHEETS:
+        return CACHE_WORKSHEETS['services']
+    return await SHEET_FLIGHT.do('services', _fetch_services)
+
+
+async def _fetch_services() -> dict:
+    """Загружает услуги в CACHE_WORKSHEETS (один вызов на все одновременно ожидающие корутины)"""
+    dct = await load_services()
+    CACHE_WORKSHEETS['services'] = dct
+    return dct
+
+
+async def load_services() -> dict:
+    """
+    Читает услуги и мастеров с листа работников
+
+    :return: Словарь {услуга: [мастера]}
+    """
+    dct = {}
+    values = await client_main.values_get(absolute_range_name(NAME_SHEET_WORKERS))
+    for i in values_to_records(values):
+        dct.setdefault(i[NAME_COL_SERVICE].strip(), []).append(i[NAME_COL_MASTER].strip())
+    return dct
+
+
+async def refresh_schedule() -> None:
+    """
+    Загружает все актуальные листы-даты в зеркало расписания одним запросом
+    """
+    date_today = datetime.now(tz=tz).date()
+    titles = []
+    for title in await get_sheet_names():
+        date_sheet = parse_date(title)
+        if title not in IGNOR_WORKSHEETS and date_sheet is not None and date_sheet >= date_today:
+            titles.append(title)
+    generation = WRITE_GENERATION
+    values = await client_main.values_batch_get(titles)
+    if SCHEDULE.loaded and generation != WRITE_GENERATION:
+        # снимок прочитан до записи и затёр бы её в зеркале - перечитаем при следующем обновлении
+        print("[INFO] Schedule changed while loading, skipping stale snapshot")
+        return
+    SCHEDULE.load({title: values_to_records(val) for title, val in zip(titles, values)})
+
+
+async def get_schedule() -> ScheduleMirror:
+    """
+    Возвращает зеркало расписания, при первом обращении загружает его
+    """
+    if not SCHEDULE.loaded:
+        await SHEET_FLIGHT.do('schedule', refresh_schedule)
+    return SCHEDULE
+
+
+async def prefetch_sheets() -> None:
+    """Заново загружает список листов и услуги до истечения TTL CACHE_WORKSHEETS"""
+    worksheets = await client_main.worksheet_titles()
+    services = await load_services()
+    CACHE_WORKSHEETS['worksheets'] = worksheets
+    CACHE_WORKSHEETS['services'] = services
+
+
+async def prefetch_days() -> int:
+    """
+    Заполняет CACHE_DAYS доступными датами всех услуг и мастеров по зеркалу
+
+    :return: Количество пар (услуга, мастер)
+    """
+    return CACHE_DAYS.prefetch(await get_schedule(), await get_cache_services(), datetime.now(tz=tz),
+                               AVAILABILITY_DAYS)
+
+
+async def warm_up() -> None:
+    """Прогрев при запуске бота: зеркало расписания, список листов, услуги и доступные даты"""
+    try:
+        await refresh_schedule()
+        count = await prefetch_days()
+    except Exception as ex:
+        print(f"[ERROR] Не удалось прогреть кэши: {ex}")
+        return
+    print(f"[INFO] Warm-up: {len(SCHEDULE.days(datetime.now(tz=tz)))} days, {count} service/master pairs")
+
+
+async def refresh_schedule_loop(period_seconds=SCHEDULE_REFRESH_SECONDS) -> None:
+    """
+    Периодически обновляет зеркало расписания в фоне
+    и заранее загружает кэши, чтобы запросы пользователей не попадали в пустой кэш
+
+    :param period_seconds: периодичность обновления в секундах
+    """
+    prefetched_sheets = monotonic()
+    while True:
+        await asyncio.sleep(period_seconds)
+        try:
+            if monotonic() - prefetched_sheets >= PREFETCH_SHEETS_SECONDS:
+                await prefetch_sheets()
+                prefetched_sheets = monotonic()
+            await refresh_schedule()
+            # зеркало перечитывается целиком, доступные даты пересчитываются каждый раз
+            await prefetch_days()
+        except Exception as ex:
+            print(f"[ERROR] Не удалось обновить расписание: {ex}")
+
+
+class AsyncGoogleSheets(SessionState):
+    """Асинхронное взаимодействие с GoogleSheet, состояние диалога клиента"""
+
+    __slots__ = ()
+
+    async def get_all_days(self) -> tuple:
+        """Все доступные дни для записи на определенную услугу"""
+        check = CACHE_DAYS.get(self.name_service, self.name_master)
+        if check is not None:
+            return check
+
+        res = (await get_schedule()).available_days(self.name_service, self.name_master, datetime.now(tz=tz),
+                                                    AVAILABILITY_DAYS)
+        CACHE_DAYS.set(self.name_service, self.name_master, res)
+        return tuple(res)
+
+    async def get_day_counts(self) -> dict:
+        """Количество свободного времени по датам для выбранной услуги и мастера"""
+        heatmap = (await get_schedule()).heatmap(self.name_service, self.name_master, datetime.now(tz=tz),
+                                                 AVAILABILITY_DAYS)
+        return {parse_date(title): count for title, count in heatmap.items()}
+
+    async def get_free_time(self) -> list:
+        """Всё свободное время для определенной даты"""
+        return (await get_schedule()).free_time(self.date_record, self.name_service, self.name_master,
+                                                datetime.now(tz=tz))
+
+    async def get_record(self, client_record: str, count_days=AVAILABILITY_DAYS) -> list:
+        """
+        Находит все записи клиента на ближайшие <count_days> дней
+
+        :return: Список - формата: [Дата, Время, Название услуги, Имя мастера]
+        """
+        self.lst_records = (await get_schedule()).find_records(client_record, datetime.now(tz=tz), count_days)
+        return self.lst_records
+
+    async def set_time(self, client_record='', search_criteria='') -> bool:
+        """
+        Производит в таблицу запись/отмену клиента: координаты ячейки берутся из зеркала,
+        перед записью читается только эта ячейка (compare-and-swap)
+
+        :param client_record: Строка с данными клиента для записи (по умолчанию пустая строка)
+        :param search_criteria: Критерий поиска на листе - "пустая" или "заполненная" (по умолчанию пустая строка)
+
+        :return: True, если операция прошла успешно; False, если слот уже занят/не найден
+        """
+        global WRITE_GENERATION
+        async with get_write_lock(self.date_record):
+            day = (await get_schedule()).get_day(self.date_record)
+            if day is None:
+                print(f"[ERROR] Дата занята/не найдена: {self.date_record}")
+                return False
+            for row_num, col_num, master in day.slot_cells(self.name_service, self.name_master,
+                                                            self.time_record, search_criteria):
+                cell = absolute_range_name(self.date_record, rowcol_to_a1(row_num, col_num))
+                values = await client_main.values_get(cell)
+                actual = str(values[0][0]).strip() if values and values[0] else ''
+                if actual == client_record.strip():
+                    # запись уже дошла до таблицы, но ответ был потерян: вторую ячейку не занимаем
+                    print(f"[INFO] Cell {cell} already holds {client_record!r}.")
+                elif actual != search_criteria.strip():
+                    WRITE_GENERATION += 1
+                    SCHEDULE.set_slot(self.date_record, self.time_record, self.name_service, master,
+                                      actual, search_criteria)
+                    continue
+                else:
+                    await client_main.values_update(cell, [[client_record]])
+                if self.name_master is None:
+                    self.name_master = master
+                WRITE_GENERATION += 1
+                SCHEDULE.set_slot(self.date_record, self.time_record, self.name_service,
+                                  self.name_master, client_record, search_criteria)
+                CACHE_DAYS.update_from_schedule(SCHEDULE, self.name_service, self.date_record,
+                                                datetime.now(tz=tz), AVAILABILITY_DAYS)
+                self.apply_record(client_record, search_criteria)
+                return True
+
+        CACHE_DAYS.update_from_schedule(SCHEDULE, self.name_service, self.date_record,
+                                        datetime.now(tz=tz), AVAILABILITY_DAYS)
+        return False
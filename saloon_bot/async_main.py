@@ -0,0 +1,371 @@
+"""
+Взаимодействие с Telegram в асинхронном режиме (AsyncTeleBot + aiohttp)
+
+Запуск: python async_main.py
+"""
+import asyncio
+from datetime import datetime
+from telebot import types
+from telebot.async_telebot import AsyncTeleBot
+from telebot.types import CallbackQuery, ReplyKeyboardRemove, \
+    ReplyKeyboardMarkup, InlineKeyboardMarkup, InlineKeyboardButton
+from config import TOKEN
+import telebot_calendar
+from async_google_sheet import AsyncGoogleSheets, get_cache_services, warm_up, \
+    refresh_schedule_loop, client_main
+from keyboards import create_markup_menu, button_to_menu
+import clear_dict
+from callback_router import AsyncCallbackRouter
+from retry_policy import ServiceUnavailable
+from session_state import shared_dates
+from client_info import CLIENT_PHONE, get_client_id
+
+bot = AsyncTeleBot(TOKEN)
+# все callback запросы проходят через один маршрутизатор
+router = AsyncCallbackRouter()
+router.install(bot)
+# сессии из внешнего хранилища восстанавливаются в объекты AsyncGoogleSheets
+clear_dict.CLIENT_DICT.factory = AsyncGoogleSheets
+
+
+@router.on_error(ServiceUnavailable)
+async def sheets_unavailable(call, ex):
+    """Google Sheets недоступен: сообщаем клиенту вместо бесконечного ожидания"""
+    print(f"[ERROR] {call.data}: {ex}")
+    await bot.answer_callback_query(call.id, 'Сервис записи временно недоступен 😔\nПопробуйте через минуту.',
+                                    show_alert=True)
+
+
+async def create_client(chat_id) -> AsyncGoogleSheets:
+    """Создает объект AsyncGoogleSheets для пользователя"""
+    client = await clear_dict.ASYNC_CLIENT_DICT.get(chat_id)
+    if client:
+        return client
+    client = AsyncGoogleSheets(chat_id)
+    await clear_dict.ASYNC_CLIENT_DICT.set(chat_id, client)
+    return client
+
+
+@bot.message_handler(commands=['start'])
+async def check_phone_number(message):
+    """Запрашивает номер телефона у пользователя единожды"""
+    if CLIENT_PHONE.get(message.chat.id) is None:
+        markup = ReplyKeyboardMarkup(one_time_keyboard=True, resize_keyboard=True)
+        button_phone = types.KeyboardButton(text="Отправить телефон 📞",
+                                            request_contact=True)
+        markup.add(button_phone)
+        await bot.send_message(message.chat.id, 'Для записи на услуги требуется номер телефона.',
+                               reply_markup=markup)
+    else:
+        await menu(message)
+
+
+@bot.message_handler(content_types=['contact'])
+async def contact(message_contact):
+    """Получает объект <contact> -> вызывает функцию стартового меню"""
+    if message_contact.contact is not None:
+        CLIENT_PHONE.set(message_contact.chat.id, message_contact.contact.phone_number,
+                         message_contact.from_user.username)
+        await bot.send_message(message_contact.chat.id,
+                               text='Спасибо за доверие!',
+                               reply_markup=ReplyKeyboardRemove())
+        await menu(message_contact)
+
+
+@bot.message_handler(content_types=['text'])
+async def any_word_before_number(message_any):
+    """Обработчик любых текстовых сообщений"""
+    await bot.send_message(message_any.chat.id,
+                           text='Пользоваться ботом возможно только при наличии номера телефона!\n'
+                                'Взаимодействие с ботом происходит кнопками.')
+
+
+async def menu(message):
+    """Главное меню"""
+    await clear_dict.aclear_unused_info(message.chat.id)
+    await bot.send_message(message.chat.id, "Выберите пункт меню:",
+                           reply_markup=create_markup_menu())
+
+
+@router.exact('CANCEL_RECORD')
+async def cancel_record(call):
+    """
+    InlineKeyboardMarkup - Выбор записи для отмены
+    """
+    client = await create_client(call.message.chat.id)
+    client_id = get_client_id(call.message.chat.id, call.from_user.username)
+    records = await client.get_record(client_id)
+    await clear_dict.ASYNC_CLIENT_DICT.set(call.message.chat.id, client)
+    if len(records) != 0:
+        markup = InlineKeyboardMarkup(row_width=1)
+        markup.add(
+            *[InlineKeyboardButton(text=' - '.join(x[:3]),
+                                   callback_data=f'CANCEL {ind}'
+                                   ) for ind, x in enumerate(records)])
+        markup.add(*button_to_menu(return_callback=None,
+                                   menu_text='В главное меню'))
+        await bot.edit_message_text(chat_id=call.message.chat.id,
+                                    message_id=call.message.message_id,
+                                    text='Какую запись вы хотите отменить?🙈',
+                                    reply_markup=markup)
+    else:
+        await bot.edit_message_text(chat_id=call.message.chat.id,
+                                    message_id=call.message.message_id,
+                                    text='Отменять пока нечего 🤷')
+        await check_phone_number(call.message)
+
+
+@router.prefix('CANCEL')
+async def approve_cancel(call):
+    """
+    Подтверждение отмены записи
+    """
+    markup = InlineKeyboardMarkup(row_width=2)
+    markup.add(*[InlineKeyboardButton(text='Подтверждаю',
+                                      callback_data='APPROVE' + call.data),
+                 InlineKeyboardButton(text='В главное меню',
+                                      callback_data='MENU')])
+    await bot.edit_message_text(chat_id=call.message.chat.id,
+                                message_id=call.message.message_id,
+                                text='Точно отменить?',
+                                reply_markup=markup)
+
+
+@router.prefix('APPROVE')
+async def set_cancel(call):
+    """
+    Отмена записи
+    """
+    client = await clear_dict.ASYNC_CLIENT_DICT.get(call.from_user.id)
+    if client and client.lst_records:
+        client_info = client.lst_records[int(call.data.split()[1])]
+        client.date_record, client.time_record, client.name_service, client.name_master = client_info
+        client_id = get_client_id(call.message.chat.id, call.from_user.username)
+        cancelled = await client.set_time('', client_id)
+        await clear_dict.ASYNC_CLIENT_DICT.set(call.from_user.id, client)
+        if cancelled:
+            text = 'Запись отменена!'
+        else:
+            text = 'Не смог отменить запись.'
+        await bot.edit_message_text(chat_id=call.message.chat.id,
+                                    message_id=call.message.message_id,
+                                    text=text)
+        await check_phone_number(call.message)
+    else:
+        await go_to_menu(call)
+
+
+@router.exact('MY_RECORD')
+async def show_record(call):
+    """Показывает все записи клиента"""
+    client = await create_client(call.message.chat.id)
+    client_id = get_client_id(call.message.chat.id, call.from_user.username)
+    records = await client.get_record(client_id)
+    await clear_dict.ASYNC_CLIENT_DICT.set(call.message.chat.id, client)
+    if len(records) != 0:
+        rec = 'Ближайшие записи:\n\n'
+        for i in sorted(records, key=lambda x: (x[0], x[1], x[2])):
+            rec += '🪷' + ' - '.join(i) + '\n'
+    else:
+        rec = 'Актуальных записей не найдено 🔍'
+    await bot.edit_message_text(chat_id=call.message.chat.id,
+                                message_id=call.message.message_id,
+                                text=rec)
+    await check_phone_number(call.message)
+
+
+@router.exact('RECORD')
+async def choice_service(call):
+    """
+    Выбор услуги для записи
+    """
+    await create_client(call.message.chat.id)
+    all_serv = await get_cache_services()
+    markup = InlineKeyboardMarkup(row_width=3)
+    markup.add(*[InlineKeyboardButton(text=x,
+                                      callback_data='SERVICE' + x
+                                      ) for x in all_serv.keys()])
+    markup.add(*button_to_menu(None))
+    await bot.edit_message_text(chat_id=call.message.chat.id,
+                                message_id=call.message.message_id,
+                                text="Выбери услугу:",
+                                reply_markup=markup)
+
+
+@router.prefix('SERVICE')
+async def choice_master(call):
+    """
+    Выбор мастера
+    """
+    client = await clear_dict.ASYNC_CLIENT_DICT.get(call.from_user.id)
+    if client:
+        client.name_service = call.data[len('SERVICE'):]
+        await clear_dict.ASYNC_CLIENT_DICT.set(call.from_user.id, client)
+        dct = await get_cache_services()
+        markup = InlineKeyboardMarkup(row_width=2)
+        markup.add(*[InlineKeyboardButton(text=x,
+                                          callback_data='MASTER' + x
+                                          ) for x in dct[client.name_service]])
+        markup.add(InlineKeyboardButton(text='Любой мастер',
+                                        callback_data='MASTER' + 'ЛЮБОЙ'))
+        markup.add(*button_to_menu('RECORD'))
+        await bot.edit_message_text(chat_id=call.message.chat.id,
+                                    message_id=call.message.message_id,
+                                    text="Выбери Мастера:",
+                                    reply_markup=markup)
+    else:
+        await go_to_menu(call)
+
+
+@router.prefix('MASTER')
+async def choice_date(call):
+    """
+    Выбор даты
+    """
+    client = await clear_dict.ASYNC_CLIENT_DICT.get(call.from_user.id)
+    if client:
+        if call.data[len('MASTER'):] != 'ЛЮБОЙ':
+            client.name_master = call.data[len('MASTER'):]
+        else:
+            client.name_master = None
+        lst = await client.get_all_days()
+        lst = shared_dates(lst)
+        if len(lst) == 0:
+            service = client.name_service if client.name_service else 'ЛЮБОЙ'
+            markup = InlineKeyboardMarkup(row_width=2)
+            markup.add(*button_to_menu('SERVICE' + service))
+            await bot.edit_message_text(chat_id=call.message.chat.id,
+                                        message_id=call.message.message_id,
+                                        text="Для выбранного мастера нет доступных дат!\n"
+                                             "Попробуй другого мастера😉",
+                                        reply_markup=markup)
+        else:
+            client.lst_currant_date = lst
+            await clear_dict.ASYNC_CLIENT_DICT.set(call.from_user.id, client)
+            calendar_name = str(call.message.chat.id)
+            await clear_dict.ASYNC_CALENDAR_DICT.set(call.message.chat.id, calendar_name)
+            await bot.edit_message_text(chat_id=call.from_user.id,
+                                        message_id=call.message.message_id,
+                                        text='Выбери доступную дату:\n ✅N - есть свободное время (N окон)',
+                                        reply_markup=telebot_calendar.create_calendar(
+                                            name='CALENDAR' + calendar_name,
+                                            lst_current_date=lst, counts=await client.get_day_counts()))
+    else:
+        await go_to_menu(call)
+
+
+@router.prefix('CALENDAR')
+async def choice_time(call: CallbackQuery):
+    """
+    Выбор времени
+    """
+    client = await clear_dict.ASYNC_CLIENT_DICT.get(call.from_user.id)
+    if not client:
+        client = await create_client(call.message.chat.id)
+    name, (action, year, month, day) = telebot_calendar.parse_calendar_data(call.data)
+    await telebot_calendar.async_calendar_query_handler(
+        bot=bot, call=call, name=name, action=action, year=year, month=month, day=day,
+        lst_currant_date=client.lst_currant_date,
+        counts=await client.get_day_counts() if action in telebot_calendar.NAVIGATION_ACTIONS else None
+    )
+
+    if action == "DAY":
+        client.date_record = datetime(int(year), int(month), int(day)).strftime('%d.%m.%y')
+        lst_times = await client.get_free_time()
+        client.dct_currant_time = lst_times
+        await clear_dict.ASYNC_CLIENT_DICT.set(call.from_user.id, client)
+
+        markup = InlineKeyboardMarkup(row_width=3)
+        markup.add(*[InlineKeyboardButton(text=x,
+                                          callback_data='TIME' + x
+                                          ) for x in lst_times])
+        master = 'MASTER' + (client.name_master if client.name_master else 'ЛЮБОЙ')
+        markup.add(*button_to_menu(master))
+        text = "Выберите время:" if len(lst_times) != 0 else "Для выбранного даты нет доступного времени!\n" \
+                                                             "Попробуй другую дату😉"
+        await bot.delete_message(chat_id=call.message.chat.id,
+                                 message_id=call.message.message_id)
+        await bot.send_message(chat_id=call.from_user.id, text=text, reply_markup=markup)
+    elif action == "MENU":
+        await go_to_menu(call)
+    elif action == "RETURN":
+        call.data = 'SERVICE' + client.name_service
+        await choice_master(call)
+
+
+@router.prefix('TIME')
+async def approve_record(call):
+    """
+    Проверка данных записи
+    """
+    client = await clear_dict.ASYNC_CLIENT_DICT.get(call.from_user.id)
+    if client:
+        client.time_record = call.data[len('TIME'):]
+        await clear_dict.ASYNC_CLIENT_DICT.set(call.from_user.id, client)
+        text = f'Проверьте данные записи:\n\n' \
+               f'🛎️ Услуга: {client.name_service}\n' \
+               f'👤 Мастер: {client.name_master if client.name_master else "Любой"}\n' \
+               f'📅 Дата: {client.date_record}\n' \
+               f'🕓 Время: {client.time_record}'
+        if call.message.text != text:
+            markup = InlineKeyboardMarkup(row_width=2)
+            markup.add(InlineKeyboardButton(text='Подтверждаю', callback_data='APP_REC'))
+            await bot.edit_message_text(chat_id=call.message.chat.id,
+                                        message_id=call.message.message_id,
+                                        text=text,
+                                        reply_markup=markup)
+    else:
+        await go_to_menu(call)
+
+
+@router.prefix('APP_REC')
+async def set_time(call):
+    """
+    Подтверждение записи
+    """
+    client = await clear_dict.ASYNC_CLIENT_DICT.get(call.from_user.id)
+    if client:
+        id_client = get_client_id(call.message.chat.id, call.from_user.username)
+        recorded = await client.set_time(id_client)
+        await clear_dict.ASYNC_CLIENT_DICT.set(call.from_user.id, client)
+        if recorded:
+            new_text = f'Успешно записал вас!\n\n' \
+                       f'🛎️ Услуга: {client.name_service}\n' \
+                       f'👤 Мастер: {client.name_master if client.name_master else "Любой"}\n' \
+                       f'📅 Дата: {client.date_record}\n' \
+                       f'🕓 Время: {client.time_record}'
+            if call.message.text != new_text:
+                await bot.edit_message_text(chat_id=call.from_user.id,
+                                            message_id=call.message.message_id,
+                                            text=new_text)
+            await bot.send_message(call.message.chat.id, 'Ваша запись подтверждена! 👍')
+        else:
+            await bot.send_message(call.message.chat.id, 'К сожалению, выбранное время уже забронировано.\n'
+                                                         'Попробуйте выбрать другое время.')
+    else:
+        await go_to_menu(call)
+
+
+@router.exact('MENU')
+async def go_to_menu(call):
+    """Возвращает в главное меню"""
+    try:
+        await bot.delete_message(chat_id=call.message.chat.id, message_id=call.message.message_id)
+    except Exception as e:
+        print(f"Error deleting message: {e}")
+    await check_phone_number(call.message)
+
+
+async def main() -> None:
+    """Прогревает кэши, запускает фоновое обновление и опрос Telegram"""
+    await warm_up()
+    refresher = asyncio.create_task(refresh_schedule_loop())
+    try:
+        await bot.infinity_polling()
+    finally:
+        refresher.cancel()
+        await client_main.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
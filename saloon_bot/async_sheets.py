@@ -0,0 +1,117 @@
+"""
+Неблокирующий клиент Google Sheets API v4 на aiohttp
+"""
+import asyncio
+from urllib.parse import quote
+import aiohttp
+from google.auth.transport.requests import Request
+from gspread.utils import absolute_range_name
+from retry_policy import CircuitBreaker, RetryPolicy, TRANSIENT_STATUSES
+
+SHEETS_URL = 'https://sheets.googleapis.com/v4/spreadsheets/'
+
+
+def is_transient_error(ex: BaseException) -> bool:
+    """Временная ли ошибка aiohttp (имеет смысл повторить запрос); ошибки в коде и данных не повторяются"""
+    if isinstance(ex, aiohttp.ClientResponseError):
+        return ex.status in TRANSIENT_STATUSES
+    return isinstance(ex, (aiohttp.ClientConnectionError, asyncio.TimeoutError))
+
+
+class AsyncSheetsClient:
+    """Минимальный асинхронный клиент таблицы: чтение листов и запись ячеек"""
+
+    def __init__(self, creds, spreadsheet_key: str, session: aiohttp.ClientSession | None = None,
+                 retry: RetryPolicy | None = None, breaker: CircuitBreaker | None = None):
+        """
+        :param creds: Учётные данные google.oauth2 (обновляются в пуле потоков)
+        :param spreadsheet_key: Ключ таблицы
+        :param session: Сессия aiohttp (по умолчанию создаётся при первом запросе)
+        :param retry: Повторы временных ошибок каждого запроса (None - без повторов)
+        :param breaker: Предохранитель: при деградации api запросы сразу завершаются CircuitOpenError
+        """
+        self.creds = creds
+        self.url = SHEETS_URL + spreadsheet_key
+        self._session = session
+        self._token_lock = asyncio.Lock()
+        self.retry = retry
+        self.breaker = breaker
+
+    async def _headers(self) -> dict:
+        """Заголовок авторизации, токен обновляется без блокировки цикла событий"""
+        async with self._token_lock:
+            if not self.creds.valid:
+                await asyncio.get_running_loop().run_in_executor(None, self.creds.refresh, Request())
+        return {'Authorization': f'Bearer {self.creds.token}'}
+
+    async def request(self, method: str, path: str, **kwargs) -> dict:
+        """
+        Запрос к Sheets API с повторами временных ошибок
+
+        :param method: HTTP метод
+        :param path: Путь относительно таблицы
+        :return: Ответ API (json)
+        """
+        if self.retry is None:
+            return await self._request(method, path, **kwargs)
+        return await self.retry.acall(self._request, method, path, **kwargs)
+
+    async def _request(self, method: str, path: str, **kwargs) -> dict:
+        """Один запрос к Sheets API через предохранитель"""
+        if self.breaker is None:
+            return await self._send(method, path, **kwargs)
+        self.breaker.check()
+        try:
+            response = await self._send(method, path, **kwargs)
+        except Exception as ex:
+            if is_transient_error(ex):
+                self.breaker.record_failure()
+            else:
+                # api ответило (например, неверный диапазон) - значит, оно доступно
+                self.breaker.record_success()
+            raise
+        self.breaker.record_success()
+        return response
+
+    async def _send(self, method: str, path: str, **kwargs) -> dict:
+        """HTTP запрос к Sheets API"""
+        if self._session is None:
+            self._session = aiohttp.ClientSession()
+        async with self._session.request(method, self.url + path, headers=await self._headers(),
+                                         **kwargs) as response:
+            response.raise_for_status()
+            return await response.json()
+
+    async def worksheet_titles(self) -> list[str]:
+        """Названия всех листов таблицы"""
+        response = await self.request('GET', '', params={'fields': 'sheets.properties.title'})
+        return [sheet['properties']['title'] for sheet in response.get('sheets', [])]
+
+    async def values_batch_get(self, titles: list[str]) -> list[list[list]]:
+        """
+        Значения нескольких листов одним запросом values.batchGet
+
+        :param titles: Названия листов
+        :return: Значения листов в том же порядке
+        """
+        if not titles:
+            return []
+        params = [('ranges', absolute_range_name(title)) for title in titles]
+        response = await self.request('GET', '/values:batchGet', params=params)
+        return [value_range.get('values', []) for value_range in response.get('valueRanges', [])]
+
+    async def values_get(self, range_name: str) -> list[list]:
+        """Значения диапазона в A1 нотации"""
+        response = await self.request('GET', '/values/' + quote(range_name, safe="'!:"))
+        return response.get('values', [])
+
+    async def values_update(self, range_name: str, values: list[list]) -> dict:
+        """Запись значений в диапазон в A1 нотации"""
+        return await self.request('PUT', '/values/' + quote(range_name, safe="'!:"),
+                                  params={'valueInputOption': 'RAW'}, json={'values': values})
+
+    async def close(self) -> None:
+        """Закрывает сессию aiohttp"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
@@ -0,0 +1,38 @@
+"""
+Скорость кодирования/разбора callback данных: CallbackData против CallbackCodec
+
+Запуск из каталога saloon_bot: python benchmarks/bench_callback_data.py [кол-во повторов]
+"""
+import os
+import sys
+from timeit import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telebot_calendar import CallbackCodec, CallbackData  # noqa: E402
+
+# Количество повторов по умолчанию
+NUMBER = 200000
+# Схема callback данных календаря
+PARTS = ('action', 'year', 'month', 'day')
+
+
+def main() -> None:
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else NUMBER
+    factory = CallbackData('CALENDAR12345', *PARTS)
+    codec = CallbackCodec('CALENDAR12345', *PARTS)
+    data = codec.new('DAY', 2025, 5, 22)
+    cases = (
+        ('new', lambda: factory.new('DAY', 2025, 5, 22), lambda: codec.new('DAY', 2025, 5, 22)),
+        ('parse', lambda: factory.parse(data), lambda: codec.parse(data)),
+    )
+    print(f'Повторов: {number}')
+    for name, old, new in cases:
+        old_time = timeit(old, number=number) / number * 1e9
+        new_time = timeit(new, number=number) / number * 1e9
+        print(f'{name:5}: CallbackData {old_time:7.0f} нс, CallbackCodec {new_time:7.0f} нс '
+              f'({old_time / new_time:.1f}x быстрее)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Память на одну сессию клиента: прежний объект с __dict__ и своими копиями дат, времени и записей
+против SessionState со слотами, целыми ключами и общими наборами дат и времени
+
+Запуск из каталога saloon_bot: python benchmarks/bench_sessions.py [кол-во сессий]
+"""
+import os
+import sys
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from session_state import SessionState, shared_dates  # noqa: E402
+
+# Количество сессий по умолчанию
+SESSIONS = 10000
+# Доступные даты (две недели вперёд), как их отдаёт кэш доступных дат
+TITLES = tuple((date(2025, 5, 1) + timedelta(days=i)).strftime('%d.%m.%y') for i in range(14))
+# Свободное время выбранной даты, как его отдаёт зеркало расписания
+TIMES = ('10:00', '11:30', '13:00', '14:30', '16:00', '17:30')
+
+
+class DictSession:
+    """Прежняя раскладка состояния: атрибуты в __dict__, даты копируются в каждую сессию"""
+
+    def __init__(self, client_id):
+        self.client_id = client_id
+        self.lst_currant_date = None
+        self.dct_currant_time = None
+        self.lst_records = None
+        self.name_service = None
+        self.name_master = None
+        self.date_record = None
+        self.time_record = None
+
+
+def fill(session, i: int) -> None:
+    """
+    Заполняет сессию так же, как это делают обработчики: выбор услуги, мастера, даты и времени,
+    список свободного времени и две найденные записи клиента
+    """
+    session.name_service = 'Маникюр'
+    session.name_master = 'Крапивина Юлия'
+    session.date_record = datetime(2025, 5, 1 + i % 14).strftime('%d.%m.%y')
+    session.dct_currant_time = list(TIMES)
+    session.time_record = '13:00'
+    session.lst_records = [[TITLES[i % 14], '10:00', 'Маникюр', 'Крапивина Юлия'],
+                           [TITLES[(i + 3) % 14], '16:00', 'Стрижка', 'Иванова Анна']]
+
+
+def measure(factory, count: int) -> float:
+    """Средний прирост памяти на одну сессию в байтах"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    sessions = []
+    for i in range(count):
+        session = factory(i)
+        fill(session, i)
+        sessions.append(session)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / count
+
+
+def old_session(i: int) -> DictSession:
+    session = DictSession(i)
+    session.lst_currant_date = list(map(lambda x: datetime.strptime(x, '%d.%m.%y').date(), TITLES))
+    return session
+
+
+def new_session(i: int) -> SessionState:
+    session = SessionState(i)
+    session.lst_currant_date = shared_dates(TITLES)
+    return session
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else SESSIONS
+    old = measure(old_session, count)
+    new = measure(new_session, count)
+    print(f'Сессий: {count}')
+    print(f'__dict__ + копии:      {old:8.1f} байт/сессия')
+    print(f'__slots__ + ключи:      {new:8.1f} байт/сессия ({old / new:.1f}x меньше)')
+
+
+if __name__ == '__main__':
+    main()
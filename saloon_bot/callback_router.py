@@ -0,0 +1,139 @@
+"""
+Маршрутизация callback запросов: точное совпадение или самый длинный префикс за несколько обращений к словарю
+"""
+from threading import Lock
+from time import perf_counter
+from telebot.types import CallbackQuery
+
+# Название маршрута для callback данных, которым не нашлось обработчика
+UNMATCHED = None
+
+
+class CallbackRouter:
+    """
+    Один обработчик callback запросов TeleBot вместо цепочки фильтров-lambda.
+    Точное совпадение приоритетнее префикса, из префиксов побеждает самый длинный,
+    поэтому порядок регистрации не важен ('CANCEL_RECORD' и 'CANCEL', 'APPROVE' и 'APP_REC').
+    """
+
+    def __init__(self):
+        # callback данные -> обработчик
+        self._exact = {}
+        # префикс -> обработчик
+        self._prefixes = {}
+        # длины префиксов по убыванию
+        self._lengths = ()
+        # тип исключения -> обработчик ошибки
+        self._errors = {}
+        # маршрут -> [вызовов, суммарное время, максимальное время, ошибок]
+        self._stats = {}
+        self._lock = Lock()
+
+    def exact(self, data: str):
+        """Декоратор: обработчик callback данных, равных data"""
+        def decorator(func):
+            self._exact[data] = func
+            return func
+        return decorator
+
+    def prefix(self, prefix: str):
+        """Декоратор: обработчик callback данных, начинающихся с prefix"""
+        def decorator(func):
+            self._prefixes[prefix] = func
+            self._lengths = tuple(sorted({len(x) for x in self._prefixes}, reverse=True))
+            return func
+        return decorator
+
+    def on_error(self, exc_type: type):
+        """Декоратор: обработчик (call, исключение) для ошибок exc_type в обработчиках маршрутов"""
+        def decorator(func):
+            self._errors[exc_type] = func
+            return func
+        return decorator
+
+    def error_handler(self, ex: BaseException):
+        """Обработчик ошибки ex или None, если он не зарегистрирован"""
+        for exc_type, func in self._errors.items():
+            if isinstance(ex, exc_type):
+                return func
+        return None
+
+    def resolve(self, data: str) -> tuple:
+        """
+        Маршрут для callback данных
+
+        :return: (маршрут, обработчик); (UNMATCHED, None), если обработчика нет
+        """
+        func = self._exact.get(data)
+        if func is not None:
+            return data, func
+        for length in self._lengths:
+            key = data[:length]
+            func = self._prefixes.get(key)
+            if func is not None:
+                return key + '*', func
+        return UNMATCHED, None
+
+    def _record(self, route, elapsed: float, failed: bool) -> None:
+        with self._lock:
+            stat = self._stats.get(route)
+            if stat is None:
+                stat = self._stats[route] = [0, 0.0, 0.0, 0]
+            stat[0] += 1
+            stat[1] += elapsed
+            stat[2] = max(stat[2], elapsed)
+            stat[3] += failed
+
+    def dispatch(self, call: CallbackQuery) -> None:
+        """Вызывает обработчик маршрута и учитывает время его работы"""
+        route, func = self.resolve(call.data or '')
+        if func is None:
+            self._record(route, 0.0, False)
+            return
+        start = perf_counter()
+        failed = True
+        try:
+            func(call)
+            failed = False
+        except Exception as ex:
+            handler = self.error_handler(ex)
+            if handler is None:
+                raise
+            handler(call, ex)
+        finally:
+            self._record(route, perf_counter() - start, failed)
+
+    def install(self, bot) -> None:
+        """Регистрирует маршрутизатор единственным обработчиком callback запросов бота"""
+        bot.register_callback_query_handler(self.dispatch, func=None)
+
+    def stats(self) -> dict:
+        """Счётчики по маршрутам: вызовы, ошибки, среднее и максимальное время в мс"""
+        with self._lock:
+            return {route: {'calls': calls, 'errors': errors,
+                            'avg_ms': total / calls * 1000 if calls else 0.0,
+                            'max_ms': longest * 1000}
+                    for route, (calls, total, longest, errors) in self._stats.items()}
+
+
+class AsyncCallbackRouter(CallbackRouter):
+    """CallbackRouter для AsyncTeleBot: обработчики - корутины"""
+
+    async def dispatch(self, call: CallbackQuery) -> None:
+        """Вызывает обработчик маршрута и учитывает время его работы"""
+        route, func = self.resolve(call.data or '')
+        if func is None:
+            self._record(route, 0.0, False)
+            return
+        start = perf_counter()
+        failed = True
+        try:
+            await func(call)
+            failed = False
+        except Exception as ex:
+            handler = self.error_handler(ex)
+            if handler is None:
+                raise
+            await handler(call, ex)
+        finally:
+            self._record(route, perf_counter() - start, failed)
@@ -1,18 +1,19 @@
 """
 Хранение информации о пользователе и отчистка
 """
-from datetime import datetime, timedelta
-from threading import Lock, Thread
+from threading import Thread
 from time import sleep
+from session_backend import AsyncSessions, create_backend
+from session_state import SessionState
 
 # хранит объекты GoogleSheet по ключу id
-CLIENT_DICT = {}
+# (бот задаёт CLIENT_DICT.factory - класс, в который восстанавливаются сессии из Redis)
+CLIENT_DICT = create_backend('client', SessionState)
 # хранит название календаря по ключу id
-CALENDAR_DICT = {}
-# хранит время создания объекта GoogleSheet
-TIMER_DICT = {}
-# Lock для синхронизации доступа к словарям
-lock = Lock()
+CALENDAR_DICT = create_backend('calendar')
+# те же хранилища для асинхронного бота (Redis не блокирует цикл событий)
+ASYNC_CLIENT_DICT = AsyncSessions(CLIENT_DICT)
+ASYNC_CALENDAR_DICT = AsyncSessions(CALENDAR_DICT)
 
 
 def clear_unused_info(chat_id) -> None:
@@ -22,8 +23,8 @@ def clear_unused_info(chat_id) -> None:
 
         :param chat_id: id пользователя
         """
-    if CLIENT_DICT.get(chat_id):
-        client = CLIENT_DICT[chat_id]
+    client = CLIENT_DICT.get(chat_id)
+    if client:
         client.lst_currant_date = None
         client.dct_currant_time = None
         # client.lst_records = None
@@ -31,9 +32,18 @@ def clear_unused_info(chat_id) -> None:
         client.name_master = None
         client.date_record = None
         client.time_record = None
+        CLIENT_DICT[chat_id] = client
 
-    if CALENDAR_DICT.get(chat_id):
-        del CALENDAR_DICT[chat_id]
+    CALENDAR_DICT.pop(chat_id)
+
+
+async def aclear_unused_info(chat_id) -> None:
+    """
+    clear_unused_info для асинхронного бота
+
+    :param chat_id: id пользователя
+    """
+    await ASYNC_CLIENT_DICT.run(clear_unused_info, chat_id)
 
 
 def clear_all_dict(chat_id) -> None:
@@ -42,30 +52,20 @@ def clear_all_dict(chat_id) -> None:
 
     :param chat_id: id пользователя
     """
-    if CLIENT_DICT.get(chat_id):
-        del CLIENT_DICT[chat_id]
-    if CALENDAR_DICT.get(chat_id):
-        del CALENDAR_DICT[chat_id]
-    if TIMER_DICT.get(chat_id):
-        del TIMER_DICT[chat_id]
+    CLIENT_DICT.pop(chat_id)
+    CALENDAR_DICT.pop(chat_id)
 
 
-def clear_client_dict(period_clear_minutes=60) -> None:
+def clear_client_dict(period_clear_minutes=1) -> None:
     """
-    Отчищает все неактивные элементы словарей
+    Периодически удаляет сессии с истёкшим временем простоя (без полного обхода)
 
     :param period_clear_minutes: периодичность отчистки в минутах
     """
     while True:
         sleep(period_clear_minutes * 60)
-        at_now = datetime.now()
-        lst_to_del = []
-        with lock:
-            for key, val in TIMER_DICT.items():
-                if val + timedelta(minutes=period_clear_minutes) >= at_now:
-                    lst_to_del.append(key)
-            for chat_id in lst_to_del:
-                clear_all_dict(chat_id)
+        CLIENT_DICT.expire()
+        CALENDAR_DICT.expire()
 
 
 clear_thread = Thread(target=clear_client_dict)
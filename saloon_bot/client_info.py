@@ -0,0 +1,25 @@
+"""
+Данные клиента: телефон и строка записи в таблицу
+"""
+from phone_store import PhoneStore
+
+# Файл базы SQLite с телефонами клиентов
+PHONE_DB = 'clients.sqlite3'
+# Телефоны клиентов по chat id
+CLIENT_PHONE = PhoneStore(PHONE_DB)
+
+
+def get_client_id(client_id, client_username) -> str:
+    """Создаёт строку записи пользователя
+
+    :param client_id: id чата/пользователя
+    :param client_username: username пользователя
+    :return: 'id: id @username tel: phone'"""
+    id_client = f"id: {str(client_id)}\n@{str(client_username)}\n"
+    phone = CLIENT_PHONE.get(client_id)
+    if phone is not None:
+        if phone != '':
+            id_client += 'tel: ' + phone
+        else:
+            id_client += 'tel: None'
+    return id_client
@@ -0,0 +1,145 @@
+"""
+Типизированный кэш доступных дат по ключу (услуга, мастер)
+"""
+from datetime import datetime
+from threading import Lock
+from time import monotonic
+from typing import Callable, NamedTuple
+from cachetools import TLRUCache
+from schedule_mirror import ScheduleMirror, parse_date
+from sheet_config import AVAILABILITY_DAYS
+
+
+class DaysEntry(NamedTuple):
+    """Запись кэша: доступные даты и их собственный TTL"""
+    dates: tuple[str, ...]
+    ttl: float
+
+
+class DaysCache:
+    """LRU-кэш доступных дат с TTL на каждую запись и счётчиками попаданий"""
+
+    def __init__(self, maxsize=256, ttl=15 * 60, timer=monotonic):
+        """
+        :param maxsize: Максимальное количество пар (услуга, мастер)
+        :param ttl: TTL записи по умолчанию в секундах
+        :param timer: Источник времени (для тестов)
+        """
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._cache = TLRUCache(maxsize=maxsize, ttu=self._ttu, timer=timer)
+        self._lock = Lock()
+
+    @staticmethod
+    def _ttu(_key, entry: DaysEntry, now: float) -> float:
+        """Время истечения записи"""
+        return now + entry.ttl
+
+    def get(self, service_name: str, master_name: str | None) -> tuple[str, ...] | None:
+        """
+        Доступные даты из кэша без копирования
+
+        :param service_name: Название услуги
+        :param master_name: Имя мастера (None - любой мастер)
+        :return: Кортеж дат или None при промахе
+        """
+        with self._lock:
+            entry = self._cache.get((service_name, master_name))
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry.dates
+
+    def set(self, service_name: str, master_name: str | None, dates, ttl: float | None = None) -> None:
+        """
+        Сохраняет доступные даты
+
+        :param service_name: Название услуги
+        :param master_name: Имя мастера (None - любой мастер)
+        :param dates: Доступные даты
+        :param ttl: TTL записи в секундах (по умолчанию - self.ttl)
+        """
+        entry = DaysEntry(tuple(dates), self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._cache[(service_name, master_name)] = entry
+
+    def update_date(self, service_name: str, date_title: str, has_free: Callable[[str | None], bool]) -> None:
+        """
+        Обновляет одну дату во всех записях услуги после записи/отмены (write-through)
+
+        :param service_name: Название услуги
+        :param date_title: Дата (название листа), на которой изменился слот
+        :param has_free: Функция (мастер) -> есть ли свободное время на дату
+        """
+        with self._lock:
+            for key in [key for key in self._cache if key[0] == service_name]:
+                entry = self._cache[key]
+                dates = [x for x in entry.dates if x != date_title]
+                if has_free(key[1]):
+                    dates.append(date_title)
+                    dates.sort(key=parse_date)
+                self._cache[key] = DaysEntry(tuple(dates), entry.ttl)
+
+    def update_from_schedule(self, schedule: ScheduleMirror, service_name: str, date_title: str,
+                             now: datetime, count_days=AVAILABILITY_DAYS) -> None:
+        """
+        Обновляет дату во всех записях услуги по зеркалу расписания.
+        Если листа нет в зеркале, все записи услуги удаляются.
+
+        :param schedule: Зеркало расписания
+        :param service_name: Название услуги
+        :param date_title: Дата (название листа)
+        :param now: Текущее время
+        :param count_days: Количество ближайших дней, на которые открыта запись
+        """
+        if schedule.get_day(date_title) is None:
+            self.pop_service(service_name)
+            return
+        self.update_date(service_name, date_title,
+                         lambda master_name: schedule.is_available(date_title, service_name, master_name,
+                                                                               now, count_days))
+
+    def prefetch(self, schedule: ScheduleMirror, services: dict[str, list[str]], now: datetime,
+                 count_days=AVAILABILITY_DAYS) -> int:
+        """
+        Заполняет кэш по зеркалу расписания для всех пар (услуга, мастер) и (услуга, любой мастер)
+
+        :param schedule: Зеркало расписания
+        :param services: Словарь {услуга: [мастера]}
+        :param now: Текущее время
+        :param count_days: Количество ближайших дней, на которые открыта запись
+        :return: Количество записанных пар
+        """
+        count = 0
+        for service_name, masters in services.items():
+            for master_name in (None, *masters):
+                self.set(service_name, master_name,
+                         schedule.available_days(service_name, master_name, now, count_days))
+                count += 1
+        return count
+
+    def pop_service(self, service_name: str) -> None:
+        """Удаляет все записи услуги"""
+        with self._lock:
+            for key in [key for key in self._cache if key[0] == service_name]:
+                del self._cache[key]
+
+    def pop(self, service_name: str, master_name: str | None) -> None:
+        """Удаляет запись из кэша"""
+        with self._lock:
+            self._cache.pop((service_name, master_name), None)
+
+    def clear(self) -> None:
+        """Очищает кэш"""
+        with self._lock:
+            self._cache.clear()
+
+    def __len__(self):
+        return len(self._cache)
+
+    def stats(self) -> dict:
+        """Метрики кэша"""
+        return {'size': len(self._cache), 'maxsize': self._cache.maxsize,
+                'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,104 @@
+"""
+Обработка обновлений Telegram в пуле потоков: параллельно между чатами, строго по очереди внутри чата
+"""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from threading import BoundedSemaphore, Lock
+from telebot.types import Update
+
+# Количество потоков-обработчиков
+DISPATCHER_WORKERS = 4
+# Максимальное число принятых, но не обработанных обновлений
+DISPATCHER_QUEUE_SIZE = 100
+
+
+def get_chat_id(update: Update):
+    """
+    Чат, к которому относится обновление (ключ упорядочивания)
+
+    :return: id чата/пользователя или None
+    """
+    if update.message is not None:
+        return update.message.chat.id
+    if update.edited_message is not None:
+        return update.edited_message.chat.id
+    if update.callback_query is not None:
+        if update.callback_query.message is not None:
+            return update.callback_query.message.chat.id
+        return update.callback_query.from_user.id
+    return None
+
+
+class ChatDispatcher:
+    """Пул потоков с очередью задач на каждый чат"""
+
+    def __init__(self, workers=DISPATCHER_WORKERS, queue_size=DISPATCHER_QUEUE_SIZE):
+        """
+        :param workers: Количество потоков-обработчиков
+        :param queue_size: Максимальное число задач в очередях всех чатов
+        """
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix='dispatcher')
+        self._slots = BoundedSemaphore(queue_size)
+        # очереди задач по чату; чат присутствует в словаре, пока его очередь обрабатывается
+        self._queues = {}
+        self._lock = Lock()
+
+    def submit(self, chat_id, func, *args, block=True, timeout=None) -> bool:
+        """
+        Ставит задачу в очередь чата
+
+        :param chat_id: Ключ упорядочивания (None - без упорядочивания)
+        :param func: Функция обработки
+        :param block: Ждать освобождения места в очереди
+        :param timeout: Максимальное время ожидания места в очереди
+        :return: True - задача принята; False - очередь переполнена
+        """
+        if not self._slots.acquire(blocking=block, timeout=timeout if block else None):
+            return False
+        with self._lock:
+            queue = self._queues.get(chat_id)
+            if queue is not None:
+                # очередь чата уже обрабатывается, задача выполнится после предыдущих
+                queue.append((func, args))
+                return True
+            self._queues[chat_id] = deque([(func, args)])
+        self.executor.submit(self._drain, chat_id)
+        return True
+
+    def _drain(self, chat_id) -> None:
+        """Выполняет задачи чата по порядку, пока очередь не опустеет"""
+        while True:
+            with self._lock:
+                queue = self._queues[chat_id]
+                if not queue:
+                    del self._queues[chat_id]
+                    return
+                func, args = queue.popleft()
+            try:
+                func(*args)
+            except Exception as ex:
+                print(f"[ERROR] Chat {chat_id} task failed: {ex}")
+            finally:
+                self._slots.release()
+
+    def install(self, bot) -> None:
+        """
+        Подключает диспетчер к TeleBot: обновления из polling/webhook обрабатываются в пуле диспетчера
+
+        :param bot: Объект TeleBot
+        """
+        process_new_updates = bot.process_new_updates
+        # обработчики выполняются в потоке диспетчера, а не во внутреннем пуле TeleBot
+        bot.threaded = False
+
+        def dispatch(updates: list[Update]) -> None:
+            for update in updates:
+                # смещение для getUpdates сдвигаем сразу, иначе polling получит обновления повторно
+                bot.last_update_id = max(bot.last_update_id, update.update_id)
+                self.submit(get_chat_id(update), process_new_updates, [update])
+
+        bot.process_new_updates = dispatch
+
+    def shutdown(self) -> None:
+        """Дожидается выполнения принятых задач и останавливает пул"""
+        self.executor.shutdown(wait=True)
@@ -1,94 +1,149 @@
 """
 Взаимодействие с Google Sheets
 """
-from datetime import datetime, timedelta
-from time import time
-from threading import Lock
-import json
-from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from contextlib import contextmanager
+from time import time, sleep, monotonic
+from threading import Thread
 from google.oauth2.service_account import Credentials
-from retrying import retry
 from cachetools import TTLCache
 import gspread
-from pytz import timezone
-
-myscope = ["https://www.googleapis.com/auth/spreadsheets",
-           "https://www.googleapis.com/auth/drive"]
-
-# Временная зона
-tz = timezone("Europe/Moscow")
-# Название файла json ключа
-creds = Credentials.from_service_account_file('../../OneDrive/Рабочий стол/saloon_bot/beauty-saloon-451808-531bdfb287e4.json', scopes=myscope)
-client_main = gspread.Client(creds)
-# Название таблицы
-sh = client_main.open_by_key('1jP9nHvqzKg7yV4-jzeJRLedrHeoHiyvWDfE681tVzNE')
-# Страницы таблицы, которые должны игнорироваться во избежание проблем
-IGNOR_WORKSHEETS = ['Работники']
-# Страница таблицы, на которой перечислены все действующие работники и услуги
-NAME_SHEET_WORKERS = 'Работники'
-# Названия основных колонок(очередность важна!)
-NAME_COL_SERVICE = 'Услуга'
-NAME_COL_MASTER = 'Мастер'
+import requests
+from gspread.urls import DRIVE_FILES_API_V3_URL
+from gspread.utils import absolute_range_name, rowcol_to_a1
+from days_cache import DaysCache
+from rate_limiter import SheetsRateLimiter, BOOKING, BACKGROUND
+from retry_policy import CircuitBreaker, RetryPolicy, ServiceUnavailable, TRANSIENT_STATUSES
+from schedule_mirror import DaySchedule, ScheduleMirror, parse_date, values_to_records
+from session_state import SessionState
+from sheet_locks import SheetLocks
+from sheet_watcher import ScheduleWatcher, get_drive_version
+from single_flight import SingleFlight
+from sheet_config import myscope, tz, CREDENTIALS_FILE, SPREADSHEET_KEY, IGNOR_WORKSHEETS, \
+    NAME_SHEET_WORKERS, NAME_COL_SERVICE, NAME_COL_MASTER, AVAILABILITY_DAYS, SHEETS_READS_PER_MINUTE, \
+    SHEETS_WRITES_PER_MINUTE, QUOTA_PAUSE_SECONDS, RETRY_ATTEMPTS, RETRY_BASE_SECONDS, RETRY_MAX_SECONDS, \
+    CIRCUIT_FAILURES, CIRCUIT_RESET_SECONDS, CHECKSUM_HEADER, RATE_LIMIT_TIMEOUT_SECONDS
+
+
+def is_transient_error(ex: BaseException) -> bool:
+    """Временная ли ошибка (имеет смысл повторить запрос); ошибки в коде и данных не повторяются"""
+    if isinstance(ex, gspread.exceptions.APIError):
+        return ex.response.status_code in TRANSIENT_STATUSES
+    return isinstance(ex, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+
+
+# Общие квоты чтения и записи для всех запросов к api: запись клиентов важнее просмотра и фоновых обновлений
+SHEETS_LIMITER = SheetsRateLimiter(SHEETS_READS_PER_MINUTE, SHEETS_WRITES_PER_MINUTE)
+# Предохранитель: при деградации api запросы сразу завершаются CircuitOpenError, а не занимают потоки
+SHEETS_BREAKER = CircuitBreaker(CIRCUIT_FAILURES, CIRCUIT_RESET_SECONDS)
+# Повторы временных ошибок: ограниченное число попыток с полным джиттером;
+# ожидание квоты во всех попытках вызова ограничено одним сроком RATE_LIMIT_TIMEOUT_SECONDS
+SHEETS_RETRY = RetryPolicy(RETRY_ATTEMPTS, RETRY_BASE_SECONDS, RETRY_MAX_SECONDS, is_transient_error,
+                           scope=lambda: SHEETS_LIMITER.deadline(RATE_LIMIT_TIMEOUT_SECONDS))
+
+
+class RateLimitedClient(gspread.Client):
+    """gspread.Client, все запросы которого проходят через предохранитель SHEETS_BREAKER и квоты SHEETS_LIMITER"""
+
+    def request(self, method, endpoint, *args, **kwargs):
+        # проверки версии в Drive API не расходуют квоты Sheets API;
+        # RateLimitTimeout (ServiceUnavailable) не повторяется: обработчик сразу сообщает клиенту о недоступности
+        if not endpoint.startswith(DRIVE_FILES_API_V3_URL):
+            SHEETS_LIMITER.acquire(method, timeout=RATE_LIMIT_TIMEOUT_SECONDS)
+        # токен берётся до проверки предохранителя: пробный запрос не застрянет в ожидании квоты
+        SHEETS_BREAKER.check()
+        try:
+            response = super().request(method, endpoint, *args, **kwargs)
+        except Exception as ex:
+            if not is_transient_error(ex):
+                # api ответило (например, лист не найден) - значит, оно доступно
+                SHEETS_BREAKER.record_success()
+                raise
+            SHEETS_BREAKER.record_failure()
+            if isinstance(ex, gspread.exceptions.APIError) and ex.response.status_code == 429:
+                # квота исчерпана: останавливаем все потоки вместо независимых повторов
+                retry_after = ex.response.headers.get('Retry-After')
+                SHEETS_LIMITER.bucket(method).pause(float(retry_after) if retry_after else QUOTA_PAUSE_SECONDS)
+            raise
+        SHEETS_BREAKER.record_success()
+        return response
+
+
+creds = Credentials.from_service_account_file(CREDENTIALS_FILE, scopes=myscope)
+client_main = RateLimitedClient(creds)
+# Таблица
+sh = client_main.open_by_key(SPREADSHEET_KEY)
 
 # Кэш листов с TTL (временем жизни) в 12 часов
 CACHE_WORKSHEETS = TTLCache(maxsize=2, ttl=12 * 60 * 60)
-# Кэш доступных дат для услуги-мастера с TTL (временем жизни) в 15 минут
-CACHE_DAYS = TTLCache(maxsize=6, ttl=15 * 60)
-# Lock для синхронизации доступа к словарям
-lock = Lock()
+# Последние загруженные список листов и услуги без TTL: отдаются, если api недоступно
+STALE_WORKSHEETS = {}
+# Кэш доступных дат по ключу (услуга, мастер) с TTL (временем жизни) в 15 минут
+CACHE_DAYS = DaysCache(maxsize=256, ttl=15 * 60)
+# Зеркало расписания всех листов-дат, из него отвечают все запросы на чтение
+SCHEDULE = ScheduleMirror(NAME_COL_SERVICE, NAME_COL_MASTER)
+# Периодичность проверки версии таблицы в Google Drive в секундах
+# (листы перечитываются только после изменения таблицы)
+SCHEDULE_REFRESH_SECONDS = 10
+# Периодичность предзагрузки доступных дат в секундах (меньше TTL CACHE_DAYS)
+PREFETCH_DAYS_SECONDS = 5 * 60
+# Периодичность предзагрузки списка листов и услуг в секундах (меньше TTL CACHE_WORKSHEETS)
+PREFETCH_SHEETS_SECONDS = 6 * 60 * 60
+# Блокировки по листам: чтения разных (и одного) листа идут параллельно,
+# записи в один лист выполняются строго по очереди
+SHEET_LOCKS = SheetLocks()
+# Объединение одновременных загрузок: при всплеске запросов один запрос к api на ключ
+SHEET_FLIGHT = SingleFlight()
+
+
+def get_cache_days(service_name: str, master_name: str | None) -> tuple | None:
+    """
+    Запрашивает свободные даты из кэша CACHE_DAYS
 
+    :param service_name: Название услуги
+    :param master_name: Имя мастера (None - любой мастер)
+    """
+    return CACHE_DAYS.get(service_name, master_name)
 
-# Функция для сериализации словаря в JSON-строку
-def serialize_dict(dct: dict) -> str:
-    """Сериализатор json"""
-    return json.dumps(dct)
 
+def update_cache_days(service_name: str, master_name: str | None, available_dates: list) -> None:
+    """
+    Обновляет свободные даты для кэша CACHE_DAYS
 
-# Функция для десериализации JSON-строки в словарь
-def deserialize_dict(json_str: str) -> dict:
-    """Десериализатор json"""
-    return json.loads(json_str)
+    :param service_name: Название услуги
+    :param master_name: Имя мастера (None - любой мастер)
+    :param available_dates: Доступные даты
+    """
+    CACHE_DAYS.set(service_name, master_name, available_dates)
 
 
-def get_cache_days(service_name: str, master_name: str) -> list | None:
+def update_cache_date(service_name: str, date_record: str) -> None:
     """
-    Запрашивает свободные даты из кэша cashe_days
+    Обновляет дату в CACHE_DAYS для всех мастеров услуги по зеркалу расписания
 
     :param service_name: Название услуги
-    :param master_name: Имя мастера
+    :param date_record: Дата (название листа)
     """
-    if service_name in CACHE_DAYS:
-        cached_value = CACHE_DAYS[service_name]
-        cached_dict = deserialize_dict(cached_value)
-        if master_name in cached_dict:
-            return cached_dict[master_name]
-    return None
+    CACHE_DAYS.update_from_schedule(SCHEDULE, service_name, date_record, datetime.now(tz=tz), AVAILABILITY_DAYS)
 
 
-def update_cache_days(service_name: str, master_name: str, available_dates: list) -> None:
+def update_cache_worksheets(key: str, value) -> None:
     """
-    Обновляет свободные даты для кэша cache_days
+    Обновляет CACHE_WORKSHEETS и запасную копию STALE_WORKSHEETS
 
-    :param service_name: Название услуги
-    :param master_name: Имя мастера
-    :param available_dates: Доступные даты
+    :param key: 'worksheets' или 'services'
+    :param value: Загруженное значение
     """
-    if master_name is None:
-        master_name = 'null'
+    CACHE_WORKSHEETS[key] = value
+    STALE_WORKSHEETS[key] = value
 
-    if service_name in CACHE_DAYS:
-        cached_value = CACHE_DAYS[service_name]
-        cached_dict = deserialize_dict(cached_value)
-        if master_name not in cached_dict:
-            cached_dict[master_name] = available_dates
-            cache_value = serialize_dict(cached_dict)
-            CACHE_DAYS[service_name] = cache_value
-    else:
-        cache_value = serialize_dict({master_name: available_dates})
-        CACHE_DAYS[service_name] = cache_value
 
+def get_stale_worksheets(key: str):
+    """Последнее загруженное значение CACHE_WORKSHEETS (если api недоступно), None - не загружалось"""
+    return STALE_WORKSHEETS.get(key)
 
-@retry(wait_exponential_multiplier=3000, wait_exponential_max=3000)
+
+@SHEETS_RETRY(fallback=lambda: get_stale_worksheets('worksheets'))
 def get_sheet_names() -> list:
     """
     Запрашивает все имена листов таблицы
@@ -96,32 +151,262 @@ def get_sheet_names() -> list:
     # Проверяем, есть ли результат в кэше
     if 'worksheets' in CACHE_WORKSHEETS:
         return CACHE_WORKSHEETS['worksheets']
-    with lock:
-        worksheets = sh.worksheets()
+    return SHEET_FLIGHT.do('worksheets', _fetch_sheet_names)
+
+
+def _fetch_sheet_names() -> list:
+    """Загружает список листов в CACHE_WORKSHEETS (один вызов на всех одновременно ожидающих)"""
+    # кэш мог заполниться, пока вызывающий ждал своей очереди
+    if 'worksheets' in CACHE_WORKSHEETS:
+        return CACHE_WORKSHEETS['worksheets']
+    worksheets = sh.worksheets()
 
     # Кэшируем результат
-    CACHE_WORKSHEETS['worksheets'] = worksheets
+    update_cache_worksheets('worksheets', worksheets)
     return worksheets
 
 
-@retry(wait_exponential_multiplier=3000, wait_exponential_max=3000)
+@SHEETS_RETRY(fallback=lambda: get_stale_worksheets('services'))
 def get_cache_services() -> dict:
     """
     Запрашивает все услуги
     """
     if 'services' in CACHE_WORKSHEETS:
         return CACHE_WORKSHEETS['services']
+    return SHEET_FLIGHT.do('services', _fetch_services)
+
+
+def _fetch_services() -> dict:
+    """Загружает услуги в CACHE_WORKSHEETS (один вызов на всех одновременно ожидающих)"""
+    if 'services' in CACHE_WORKSHEETS:
+        return CACHE_WORKSHEETS['services']
+    dct = load_services()
+    update_cache_worksheets('services', dct)
+    return dct
+
+
+def load_services() -> dict:
+    """
+    Читает услуги и мастеров с листа работников
+
+    :return: Словарь {услуга: [мастера]}
+    """
     dct = {}
-    with lock:
-        ws = sh.worksheet(NAME_SHEET_WORKERS)
-    for i in ws.get_all_records():
+    # токены квоты берутся до блокировки листа: лист + его записи
+    with SHEETS_LIMITER.reserve('get', 2, RATE_LIMIT_TIMEOUT_SECONDS), SHEET_LOCKS.read(NAME_SHEET_WORKERS):
+        records = sh.worksheet(NAME_SHEET_WORKERS).get_all_records()
+    for i in records:
         dct[i[NAME_COL_SERVICE].strip()] = dct.get(i[NAME_COL_SERVICE].strip(), [])
         dct[i[NAME_COL_SERVICE].strip()].append(i[NAME_COL_MASTER].strip())
-
-    CACHE_WORKSHEETS['services'] = dct
     return dct
 
 
+@SHEETS_RETRY
+def batch_get_records(titles: list[str]) -> dict[str, list[dict]]:
+    """
+    Запрашивает записи нескольких листов одним вызовом values.batchGet
+
+    :param titles: Названия листов
+    :return: Словарь {название листа: записи формата get_all_records()}
+    """
+    if not titles:
+        return {}
+    response = sh.values_batch_get([absolute_range_name(title) for title in titles])
+    return {title: values_to_records(value_range.get('values', []))
+            for title, value_range in zip(titles, response.get('valueRanges', []))}
+
+
+@SHEETS_RETRY
+def batch_get_checksums(titles: list[str]) -> dict[str, str]:
+    """
+    Запрашивает контрольные суммы нескольких листов одним вызовом values.batchGet:
+    читаются первые две строки, колонка контрольной суммы ищется по заголовку CHECKSUM_HEADER
+
+    :param titles: Названия листов
+    :return: Словарь {название листа: контрольная сумма}, '' - на листе нет контрольной суммы
+    """
+    if not titles:
+        return {}
+    response = sh.values_batch_get([absolute_range_name(title, '1:2') for title in titles])
+    checksums = {}
+    for title, value_range in zip(titles, response.get('valueRanges', [])):
+        records = values_to_records(value_range.get('values', []))
+        checksums[title] = str(records[0].get(CHECKSUM_HEADER, '')) if records else ''
+    return checksums
+
+
+@SHEETS_RETRY
+def refresh_sheet_names() -> None:
+    """Запрашивает только названия листов и обновляет список листов в кэше, если названия изменились"""
+    metadata = sh.fetch_sheet_metadata(params={'fields': 'sheets.properties.title'})
+    titles = [sheet['properties']['title'] for sheet in metadata.get('sheets', [])]
+    cached = CACHE_WORKSHEETS.get('worksheets')
+    if cached is None or [sheet_obj.title for sheet_obj in cached] != titles:
+        update_cache_worksheets('worksheets', sh.worksheets())
+
+
+def get_date_titles() -> list[str]:
+    """
+    Названия актуальных листов-дат (сегодня и позже)
+    """
+    date_today = datetime.now(tz=tz).date()
+    titles = []
+    for sheet_obj in get_sheet_names():
+        if sheet_obj.title in IGNOR_WORKSHEETS:
+            continue
+        date_sheet = parse_date(sheet_obj.title)
+        if date_sheet is None:
+            print(sheet_obj.title, '- Добавьте лист в IGNOR_WORKSHEETS')
+            continue
+        if date_sheet >= date_today:
+            titles.append(sheet_obj.title)
+    return titles
+
+
+def get_watched_titles() -> list[str]:
+    """
+    Названия листов, отслеживаемых на изменения: актуальные листы-даты и лист работников.
+    Вызывается после изменения таблицы: список листов перечитывается, только если изменились названия.
+    """
+    refresh_sheet_names()
+    return get_date_titles() + [NAME_SHEET_WORKERS]
+
+
+def on_schedule_change(titles: list[str]) -> None:
+    """
+    Сбрасывает кэши, построенные по изменившимся листам
+
+    :param titles: Названия изменившихся/удалённых листов
+    """
+    if NAME_SHEET_WORKERS in titles:
+        CACHE_WORKSHEETS.pop('services', None)
+    # доступные даты пересчитываются по зеркалу без запросов к api
+    CACHE_DAYS.clear()
+
+
+@contextmanager
+def watcher_lock(titles: list[str]):
+    """
+    Блокировка чтения листов на время загрузки в зеркало. Токены квоты на оба запроса
+    (контрольные суммы и записи листов) берутся до блокировки: фоновая загрузка не ждёт квоту,
+    удерживая листы, запись в которые ждёт клиент
+    """
+    with SHEETS_LIMITER.reserve('get', 2, RATE_LIMIT_TIMEOUT_SECONDS), SHEET_LOCKS.read_many(titles):
+        yield
+
+
+# Обновление зеркала по версии таблицы в Google Drive.
+# Запись в листы на время загрузки блокируется, чтобы не затереть зеркало устаревшими данными.
+SCHEDULE_WATCHER = ScheduleWatcher(SCHEDULE, lambda: get_drive_version(client_main, SPREADSHEET_KEY),
+                                   get_watched_titles, batch_get_records,
+                                   lock=watcher_lock, on_change=on_schedule_change,
+                                   fetch_checksums=batch_get_checksums, checksum_header=CHECKSUM_HEADER)
+
+
+def refresh_schedule() -> list[str]:
+    """
+    Перезагружает в зеркале расписания листы, изменившиеся с прошлой проверки
+
+    :return: Названия изменившихся листов
+    """
+    return SCHEDULE_WATCHER.poll()
+
+
+def get_schedule() -> ScheduleMirror:
+    """
+    Возвращает зеркало расписания, при первом обращении загружает его
+    """
+    if not SCHEDULE.loaded:
+        SHEET_FLIGHT.do('schedule', refresh_schedule)
+    return SCHEDULE
+
+
+@SHEETS_RETRY
+def prefetch_sheets() -> None:
+    """Заново загружает список листов и услуги до истечения TTL CACHE_WORKSHEETS"""
+    worksheets = sh.worksheets()
+    services = load_services()
+    update_cache_worksheets('worksheets', worksheets)
+    update_cache_worksheets('services', services)
+
+
+def prefetch_days() -> int:
+    """
+    Заполняет CACHE_DAYS доступными датами всех услуг и мастеров по зеркалу (без запросов к api)
+
+    :return: Количество пар (услуга, мастер)
+    """
+    return CACHE_DAYS.prefetch(get_schedule(), get_cache_services(), datetime.now(tz=tz), AVAILABILITY_DAYS)
+
+
+def warm_up() -> None:
+    """Прогрев при запуске бота: зеркало расписания, список листов, услуги и доступные даты"""
+    start = time()
+    try:
+        with SHEETS_LIMITER.priority(BACKGROUND):
+            refresh_schedule()
+            count = prefetch_days()
+    except Exception as ex:
+        # бот всё равно запускается, кэши заполнятся при первых запросах
+        print(f"[ERROR] Не удалось прогреть кэши: {ex}")
+        return
+    print(f"[INFO] Warm-up: {len(SCHEDULE.days(datetime.now(tz=tz)))} days, {count} service/master pairs "
+          f"in {round(time() - start, 2)} seconds")
+
+
+def refresh_schedule_loop(period_seconds=SCHEDULE_REFRESH_SECONDS) -> None:
+    """
+    Периодически обновляет зеркало расписания в фоне
+    и заранее загружает кэши, чтобы запросы пользователей не попадали в пустой кэш
+
+    :param period_seconds: периодичность обновления в секундах
+    """
+    prefetched_days = prefetched_sheets = monotonic()
+    while True:
+        sleep(period_seconds)
+        try:
+            with SHEETS_LIMITER.priority(BACKGROUND):
+                changed = refresh_schedule()
+                if monotonic() - prefetched_sheets >= PREFETCH_SHEETS_SECONDS:
+                    prefetch_sheets()
+                    prefetched_sheets = monotonic()
+                if changed or monotonic() - prefetched_days >= PREFETCH_DAYS_SECONDS:
+                    prefetch_days()
+                    prefetched_days = monotonic()
+        except Exception as ex:
+            print(f"[ERROR] Не удалось обновить расписание: {ex}")
+
+
+def _fetch_days(service_name: str, master_name: str | None) -> tuple:
+    """Считает доступные даты по зеркалу и кэширует их (один расчёт на всех одновременно ожидающих)"""
+    check = get_cache_days(service_name, master_name)
+    if check is not None:
+        return check
+    res = get_schedule().available_days(service_name, master_name, datetime.now(tz=tz), AVAILABILITY_DAYS)
+
+    # Кэшируем результат
+    update_cache_days(service_name, master_name, res)
+    return tuple(res)
+
+
+def update_cell(cell: str, value: str) -> bool:
+    """
+    Записывает значение в ячейку, повторяя временные ошибки: повтор записи того же значения безопасен,
+    даже если предыдущая попытка дошла до таблицы, а ответ потерялся
+
+    :param cell: Ячейка в A1 нотации с названием листа
+    :param value: Значение
+    :return: True, если запись выполнена; False - api отклонило запись или недоступно
+    """
+    try:
+        SHEETS_RETRY.call(sh.values_update, cell, params={'valueInputOption': 'RAW'}, body={'values': [[value]]})
+    except (gspread.exceptions.APIError, ServiceUnavailable) as e:
+        # результат неизвестен: при следующем изменении таблицы лист перечитается в зеркало
+        print(f"[ERROR] Failed to update cell {cell}: {e}")
+        return False
+    return True
+
+
 def time_score(func):
     """Декоратор для трекинга времени выполнения функции"""
 
@@ -134,125 +419,33 @@ def time_score(func):
     return wrapper
 
 
-class GoogleSheets:
+class GoogleSheets(SessionState):
     """Взаимодействие с GoogleSheet"""
 
-    def __init__(self, client_id: str):
-        # уникальный идентификатор для создания объекта
-        self.client_id = client_id
-        # доступные даты
-        self.lst_currant_date = None
-        # доступное время
-        self.dct_currant_time = None
-        # записи клиента
-        self.lst_records = None
-
-        self.name_service = None
-        self.name_master = None
-        self.date_record = None
-        self.time_record = None
-
-    def __str__(self):
-        return f'Инфо о клиенте:\n' \
-               f'{self.client_id=}\n' \
-               f'{self.name_service=}\n' \
-               f'{self.name_master=}\n' \
-               f'{self.date_record=}\n' \
-               f'{self.time_record=}'
-
-    @retry(wait_exponential_multiplier=3000, wait_exponential_max=9000)
-    def get_all_days(self) -> list:
+    __slots__ = ()
+
+    @SHEETS_RETRY
+    def get_all_days(self) -> tuple:
         """Все доступные дни для записи на определенную услугу"""
 
         check = get_cache_days(self.name_service, self.name_master)
-        if check:
+        if check is not None:
             return check
+        return SHEET_FLIGHT.do(('days', self.name_service, self.name_master), _fetch_days,
+                               self.name_service, self.name_master)
 
-        @retry(wait_exponential_multiplier=3000, wait_exponential_max=3000)
-        def actual_date(sheet_obj, count_days=7) -> bool:
-            """
-            Проверяет по объекту листа актуальные даты для записи на ближайшие count_days дней,
-            а также наличие свободного времени.
-
-            :param sheet_obj: Объект листа (объект gspread)
-            :param count_days: Количество ближайших дней для поиска (int)
+    def get_day_counts(self) -> dict:
+        """Количество свободного времени по датам для выбранной услуги и мастера (из зеркала, без запросов к api)"""
+        heatmap = get_schedule().heatmap(self.name_service, self.name_master, datetime.now(tz=tz), AVAILABILITY_DAYS)
+        return {parse_date(title): count for title, count in heatmap.items()}
 
-            :return: True - есть доступные свободные слоты; False - все слоты заняты или нет актуальных дат
-            """
-            if sheet_obj.title in IGNOR_WORKSHEETS:
-                return False
-            try:
-                date_sheet = datetime.strptime(sheet_obj.title.strip(), '%d.%m.%y').date()
-            except Exception as ex:
-                print(ex)
-                print(sheet_obj.title, '- Добавьте лист в IGNOR_WORKSHEETS')
-                return False
-            date_today = datetime.now(tz=tz)
-            if not date_today.date() <= date_sheet <= (datetime.now(tz=tz).date() + timedelta(days=count_days)):
-                return False
-            with lock:
-                val = sheet_obj.get_all_records()
-            for dct in val:
-
-                if date_today.date() == date_sheet:
-                    if (self.name_master is not None and
-                        dct[NAME_COL_MASTER].strip() == self.name_master and
-                        dct[NAME_COL_SERVICE].strip() == self.name_service) or \
-                            (self.name_master is None and
-                             dct[NAME_COL_SERVICE].strip() == self.name_service):
-                        for k, v in dct.items():
-                            if str(v).strip() == '' and date_today.time() < datetime.strptime(k, '%H:%M').time():
-                                return sheet_obj.title
-                    continue
-
-                if (self.name_master is not None and dct[NAME_COL_MASTER].strip() == self.name_master and
-                    dct[NAME_COL_SERVICE].strip() == self.name_service) \
-                        or (self.name_master is None and dct[NAME_COL_SERVICE].strip() == self.name_service):
-                    for k, v in dct.items():
-                        if str(v).strip() == '':
-                            return sheet_obj.title
-            return False
-
-        worksheet_all = get_sheet_names()
-
-        with ThreadPoolExecutor(2) as executor:
-            res = executor.map(actual_date, worksheet_all)
-            res = list(filter(lambda x: type(x) is str, res))
-
-        # Кэшируем результат
-        update_cache_days(self.name_service, self.name_master, res)
-        return res
-
-    @retry(wait_exponential_multiplier=3000, wait_exponential_max=3000)
+    @SHEETS_RETRY
     def get_free_time(self) -> list:
         """Функция выгружает ВСЕ СВОБОДНОЕ ВРЕМЯ для определенной ДАТЫ"""
 
-        try:
-            with lock:
-                all_val = sh.worksheet(self.date_record).get_all_records()
-        except gspread.exceptions.WorksheetNotFound as not_found:
-            print(not_found, self.date_record, '- Дата занята/не найдена')
-            return []
-
-        if self.date_record == datetime.now(tz=tz).strftime('%d.%m.%y'):
-            lst = [k.strip() for i in all_val
-                   if (self.name_master is None and i[NAME_COL_SERVICE].strip() == self.name_service) or
-                   (self.name_master is not None and i[NAME_COL_SERVICE].strip() == self.name_service and
-                    i[NAME_COL_MASTER].strip() == self.name_master)
-                   for k, v in i.items() if str(v).strip() == '' and
-                   datetime.now(tz=tz).time() < datetime.strptime(k, '%H:%M').time()]
-        else:
-            lst = [k.strip() for i in all_val
-                   if (self.name_master is None and i[NAME_COL_SERVICE].strip() == self.name_service) or
-                   (self.name_master is not None and i[NAME_COL_SERVICE].strip() == self.name_service and
-                    i[NAME_COL_MASTER].strip() == self.name_master)
-                   for k, v in i.items() if str(v).strip() == '']
-
-        if len(lst) > 0:
-            lst = sorted(list(set(lst)))
-        return lst
-
-    @retry(wait_exponential_multiplier=3000, wait_exponential_max=3000)
+        return get_schedule().free_time(self.date_record, self.name_service, self.name_master,
+                                        datetime.now(tz=tz))
+
     def set_time(self, client_record='', search_criteria='') -> bool:
         """
         Производит в таблицу запись/отмену клиента
@@ -262,55 +455,85 @@ class GoogleSheets:
 
         :return: True, если операция прошла успешно; False, если произошла ошибка при выполнении операции
         """
+        # метод целиком не повторяется (запись не идемпотентна), повторяются только чтение и запись ячейки;
+        # ожидание квоты во всех запросах записи ограничено одним сроком
+        with SHEETS_LIMITER.priority(BOOKING), SHEETS_LIMITER.deadline(RATE_LIMIT_TIMEOUT_SECONDS):
+            # загрузка зеркала и листа, которого в нём нет, выполняется до блокировки записи
+            day = self._get_day()
+            if day is None:
+                return False
+            cells = day.slot_cells(self.name_service, self.name_master, self.time_record, search_criteria)
+            # токены на чтение каждой подходящей ячейки и запись берутся до блокировки листа
+            with SHEETS_LIMITER.reserve('get', len(cells), RATE_LIMIT_TIMEOUT_SECONDS), \
+                    SHEETS_LIMITER.reserve('put', 1, RATE_LIMIT_TIMEOUT_SECONDS), SHEET_LOCKS.write(self.date_record):
+                return self._set_time_cas(cells, client_record, search_criteria)
+
+    def _get_day(self) -> DaySchedule | None:
+        """
+        Расписание листа даты записи из зеркала; если листа или колонки времени в зеркале нет,
+        лист перечитывается целиком
+
+        :return: DaySchedule или None, если листа нет в таблице
+        """
+        day = get_schedule().get_day(self.date_record)
+        if day is not None and self.time_record in day.columns:
+            return day
         try:
-            with lock:
-                all_val = sh.worksheet(self.date_record).get_all_records()
-                print(f"[INFO] Retrieved {len(all_val)} records from worksheet.")
+            # лист + его записи; блокировка чтения не даёт загрузить лист посреди чужой записи
+            with SHEETS_LIMITER.reserve('get', 2, RATE_LIMIT_TIMEOUT_SECONDS), SHEET_LOCKS.read(self.date_record):
+                all_val = SHEETS_RETRY.call(lambda: sh.worksheet(self.date_record).get_all_records())
         except gspread.exceptions.WorksheetNotFound as not_found:
             print(f"[ERROR] {not_found} - Дата занята/не найдена: {self.date_record}")
-            return False
-
-        row_num = 1
-        for i in all_val:
-            row_num += 1
-            col_num = 0
-            print(f"[INFO] Checking row {row_num}: {i}")
-            # Match service and master (if applicable)
-            if (self.name_master is None and i[NAME_COL_SERVICE].strip() == self.name_service) or \
-                    (self.name_master is not None and i[NAME_COL_SERVICE].strip() == self.name_service and
-                     i[NAME_COL_MASTER].strip() == self.name_master):
-                for key_time, val_use in i.items():
-                    col_num += 1
-                    print(f"[INFO] Checking column {col_num}: {key_time.strip()} -> {val_use.strip()}")
-                    if key_time.strip() == self.time_record and val_use.strip() == search_criteria:
-                        if self.name_master is None:
-                            self.name_master = i[NAME_COL_MASTER].strip()
-
-                        print(f"[INFO] Found matching record: Row {row_num}, Column {col_num}")
-                        # Update the cell with client data
-                        try:
-                            sh.worksheet(self.date_record).update_cell(row_num, col_num, f'{client_record}')
-                            print(f"[INFO] Client record updated at Row {row_num}, Column {col_num}.")
-                        except Exception as e:
-                            print(f"[ERROR] Failed to update cell at Row {row_num}, Column {col_num}: {e}")
-                            return False
-
-                        # Update the list of records
-                        if (self.lst_records and search_criteria == '') or (self.lst_records and client_record == ''):
-                            record = [self.date_record, self.time_record, self.name_service, self.name_master]
-                            if search_criteria == '':
-                                self.lst_records.append(record)
-                                print(f"[INFO] Record added to lst_records: {record}")
-                            else:
-                                self.lst_records.remove(record)
-                                print(f"[INFO] Record removed from lst_records: {record}")
-                        return True
+            SCHEDULE.remove_day(self.date_record)
+            update_cache_date(self.name_service, self.date_record)
+            return None
+        print(f"[INFO] Retrieved {len(all_val)} records from worksheet.")
+        SCHEDULE.update_day(self.date_record, all_val)
+        return SCHEDULE.get_day(self.date_record)
+
+    def _set_time_cas(self, cells: list[tuple[int, int, str]], client_record: str, search_criteria: str) -> bool:
+        """
+        Запись/отмена клиента по координатам ячеек из зеркала расписания (compare-and-swap):
+        перед записью читается только одна ячейка, и если её значение уже изменилось,
+        пробуется следующая подходящая ячейка. Ячейка, в которой уже нужное значение
+        (запись дошла до таблицы, но ответ был потерян), считается успешной записью.
+        Вызывается под блокировкой записи листа.
+
+        :param cells: Подходящие ячейки (номер строки, номер колонки, имя мастера) - DaySchedule.slot_cells
+        """
+        for row_num, col_num, master in cells:
+            cell = absolute_range_name(self.date_record, rowcol_to_a1(row_num, col_num))
+            values = SHEETS_RETRY.call(sh.values_get, cell).get('values', [])
+            actual = str(values[0][0]).strip() if values and values[0] else ''
+            if actual == client_record.strip():
+                print(f"[INFO] Cell {cell} already holds {client_record!r}.")
+            elif actual != search_criteria.strip():
+                print(f"[INFO] Cell {cell} was changed: {actual!r}, trying next one.")
+                SCHEDULE.set_slot(self.date_record, self.time_record, self.name_service, master,
+                                  actual, search_criteria)
+                continue
+            elif update_cell(cell, client_record):
+                print(f"[INFO] Client record updated at Row {row_num}, Column {col_num}.")
+            else:
+                return False
+            self._apply_record(master, client_record, search_criteria)
+            return True
 
         print(f"[INFO] No matching record found for {self.time_record} with {search_criteria} at {self.date_record}.")
+        update_cache_date(self.name_service, self.date_record)
         return False
 
-    @retry(wait_exponential_multiplier=3000, wait_exponential_max=3000)
-    def get_record(self, client_record: str, count_days=7) -> list:
+    def _apply_record(self, master: str, client_record: str, search_criteria: str) -> None:
+        """Отражает успешную запись/отмену в зеркале, кэше дат и списке записей клиента"""
+        if self.name_master is None:
+            self.name_master = master
+        SCHEDULE.set_slot(self.date_record, self.time_record, self.name_service,
+                          self.name_master, client_record, search_criteria)
+        update_cache_date(self.name_service, self.date_record)
+        self.apply_record(client_record, search_criteria)
+
+    @SHEETS_RETRY
+    def get_record(self, client_record: str, count_days=AVAILABILITY_DAYS) -> list:
         """
         Находит все записи клиента на ближайшие <count_days> дней
 
@@ -319,43 +542,11 @@ class GoogleSheets:
 
         :return: Список - формата: [Дата, Время, Название услуги, Имя мастера]
         """
-        if self.lst_records:
-            return self.lst_records
-
-        @retry(wait_exponential_multiplier=3000, wait_exponential_max=3000)
-        def check_record(sheet_obj) -> None:
-            """Поиск брони клиента"""
-            if sheet_obj.title in IGNOR_WORKSHEETS:
-                return None
-            try:
-                date_sheet = datetime.strptime(sheet_obj.title, '%d.%m.%y')
-            except Exception as ex:
-                print(ex)
-                print(sheet_obj.title, '- Добавьте лист в IGNOR_WORKSHEETS')
-                return None
-            date_today = datetime.now(tz=tz)
-            if date_today.date() == date_sheet:
-                with lock:
-                    all_val = sheet_obj.get_all_records()
-                lst_records.extend(
-                    [sheet_obj.title.strip(), k.strip(), dct[NAME_COL_SERVICE].strip(), dct[NAME_COL_MASTER].strip()]
-                    for dct in all_val
-                    for k, v in dct.items()
-                    if v == client_record and k == date_today.time() < datetime.strptime(k, '%H:%M').time()
-                )
-
-            elif date_today.date() < date_sheet.date() <= (date_today + timedelta(days=count_days)).date():
-                with lock:
-                    all_val = sheet_obj.get_all_records()
-                lst_records.extend(
-                    [sheet_obj.title.strip(), k.strip(), dct[NAME_COL_SERVICE].strip(), dct[NAME_COL_MASTER].strip()]
-                    for dct in all_val
-                    for k, v in dct.items()
-                    if v == client_record
-                )
-
-        lst_records = []
-        with ThreadPoolExecutor(2) as executor:
-            executor.map(check_record, sh.worksheets())
+        lst_records = get_schedule().find_records(client_record, datetime.now(tz=tz), count_days)
         self.lst_records = lst_records
         return lst_records
+
+
+schedule_thread = Thread(target=refresh_schedule_loop)
+schedule_thread.daemon = True
+schedule_thread.start()
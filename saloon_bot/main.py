@@ -7,66 +7,69 @@ from telebot.types import CallbackQuery, ReplyKeyboardRemove, \
     ReplyKeyboardMarkup, InlineKeyboardMarkup, InlineKeyboardButton
 from config import TOKEN
 import telebot_calendar
-from google_sheet import GoogleSheets, get_cache_services
+from google_sheet import GoogleSheets, get_cache_services, warm_up
+from retry_policy import ServiceUnavailable
 from keyboards import create_markup_menu, button_to_menu
 import clear_dict
+from callback_router import CallbackRouter
+from session_state import shared_dates
+from dispatcher import ChatDispatcher
+from client_info import CLIENT_PHONE, get_client_id
 
 bot = TeleBot(TOKEN)
-
-CLIENT_PHONE = {467168798: '+79522600066', 288041146: '+79215528067'}  # sql сделать
-
-
-def get_client_id(client_id, client_username) -> str:
-    """Создаёт строку записи пользователя
-
-    :param client_id: id чата/пользователя
-    :param client_username: username пользователя
-    :return: 'id: id @username tel: phone'"""
-    id_client = f"id: {str(client_id)}\n@{str(client_username)}\n"
-    if CLIENT_PHONE.get(client_id, None) is not None:
-        if CLIENT_PHONE[client_id] != '':
-            id_client += 'tel: ' + CLIENT_PHONE[client_id]
-        else:
-            id_client += 'tel: None'
-    return id_client
+# все callback запросы проходят через один маршрутизатор
+router = CallbackRouter()
+router.install(bot)
+# сессии из внешнего хранилища восстанавливаются в объекты GoogleSheets
+clear_dict.CLIENT_DICT.factory = GoogleSheets
 
 
 def create_client(chat_id) -> GoogleSheets:
     """Создает объект GoogleSheet для пользователя"""
-    print(clear_dict.CLIENT_DICT.get(chat_id))
-    if clear_dict.CLIENT_DICT.get(chat_id):
-        return clear_dict.CLIENT_DICT[chat_id]
+    client = clear_dict.CLIENT_DICT.get(chat_id)
+    print(client)
+    if client:
+        return client
     client = GoogleSheets(chat_id)
     clear_dict.CLIENT_DICT[chat_id] = client
-    clear_dict.TIMER_DICT[chat_id] = datetime.now()
     return client
 
 
+@router.on_error(ServiceUnavailable)
+def sheets_unavailable(call, ex):
+    """Google Sheets недоступен: сообщаем клиенту вместо бесконечного ожидания"""
+    print(f"[ERROR] {call.data}: {ex}")
+    bot.answer_callback_query(call.id, 'Сервис записи временно недоступен 😔\nПопробуйте через минуту.',
+                              show_alert=True)
+
+
 @bot.message_handler(commands=['start'])
 def check_phone_number(message):
     """Запрашивает номер телефона у пользователя единожды"""
 
-    if CLIENT_PHONE.get(message.chat.id, None) is None:
+    if CLIENT_PHONE.get(message.chat.id) is None:
         markup = ReplyKeyboardMarkup(one_time_keyboard=True, resize_keyboard=True)
         button_phone = types.KeyboardButton(text="Отправить телефон 📞",
                                             request_contact=True)
         markup.add(button_phone)
         bot.send_message(message.chat.id, 'Для записи на услуги требуется номер телефона.',
                          reply_markup=markup)
-
-        @bot.message_handler(content_types=['contact'])
-        def contact(message_contact):
-            """Получает объект <contact> -> вызывает функцию стартового меню"""
-            if message_contact.contact is not None:
-                CLIENT_PHONE[message_contact.chat.id] = message_contact.contact.phone_number
-                bot.send_message(message_contact.chat.id,
-                                 text='Спасибо за доверие!',
-                                 reply_markup=ReplyKeyboardRemove())
-                menu(message_contact)
     else:
         menu(message)
 
 
+@bot.message_handler(content_types=['contact'])
+def contact(message_contact):
+    """Получает объект <contact> -> вызывает функцию стартового меню"""
+    if message_contact.contact is not None:
+        CLIENT_PHONE.set(message_contact.chat.id, message_contact.contact.phone_number,
+                         message_contact.from_user.username)
+        bot.send_message(message_contact.chat.id,
+                         text='Спасибо за доверие!',
+                         reply_markup=ReplyKeyboardRemove())
+        menu(message_contact)
+
+
 @bot.message_handler(content_types=['text'])
 def any_word_before_number(message_any):
     """Обработчик любых текстовых сообщений"""
@@ -82,7 +85,7 @@ def menu(message):
                      reply_markup=create_markup_menu())
 
 
-@bot.callback_query_handler(lambda call: call.data == 'CANCEL_RECORD')
+@router.exact('CANCEL_RECORD')
 def cancel_record(call):
     """
     InlineKeyboardMarkup - Выбор записи для отмены
@@ -90,6 +93,7 @@ def cancel_record(call):
     client = create_client(call.message.chat.id)
     client_id = get_client_id(call.message.chat.id, call.from_user.username)
     records = client.get_record(client_id)
+    clear_dict.CLIENT_DICT[call.message.chat.id] = client
     if len(records) != 0:
         markup = InlineKeyboardMarkup(row_width=1)
         markup.add(
@@ -111,7 +115,7 @@ def cancel_record(call):
         check_phone_number(call.message)
 
 
-@bot.callback_query_handler(lambda call: call.data.startswith('CANCEL'))
+@router.prefix('CANCEL')
 def approve_cancel(call):
     """
     Обработка inline callback запросов
@@ -128,7 +132,7 @@ def approve_cancel(call):
                           reply_markup=markup)
 
 
-@bot.callback_query_handler(lambda call: call.data.startswith('APPROVE'))
+@router.prefix('APPROVE')
 def set_cancel(call):
     """
     Обработка inline callback запросов
@@ -139,7 +143,9 @@ def set_cancel(call):
         client_info = client.lst_records[int(call.data.split()[1])]
         client.date_record, client.time_record, client.name_service, client.name_master = client_info
         client_id = get_client_id(call.message.chat.id, call.from_user.username)
-        if client.set_time('', client_id):
+        cancelled = client.set_time('', client_id)
+        clear_dict.CLIENT_DICT[call.from_user.id] = client
+        if cancelled:
             bot.edit_message_text(chat_id=call.message.chat.id,
                                   message_id=call.message.message_id,
                                   text='Запись отменена!')
@@ -152,13 +158,14 @@ def set_cancel(call):
         go_to_menu(call)
 
 
-@bot.callback_query_handler(lambda call: call.data == 'MY_RECORD')
+@router.exact('MY_RECORD')
 def show_record(call):
     """Показывает все записи клиента"""
     client = create_client(call.message.chat.id)
 
     client_id = get_client_id(call.message.chat.id, call.from_user.username)
     records = client.get_record(client_id)
+    clear_dict.CLIENT_DICT[call.message.chat.id] = client
     rec = ''
     if len(records) != 0:
         rec += 'Ближайшие записи:\n\n'
@@ -173,7 +180,7 @@ def show_record(call):
     check_phone_number(call.message)
 
 
-@bot.callback_query_handler(lambda call: call.data == 'RECORD')
+@router.exact('RECORD')
 def choice_service(call):
     """
     InlineKeyboardMarkup
@@ -193,7 +200,7 @@ def choice_service(call):
                           reply_markup=markup)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('SERVICE'))
+@router.prefix('SERVICE')
 def choice_master(call):
     """
     Обработка inline callback запросов
@@ -202,6 +209,7 @@ def choice_master(call):
     client = clear_dict.CLIENT_DICT.get(call.from_user.id)
     if client:
         client.name_service = call.data[len('SERVICE'):]
+        clear_dict.CLIENT_DICT[call.from_user.id] = client
         dct = get_cache_services()
         markup = InlineKeyboardMarkup(row_width=2)
         markup.add(*[InlineKeyboardButton(text=x,
@@ -218,7 +226,7 @@ def choice_master(call):
         go_to_menu(call)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('MASTER'))
+@router.prefix('MASTER')
 def choice_date(call):
     """
     Обработка inline callback запросов
@@ -231,7 +239,7 @@ def choice_date(call):
         else:
             client.name_master = None
         lst = client.get_all_days()
-        lst = list(map(lambda x: datetime.strptime(x, '%d.%m.%y').date(), lst))
+        lst = shared_dates(lst)
         if len(lst) == 0:
             service = client.name_service if client.name_service else 'ЛЮБОЙ'
             markup = InlineKeyboardMarkup(row_width=2)
@@ -243,19 +251,20 @@ def choice_date(call):
                                   reply_markup=markup)
         else:
             client.lst_currant_date = lst
+            clear_dict.CLIENT_DICT[call.from_user.id] = client
             clear_dict.CALENDAR_DICT[call.message.chat.id] = str(call.message.chat.id)
             bot.edit_message_text(chat_id=call.from_user.id,
                                   message_id=call.message.message_id,
-                                  text='Выбери доступную дату:\n ✅ - есть свободное время',
+                                  text='Выбери доступную дату:\n ✅N - есть свободное время (N окон)',
                                   reply_markup=telebot_calendar.create_calendar(
                                       name='CALENDAR' + clear_dict.CALENDAR_DICT[call.message.chat.id],
-                                      lst_current_date=lst)
+                                      lst_current_date=lst, counts=client.get_day_counts())
                                   )
     else:
         go_to_menu(call)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('CALENDAR'))
+@router.prefix('CALENDAR')
 def choice_time(call: CallbackQuery):
     """
     Обработка inline callback запросов
@@ -267,17 +276,19 @@ def choice_time(call: CallbackQuery):
     if client:
         lst = client.lst_currant_date
         # At this point, we are sure that this calendar is ours. So we cut the line by the separator of our calendar
-        name, action, year, month, day = call.data.split(':')
+        name, (action, year, month, day) = telebot_calendar.parse_calendar_data(call.data)
         # Processing the calendar. Get either the date or None if the buttons are of a different type
         telebot_calendar.calendar_query_handler(
             bot=bot, call=call, name=name, action=action, year=year, month=month, day=day,
-            lst_currant_date=lst
+            lst_currant_date=lst,
+            counts=client.get_day_counts() if action in telebot_calendar.NAVIGATION_ACTIONS else None
         )
 
         if action == "DAY":
             client.date_record = datetime(int(year), int(month), int(day)).strftime('%d.%m.%y')
             lst_times = client.get_free_time()
             client.dct_currant_time = lst_times
+            clear_dict.CLIENT_DICT[call.from_user.id] = client
 
             markup = InlineKeyboardMarkup(row_width=3)
             markup.add(*[InlineKeyboardButton(text=x,
@@ -304,7 +315,7 @@ def choice_time(call: CallbackQuery):
         go_to_menu(call)
 
 
-@bot.callback_query_handler(lambda call: call.data.startswith('TIME'))
+@router.prefix('TIME')
 def approve_record(call):
     print(f"Received call data: {call.data}")
 
@@ -314,6 +325,7 @@ def approve_record(call):
         print(f"Received call data: {call.data}")
 
         client.time_record = call.data[len('TIME'):]
+        clear_dict.CLIENT_DICT[call.from_user.id] = client
 
         # Build the response text
         text = f'Проверьте данные записи:\n\n' \
@@ -342,7 +354,7 @@ def approve_record(call):
 
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('APP_REC'))
+@router.prefix('APP_REC')
 def set_time(call):
     """
     Обработка inline callback запросов
@@ -351,7 +363,9 @@ def set_time(call):
     client = clear_dict.CLIENT_DICT.get(call.from_user.id)
     if client:
         id_client = get_client_id(call.message.chat.id, call.from_user.username)
-        if client.set_time(id_client):  # Если запись успешно установлена
+        recorded = client.set_time(id_client)
+        clear_dict.CLIENT_DICT[call.from_user.id] = client
+        if recorded:  # Если запись успешно установлена
             # Формируем новый текст для подтверждения
             new_text = f'Успешно записал вас!\n\n' \
                        f'🛎️ Услуга: {client.name_service}\n' \
@@ -372,7 +386,7 @@ def set_time(call):
     else:
         go_to_menu(call)  # В случае ошибки возвращаем в меню
 
-@bot.callback_query_handler(func=lambda call: call.data == 'MENU')
+@router.exact('MENU')
 def go_to_menu(call):
     """Возвращает в главное меню"""
     try:
@@ -383,5 +397,9 @@ def go_to_menu(call):
     check_phone_number(call.message)
 
 
-
-bot.infinity_polling()
+if __name__ == '__main__':
+    # первый пользователь после запуска не должен ждать загрузки таблицы
+    warm_up()
+    # обновления одного чата обрабатываются по очереди, разных чатов - параллельно
+    ChatDispatcher().install(bot)
+    bot.infinity_polling()
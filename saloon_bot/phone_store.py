@@ -0,0 +1,70 @@
+"""
+Хранилище телефонов и профилей клиентов в SQLite с LRU-кэшем для чтения.
+Кэшируются только найденные клиенты: отсутствие в базе каждый раз проверяется запросом,
+иначе телефон, сохранённый другим процессом бота, оставался бы невидимым
+"""
+import sqlite3
+from datetime import datetime
+from threading import Lock
+from cachetools import LRUCache
+
+
+class PhoneStore:
+    """Телефоны клиентов по chat id, переживают перезапуск бота"""
+
+    def __init__(self, path: str, cache_size=4096):
+        """
+        :param path: Путь к файлу базы SQLite (':memory:' - в памяти)
+        :param cache_size: Количество клиентов в LRU-кэше
+        """
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('CREATE TABLE IF NOT EXISTS clients ('
+                           'chat_id INTEGER PRIMARY KEY, '
+                           'phone TEXT NOT NULL, '
+                           'username TEXT, '
+                           'updated_at TEXT NOT NULL)')
+        self._conn.commit()
+        self._cache = LRUCache(maxsize=cache_size)
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, chat_id: int) -> str | None:
+        """
+        Телефон клиента
+
+        :param chat_id: id чата/пользователя
+        :return: Номер телефона ('' - клиент не поделился номером) или None, если клиента нет
+        """
+        with self._lock:
+            phone = self._cache.get(chat_id)
+            if phone is not None:
+                self.hits += 1
+                return phone
+            self.misses += 1
+            row = self._conn.execute('SELECT phone FROM clients WHERE chat_id = ?', (chat_id,)).fetchone()
+            if row is None:
+                return None
+            self._cache[chat_id] = row[0]
+            return row[0]
+
+    def set(self, chat_id: int, phone: str, username: str | None = None) -> None:
+        """
+        Сохраняет телефон клиента
+
+        :param chat_id: id чата/пользователя
+        :param phone: Номер телефона
+        :param username: username пользователя
+        """
+        with self._lock:
+            self._conn.execute('INSERT INTO clients (chat_id, phone, username, updated_at) VALUES (?, ?, ?, ?) '
+                               'ON CONFLICT(chat_id) DO UPDATE SET phone = excluded.phone, '
+                               'username = excluded.username, updated_at = excluded.updated_at',
+                               (chat_id, phone, username, datetime.now().isoformat()))
+            self._conn.commit()
+            self._cache[chat_id] = phone
+
+    def close(self) -> None:
+        """Закрывает соединение с базой"""
+        with self._lock:
+            self._conn.close()
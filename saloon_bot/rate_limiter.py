@@ -0,0 +1,252 @@
+"""
+Ограничение частоты запросов к Google Sheets API на стороне клиента:
+токен-бакеты с отдельными квотами на чтение и запись и приоритетом записи клиентов над просмотром
+"""
+from contextlib import contextmanager
+from threading import Condition, Lock, local
+from time import monotonic
+from retry_policy import ServiceUnavailable
+
+# Приоритеты запросов (меньше - важнее)
+BOOKING = 0
+BROWSE = 1
+BACKGROUND = 2
+PRIORITY_NAMES = ('booking', 'browse', 'background')
+# Ожидание в очереди дольше этого времени (в секундах) выводится в лог
+LOG_WAIT_SECONDS = 1.0
+
+
+class RateLimitTimeout(ServiceUnavailable):
+    """Токен квоты не получен за отведённое время (не повторяется: квота не освободится от повтора)"""
+
+
+class TokenBucket:
+    """
+    Токен-бакет: rate токенов в секунду, не больше capacity в запасе.
+    Пока токен ждёт запрос с более высоким приоритетом, менее важные запросы его не забирают.
+    """
+
+    def __init__(self, name: str, rate: float, capacity: float, clock=monotonic):
+        """
+        :param name: Название квоты (для метрик)
+        :param rate: Пополнение в токенах в секунду
+        :param capacity: Максимальный запас токенов (допустимый всплеск запросов)
+        :param clock: Источник времени в секундах
+        """
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._cond = Condition(Lock())
+        self._tokens = capacity
+        self._updated = clock()
+        # до этого момента токены не выдаются (api ответило превышением квоты)
+        self._paused_until = 0.0
+        self._waiting = [0] * len(PRIORITY_NAMES)
+        self.acquired = 0
+        self.throttled = [0] * len(PRIORITY_NAMES)
+        self.wait_seconds = 0.0
+        self.quota_errors = 0
+
+    def _refill(self, now: float) -> None:
+        """Начисляет токены за прошедшее время"""
+        if now > self._updated:
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+    def _delay(self, now: float) -> float:
+        """Время до появления свободного токена"""
+        if now < self._paused_until:
+            return self._paused_until - now
+        return max(0.0, (1 - self._tokens) / self.rate)
+
+    def acquire(self, priority: int = BROWSE, timeout: float | None = None) -> float:
+        """
+        Забирает токен, при необходимости ожидая его появления
+
+        :param priority: Приоритет запроса (BOOKING, BROWSE, BACKGROUND)
+        :param timeout: Максимальное ожидание в секундах (None - без ограничения)
+        :return: Время ожидания в секундах
+        """
+        with self._cond:
+            start = self._clock()
+            throttled = False
+            self._waiting[priority] += 1
+            try:
+                while True:
+                    now = self._clock()
+                    self._refill(now)
+                    delay = self._delay(now)
+                    if not delay and not any(self._waiting[:priority]):
+                        self._tokens -= 1
+                        break
+                    # токен достанется более важному запросу - ждём, пока он его заберёт
+                    wait = delay or 1 / self.rate
+                    if timeout is not None:
+                        left = start + timeout - now
+                        if left <= 0:
+                            raise RateLimitTimeout(f'{self.name}: no token in {timeout} seconds')
+                        wait = min(wait, left)
+                    throttled = True
+                    self._cond.wait(wait)
+            finally:
+                self._waiting[priority] -= 1
+                self._cond.notify_all()
+            waited = self._clock() - start if throttled else 0.0
+            self.acquired += 1
+            if throttled:
+                self.throttled[priority] += 1
+                self.wait_seconds += waited
+        if waited >= LOG_WAIT_SECONDS:
+            print(f"[WARNING] Sheets {self.name} quota: {PRIORITY_NAMES[priority]} request "
+                  f"waited {round(waited, 2)} seconds")
+        return waited
+
+    def release(self, count: int) -> None:
+        """Возвращает неиспользованные токены"""
+        with self._cond:
+            self._tokens = min(self.capacity, self._tokens + count)
+            self._cond.notify_all()
+
+    def pause(self, seconds: float) -> None:
+        """
+        Останавливает выдачу токенов (api ответило 429): все потоки ждут вместе, а не повторяют запросы
+
+        :param seconds: Длительность паузы в секундах
+        """
+        with self._cond:
+            now = self._clock()
+            self._paused_until = max(self._paused_until, now + seconds)
+            # после паузы квота набирается заново, без всплеска накопленных токенов
+            self._tokens = min(self._tokens, 0.0)
+            self._updated = self._paused_until
+            self.quota_errors += 1
+        print(f"[WARNING] Sheets {self.name} quota exceeded, requests paused for {seconds} seconds")
+
+    def stats(self) -> dict:
+        """Метрики: выданные токены, ожидания по приоритетам, суммарное ожидание, ответы 429"""
+        with self._cond:
+            return {'acquired': self.acquired,
+                    'throttled': dict(zip(PRIORITY_NAMES, self.throttled)),
+                    'wait_seconds': round(self.wait_seconds, 3),
+                    'quota_errors': self.quota_errors,
+                    'waiting': sum(self._waiting)}
+
+
+class SheetsRateLimiter:
+    """Общие квоты на чтение и запись для всех запросов к таблице"""
+
+    def __init__(self, reads_per_minute: int, writes_per_minute: int, burst_seconds: float = 10, clock=monotonic):
+        """
+        :param reads_per_minute: Квота чтения в минуту
+        :param writes_per_minute: Квота записи в минуту
+        :param burst_seconds: Запас токенов в секундах квоты (допустимый всплеск запросов)
+        :param clock: Источник времени в секундах
+        """
+        self.read = TokenBucket('read', reads_per_minute / 60, max(1.0, reads_per_minute / 60 * burst_seconds),
+                                clock)
+        self.write = TokenBucket('write', writes_per_minute / 60, max(1.0, writes_per_minute / 60 * burst_seconds),
+                                 clock)
+        self._clock = clock
+        self._local = local()
+
+    @property
+    def current_priority(self) -> int:
+        """Приоритет запросов текущего потока"""
+        return getattr(self._local, 'priority', BROWSE)
+
+    @contextmanager
+    def priority(self, priority: int):
+        """Запросы текущего потока внутри блока выполняются с приоритетом priority"""
+        previous = self.current_priority
+        # вложенный блок не понижает приоритет (например, чтение зеркала при записи клиента)
+        self._local.priority = min(previous, priority)
+        try:
+            yield
+        finally:
+            self._local.priority = previous
+
+    @contextmanager
+    def deadline(self, seconds: float):
+        """
+        Общий срок ожидания токенов для всех запросов текущего потока внутри блока
+        (например, для всех попыток одного вызова); вложенный блок срок не продлевает
+
+        :param seconds: Максимальное суммарное ожидание в секундах
+        """
+        previous = getattr(self._local, 'deadline', None)
+        deadline = self._clock() + seconds
+        self._local.deadline = deadline if previous is None else min(previous, deadline)
+        try:
+            yield
+        finally:
+            self._local.deadline = previous
+
+    def _timeout(self, timeout: float | None) -> float | None:
+        """Ожидание токена с учётом общего срока текущего потока"""
+        deadline = getattr(self._local, 'deadline', None)
+        if deadline is None:
+            return timeout
+        left = max(0.0, deadline - self._clock())
+        return left if timeout is None else min(timeout, left)
+
+    def _credit(self) -> dict:
+        """Заранее полученные токены текущего потока по названию квоты"""
+        credit = getattr(self._local, 'credit', None)
+        if credit is None:
+            credit = self._local.credit = {}
+        return credit
+
+    @contextmanager
+    def reserve(self, method: str, count: int = 1, timeout: float | None = None):
+        """
+        Забирает count токенов заранее - до захвата блокировок листов, чтобы поток не ждал квоту,
+        удерживая блокировку, которую ждёт более важный запрос. Запросы текущего потока внутри блока
+        расходуют их без ожидания, неиспользованные токены возвращаются в квоту.
+
+        :param method: HTTP метод запросов
+        :param count: Количество токенов
+        :param timeout: Максимальное ожидание всех токенов в секундах (None - без ограничения)
+        :raise RateLimitTimeout: Токены не получены за timeout (уже полученные возвращаются в квоту)
+        """
+        bucket = self.bucket(method)
+        timeout = self._timeout(timeout)
+        deadline = None if timeout is None else self._clock() + timeout
+        for taken in range(count):
+            try:
+                bucket.acquire(self.current_priority, None if deadline is None else max(0.0, deadline - self._clock()))
+            except RateLimitTimeout:
+                bucket.release(taken)
+                raise
+        credit = self._credit()
+        credit[bucket.name] = credit.get(bucket.name, 0) + count
+        try:
+            yield
+        finally:
+            unused = min(count, credit[bucket.name])
+            credit[bucket.name] -= unused
+            if unused:
+                bucket.release(unused)
+
+    def bucket(self, method: str) -> TokenBucket:
+        """Квота по HTTP методу: GET - чтение, остальные - запись"""
+        return self.read if method.lower() == 'get' else self.write
+
+    def acquire(self, method: str, timeout: float | None = None) -> float:
+        """
+        Забирает токен квоты для запроса с приоритетом текущего потока
+
+        :param method: HTTP метод запроса
+        :param timeout: Максимальное ожидание в секундах
+        :return: Время ожидания в секундах
+        """
+        bucket = self.bucket(method)
+        credit = self._credit()
+        if credit.get(bucket.name):
+            credit[bucket.name] -= 1
+            return 0.0
+        return bucket.acquire(self.current_priority, self._timeout(timeout))
+
+    def stats(self) -> dict:
+        """Метрики квот чтения и записи"""
+        return {'read': self.read.stats(), 'write': self.write.stats()}
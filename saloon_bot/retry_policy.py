@@ -0,0 +1,225 @@
+"""
+Повторы запросов к Google Sheets API: ограниченное число попыток с полным джиттером,
+повторяются только временные ошибки; автомат-предохранитель (circuit breaker) при деградации api
+"""
+import asyncio
+import inspect
+import random
+from contextlib import nullcontext
+from functools import wraps
+from threading import Lock
+from time import monotonic, sleep
+from typing import Callable
+
+# HTTP статусы временных ошибок api: превышение квоты и ошибки серверов Google
+TRANSIENT_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class ServiceUnavailable(Exception):
+    """Api недоступно: попытки исчерпаны или предохранитель разомкнут"""
+
+
+class CircuitOpenError(ServiceUnavailable):
+    """Предохранитель разомкнут, запрос к api не выполнялся"""
+
+
+class RetryError(ServiceUnavailable):
+    """Все попытки завершились временной ошибкой (исходная ошибка в __cause__)"""
+
+
+class CircuitBreaker:
+    """
+    Предохранитель: после failure_threshold временных ошибок подряд запросы не выполняются reset_seconds секунд,
+    затем пропускается один пробный запрос; его успех замыкает предохранитель, ошибка снова размыкает
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float, clock=monotonic):
+        """
+        :param failure_threshold: Временных ошибок подряд до размыкания
+        :param reset_seconds: Время в разомкнутом состоянии до пробного запроса
+        :param clock: Источник времени в секундах
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+        self._lock = Lock()
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self.opened = 0
+        self.rejected = 0
+
+    def allow(self) -> bool:
+        """Можно ли выполнить запрос (в полуоткрытом состоянии - только один пробный)"""
+        with self._lock:
+            if self.state == OPEN and self._clock() - self._opened_at >= self.reset_seconds:
+                self.state = HALF_OPEN
+                return True
+            if self.state == CLOSED:
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        """Api ответило: предохранитель замыкается"""
+        with self._lock:
+            self.state = CLOSED
+            self._failures = 0
+
+    def record_failure(self) -> None:
+        """Временная ошибка api"""
+        with self._lock:
+            self._failures += 1
+            if self.state == HALF_OPEN or (self.state == CLOSED and self._failures >= self.failure_threshold):
+                self.state = OPEN
+                self._opened_at = self._clock()
+                self.opened += 1
+                print(f"[WARNING] Sheets api circuit opened for {self.reset_seconds} seconds "
+                      f"after {self._failures} failures")
+
+    def check(self) -> None:
+        """Исключение CircuitOpenError, если запрос выполнять нельзя"""
+        if not self.allow():
+            raise CircuitOpenError('Sheets api circuit is open')
+
+    def stats(self) -> dict:
+        """Метрики: состояние, ошибки подряд, размыкания, отклонённые запросы"""
+        with self._lock:
+            return {'state': self.state, 'failures': self._failures, 'opened': self.opened,
+                    'rejected': self.rejected}
+
+
+class RetryPolicy:
+    """
+    Декоратор повторов: не больше attempts попыток, пауза перед повтором - случайная
+    в [0, min(max_delay, base_delay * 2 ** попытка)] (full jitter), повторяются только ошибки is_transient.
+    ServiceUnavailable не повторяется, поэтому вложенные вызовы не умножают число попыток.
+    Корутинные функции повторяются с asyncio.sleep.
+    """
+
+    def __init__(self, attempts: int, base_delay: float, max_delay: float,
+                 is_transient: Callable[[BaseException], bool], sleep=sleep, rand=random.uniform,
+                 async_sleep=asyncio.sleep, scope: Callable | None = None):
+        """
+        :param attempts: Максимальное число попыток
+        :param base_delay: Начальная пауза в секундах
+        :param max_delay: Максимальная пауза в секундах
+        :param is_transient: Является ли ошибка временной (429, 5xx, сетевые ошибки)
+        :param sleep: Функция ожидания
+        :param rand: Случайное число в интервале
+        :param async_sleep: Корутина ожидания (для корутинных функций)
+        :param scope: Контекстный менеджер на все попытки одного вызова (например, общий срок ожидания квоты)
+        """
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.is_transient = is_transient
+        self._sleep = sleep
+        self._rand = rand
+        self._async_sleep = async_sleep
+        self._scope = scope or nullcontext
+        self._lock = Lock()
+        self.retries = 0
+        self.exhausted = 0
+        self.fallbacks = 0
+
+    def delay(self, attempt: int) -> float:
+        """Пауза перед повтором после попытки attempt (с нуля)"""
+        return self._rand(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _retry_delay(self, func, attempt: int, ex: Exception) -> float:
+        """
+        Пауза перед следующей попыткой после ошибки ex (вызывается из except)
+
+        :raise: ex, если ошибка не временная; RetryError, если попытки исчерпаны
+        """
+        if isinstance(ex, ServiceUnavailable) or not self.is_transient(ex):
+            raise ex
+        if attempt + 1 == self.attempts:
+            with self._lock:
+                self.exhausted += 1
+            raise RetryError(f'{func.__name__}: {self.attempts} attempts failed: {ex}') from ex
+        delay = self.delay(attempt)
+        print(f"[WARNING] {func.__name__} failed ({ex}), retry in {round(delay, 2)} seconds")
+        with self._lock:
+            self.retries += 1
+        return delay
+
+    def call(self, func, *args, **kwargs):
+        """
+        Выполняет func с повторами временных ошибок
+
+        :raise RetryError: Все попытки завершились временной ошибкой
+        """
+        with self._scope():
+            for attempt in range(self.attempts):
+                try:
+                    return func(*args, **kwargs)
+                except Exception as ex:
+                    delay = self._retry_delay(func, attempt, ex)
+                self._sleep(delay)
+
+    async def acall(self, func, *args, **kwargs):
+        """
+        Выполняет await func(...) с повторами временных ошибок
+
+        :raise RetryError: Все попытки завершились временной ошибкой
+        """
+        for attempt in range(self.attempts):
+            try:
+                return await func(*args, **kwargs)
+            except Exception as ex:
+                delay = self._retry_delay(func, attempt, ex)
+            await self._async_sleep(delay)
+
+    def __call__(self, func=None, *, fallback: Callable | None = None):
+        """
+        Декоратор: @policy или @policy(fallback=...)
+
+        :param fallback: Вызывается с аргументами функции, если api недоступно;
+            возвращает запасной результат (например, устаревший кэш) или None
+        """
+        if func is None:
+            return lambda f: self(f, fallback=fallback)
+
+        def serve_fallback(args, kwargs):
+            res = fallback(*args, **kwargs) if fallback is not None else None
+            if res is not None:
+                with self._lock:
+                    self.fallbacks += 1
+                print(f"[WARNING] {func.__name__}: Sheets api unavailable, serving cached data")
+            return res
+
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                try:
+                    return await self.acall(func, *args, **kwargs)
+                except ServiceUnavailable:
+                    res = serve_fallback(args, kwargs)
+                    if res is None:
+                        raise
+                    return res
+
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                return self.call(func, *args, **kwargs)
+            except ServiceUnavailable:
+                res = serve_fallback(args, kwargs)
+                if res is None:
+                    raise
+                return res
+
+        return wrapper
+
+    def stats(self) -> dict:
+        """Метрики: повторы, исчерпанные попытки, ответы из запасного кэша"""
+        with self._lock:
+            return {'retries': self.retries, 'exhausted': self.exhausted, 'fallbacks': self.fallbacks}
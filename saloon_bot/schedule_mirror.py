@@ -0,0 +1,412 @@
+"""
+Локальное зеркало расписания: структурированная копия всех листов-дат таблицы
+"""
+from datetime import datetime, date, time, timedelta
+from functools import lru_cache
+from threading import Lock
+from time import monotonic
+from typing import NamedTuple
+import numpy as np
+from sheet_config import AVAILABILITY_DAYS
+
+# Формат названия листа-даты
+DATE_FORMAT = '%d.%m.%y'
+# Формат заголовка колонки со временем
+TIME_FORMAT = '%H:%M'
+# Количество различных раскладок листов (заголовков и строк) в кэше
+LAYOUT_CACHE_SIZE = 64
+
+
+def parse_date(title: str) -> date | None:
+    """
+    Преобразует название листа в дату
+
+    :param title: Название листа
+    :return: date или None, если лист не является датой
+    """
+    try:
+        return datetime.strptime(title.strip(), DATE_FORMAT).date()
+    except ValueError:
+        return None
+
+
+def parse_time(header: str) -> time | None:
+    """
+    Преобразует заголовок колонки в время
+
+    :param header: Заголовок колонки
+    :return: time или None, если колонка не является временем
+    """
+    try:
+        return datetime.strptime(header.strip(), TIME_FORMAT).time()
+    except ValueError:
+        return None
+
+
+def values_to_records(values: list[list]) -> list[dict]:
+    """
+    Преобразует значения листа (values.batchGet) в записи формата get_all_records()
+
+    :param values: Строки листа, первая строка - заголовки
+    :return: Список словарей {заголовок: значение}
+    """
+    if not values:
+        return []
+    headers = values[0]
+    width = len(headers)
+    return [dict(zip(headers, row + [''] * (width - len(row))))
+            for row in values[1:]]
+
+
+class ColumnLayout(NamedTuple):
+    """Раскладка колонок листа, общая для всех листов с одинаковой строкой заголовков"""
+    # номера колонок на листе (с 1) по заголовку
+    columns: dict[str, int]
+    # (ключ записи, заголовок) колонок со временем в порядке следования на листе
+    time_keys: tuple[tuple[str, str], ...]
+    # заголовки колонок со временем в порядке следования на листе
+    times: tuple[str, ...]
+    parsed_times: dict[str, time]
+    # заголовки колонок со временем по возрастанию времени (колонки матрицы свободных слотов)
+    slot_times: tuple[str, ...]
+    slot_index: dict[str, int]
+    slot_minutes: np.ndarray
+
+
+class RowLayout(NamedTuple):
+    """Индексы строк листа, общие для всех листов с одинаковыми парами (услуга, мастер)"""
+    by_service: dict[str, list[int]]
+    by_master: dict[tuple[str, str], list[int]]
+    service_rows: dict[str, np.ndarray]
+    master_rows: dict[tuple[str, str], np.ndarray]
+
+
+@lru_cache(maxsize=LAYOUT_CACHE_SIZE)
+def column_layout(headers: tuple[str, ...], col_service: str, col_master: str) -> ColumnLayout:
+    """
+    Разбирает строку заголовков листа один раз для всех листов с такими же заголовками
+
+    :param headers: Ключи записей листа (заголовки в порядке колонок)
+    """
+    parsed_times = {}
+    time_keys = []
+    for key in headers:
+        if key in (col_service, col_master):
+            continue
+        header = key.strip()
+        if header not in parsed_times:
+            parsed = parse_time(header)
+            if parsed is None:
+                continue
+            parsed_times[header] = parsed
+        time_keys.append((key, header))
+    times = tuple(parsed_times)
+    slot_times = tuple(sorted(times, key=parsed_times.__getitem__))
+    slot_minutes = np.array([parsed_times[key].hour * 60 + parsed_times[key].minute for key in slot_times],
+                            dtype=np.int16)
+    slot_minutes.flags.writeable = False
+    return ColumnLayout({key.strip(): col_num for col_num, key in enumerate(headers, 1)}, tuple(time_keys),
+                        times, parsed_times, slot_times, {key: ind for ind, key in enumerate(slot_times)},
+                        slot_minutes)
+
+
+@lru_cache(maxsize=LAYOUT_CACHE_SIZE)
+def row_layout(keys: tuple[tuple[str, str], ...]) -> RowLayout:
+    """
+    Индексы строк листа по услуге и мастеру, один раз для всех листов с такими же строками
+
+    :param keys: Пары (услуга, мастер) строк листа по порядку
+    """
+    by_service = {}
+    by_master = {}
+    for ind, (service, master) in enumerate(keys):
+        by_service.setdefault(service, []).append(ind)
+        by_master.setdefault((service, master), []).append(ind)
+    service_rows = {key: np.array(lst, dtype=np.intp) for key, lst in by_service.items()}
+    master_rows = {key: np.array(lst, dtype=np.intp) for key, lst in by_master.items()}
+    for rows in (*service_rows.values(), *master_rows.values()):
+        rows.flags.writeable = False
+    return RowLayout(by_service, by_master, service_rows, master_rows)
+
+
+class DaySchedule:
+    """Расписание одного листа-даты с индексами по услуге, мастеру и времени"""
+
+    def __init__(self, title: str, records: list[dict], col_service: str, col_master: str):
+        self.title = title.strip()
+        self.date = parse_date(self.title)
+        # раскладка колонок - общая для листов с одинаковыми заголовками, не изменять
+        layout = column_layout(tuple(records[0]) if records else (), col_service, col_master)
+        self.columns = layout.columns
+        self.times = layout.times
+        self.parsed_times = layout.parsed_times
+        # строки листа: [услуга, мастер, {время: значение}]
+        self.rows = [[str(record.get(col_service, '')).strip(), str(record.get(col_master, '')).strip(),
+                      {header: str(record.get(key, '')).strip() for key, header in layout.time_keys}]
+                     for record in records]
+        # индексы строк по услуге и по паре (услуга, мастер) - общие для листов с одинаковыми строками
+        rows = row_layout(tuple((service, master) for service, master, _ in self.rows))
+        self.by_service = rows.by_service
+        self.by_master = rows.by_master
+        self.service_rows = rows.service_rows
+        self.master_rows = rows.master_rows
+
+        # матрица свободных слотов: строки листа x колонки времени по возрастанию
+        self.slot_times = layout.slot_times
+        self.slot_index = layout.slot_index
+        self.slot_minutes = layout.slot_minutes
+        self.free = np.array([[slots[key] == '' for key in self.slot_times] for _, _, slots in self.rows],
+                             dtype=bool).reshape(len(self.rows), len(self.slot_times))
+
+    def row_indexes(self, service: str, master: str | None) -> list[int]:
+        """Индексы строк для услуги и мастера (None - любой мастер)"""
+        if master is None:
+            return self.by_service.get(service, [])
+        return self.by_master.get((service, master), [])
+
+    def free_mask(self, service: str, master: str | None, after: time | None = None) -> np.ndarray:
+        """
+        Маска свободного времени (по self.slot_times) для услуги и мастера
+
+        :param service: Название услуги
+        :param master: Имя мастера (None - любой мастер)
+        :param after: Учитывать только время позже указанного
+        """
+        rows = self.service_rows.get(service) if master is None else self.master_rows.get((service, master))
+        if rows is None:
+            return np.zeros(len(self.slot_times), dtype=bool)
+        mask = self.free[rows].any(axis=0)
+        if after is not None:
+            mask &= self.slot_minutes > after.hour * 60 + after.minute
+        return mask
+
+    def free_times(self, service: str, master: str | None, after: time | None = None) -> list[str]:
+        """
+        Свободное время для услуги и мастера
+
+        :param service: Название услуги
+        :param master: Имя мастера (None - любой мастер)
+        :param after: Учитывать только время позже указанного
+        :return: Отсортированный список свободного времени
+        """
+        return [self.slot_times[ind] for ind in np.flatnonzero(self.free_mask(service, master, after))]
+
+    def free_count(self, service: str, master: str | None, after: time | None = None) -> int:
+        """Количество свободного времени для услуги и мастера"""
+        return int(np.count_nonzero(self.free_mask(service, master, after)))
+
+    def has_free(self, service: str, master: str | None, after: time | None = None) -> bool:
+        """Есть ли хотя бы один свободный слот для услуги и мастера"""
+        return bool(self.free_mask(service, master, after).any())
+
+    def refresh_slot(self, ind: int, time_record: str) -> None:
+        """Обновляет матрицу свободных слотов после изменения ячейки строки ind"""
+        col = self.slot_index.get(time_record)
+        if col is not None:
+            self.free[ind, col] = self.rows[ind][2][time_record] == ''
+
+    def slot_cells(self, service: str, master: str | None, time_record: str, value: str) -> list[tuple[int, int, str]]:
+        """
+        Координаты ячеек на листе, подходящих для записи/отмены
+
+        :param service: Название услуги
+        :param master: Имя мастера (None - любой мастер)
+        :param time_record: Время
+        :param value: Ожидаемое значение ячейки
+        :return: Список (номер строки, номер колонки, имя мастера), нумерация с 1 как в таблице
+        """
+        col_num = self.columns.get(time_record)
+        if col_num is None:
+            return []
+        value = value.strip()
+        # первая строка листа - заголовки
+        return [(ind + 2, col_num, self.rows[ind][1]) for ind in self.row_indexes(service, master)
+                if self.rows[ind][2].get(time_record) == value]
+
+    def bookings(self) -> dict[str, list[tuple[str, str, str]]]:
+        """
+        Все заполненные ячейки листа
+
+        :return: Словарь {значение ячейки: [(время, услуга, мастер), ...]}
+        """
+        res = {}
+        for service, master, slots in self.rows:
+            for key, val in slots.items():
+                if val != '':
+                    res.setdefault(val, []).append((key, service, master))
+        return res
+
+
+class ScheduleMirror:
+    """Потокобезопасная копия всех листов-дат, проиндексированная по дате"""
+
+    def __init__(self, col_service: str, col_master: str):
+        self.col_service = col_service
+        self.col_master = col_master
+        self._days = {}
+        # индекс записей клиентов: {строка клиента: {название листа: [(время, услуга, мастер), ...]}}
+        self._clients = {}
+        self._lock = Lock()
+        # время последней полной загрузки (monotonic), None - не загружалось
+        self.loaded_at = None
+
+    @property
+    def loaded(self) -> bool:
+        """Было ли зеркало хотя бы раз полностью загружено"""
+        return self.loaded_at is not None
+
+    def age(self) -> float | None:
+        """Сколько секунд прошло с последней полной загрузки"""
+        if self.loaded_at is None:
+            return None
+        return monotonic() - self.loaded_at
+
+    def load(self, sheets: dict[str, list[dict]]) -> None:
+        """
+        Полностью заменяет зеркало
+
+        :param sheets: Словарь {название листа: записи get_all_records()}
+        """
+        days = {}
+        clients = {}
+        for title, records in sheets.items():
+            day = DaySchedule(title, records, self.col_service, self.col_master)
+            if day.date is not None:
+                days[day.title] = day
+                for value, lst in day.bookings().items():
+                    clients.setdefault(value, {})[day.title] = lst
+        with self._lock:
+            self._days = days
+            self._clients = clients
+            self.loaded_at = monotonic()
+
+    def update_day(self, title: str, records: list[dict]) -> None:
+        """Заменяет один лист-дату"""
+        day = DaySchedule(title, records, self.col_service, self.col_master)
+        if day.date is None:
+            return
+        with self._lock:
+            self._unindex_day(day.title)
+            self._days[day.title] = day
+            for value, lst in day.bookings().items():
+                self._clients.setdefault(value, {})[day.title] = lst
+
+    def remove_day(self, title: str) -> None:
+        """Удаляет лист-дату из зеркала"""
+        with self._lock:
+            self._unindex_day(title.strip())
+            self._days.pop(title.strip(), None)
+
+    def _unindex_day(self, title: str) -> None:
+        """Удаляет записи листа из индекса клиентов (вызывать под self._lock)"""
+        day = self._days.get(title)
+        if day is None:
+            return
+        for value in day.bookings():
+            by_title = self._clients.get(value)
+            if by_title is not None:
+                by_title.pop(title, None)
+                if not by_title:
+                    del self._clients[value]
+
+    def get_day(self, title: str) -> DaySchedule | None:
+        """Расписание листа-даты по названию"""
+        return self._days.get(title.strip())
+
+    def days(self, now: datetime, count_days: int | None = None) -> list[DaySchedule]:
+        """
+        Актуальные листы-даты, отсортированные по дате
+
+        :param now: Текущее время
+        :param count_days: Количество ближайших дней (None - без ограничения)
+        """
+        today = now.date()
+        last = today + timedelta(days=count_days) if count_days is not None else date.max
+        return sorted((day for day in list(self._days.values()) if today <= day.date <= last),
+                      key=lambda x: x.date)
+
+    def heatmap(self, service: str, master: str | None, now: datetime, count_days=AVAILABILITY_DAYS) -> dict[str, int]:
+        """
+        Количество свободного времени по листам-датам для услуги и мастера
+
+        :param count_days: Количество ближайших дней
+        :return: Словарь {название листа: количество свободного времени} по возрастанию даты,
+                 только даты со свободным временем
+        """
+        res = {}
+        for day in self.days(now, count_days):
+            count = day.free_count(service, master, now.time() if day.date == now.date() else None)
+            if count:
+                res[day.title] = count
+        return res
+
+    def available_days(self, service: str, master: str | None, now: datetime, count_days=AVAILABILITY_DAYS) -> list[str]:
+        """Названия листов-дат, на которые есть свободное время для услуги и мастера"""
+        return list(self.heatmap(service, master, now, count_days))
+
+    def is_available(self, title: str, service: str, master: str | None, now: datetime, count_days=AVAILABILITY_DAYS) -> bool:
+        """Есть ли на дату свободное время для услуги и мастера в пределах count_days дней"""
+        day = self.get_day(title)
+        if day is None or not now.date() <= day.date <= now.date() + timedelta(days=count_days):
+            return False
+        return day.has_free(service, master, now.time() if day.date == now.date() else None)
+
+    def free_time(self, title: str, service: str, master: str | None, now: datetime) -> list[str]:
+        """Свободное время на дату для услуги и мастера"""
+        day = self.get_day(title)
+        if day is None:
+            return []
+        return day.free_times(service, master, now.time() if day.date == now.date() else None)
+
+    def find_records(self, value: str, now: datetime, count_days=AVAILABILITY_DAYS) -> list[list[str]]:
+        """
+        Все будущие записи с указанным значением ячейки
+
+        :return: Список формата: [Дата, Время, Название услуги, Имя мастера]
+        """
+        today = now.date()
+        last = today + timedelta(days=count_days)
+        with self._lock:
+            by_title = list(self._clients.get(value.strip(), {}).items())
+        res = []
+        for title, lst in by_title:
+            day = self._days.get(title)
+            if day is None or not today <= day.date <= last:
+                continue
+            after = now.time() if day.date == today else None
+            res.extend([title, key, service, master] for key, service, master in lst
+                       if after is None or after < day.parsed_times[key])
+        return sorted(res, key=lambda x: (parse_date(x[0]), x[1]))
+
+    def set_slot(self, title: str, time_record: str, service: str, master: str,
+                 value: str, old_value: str | None = None) -> None:
+        """
+        Обновляет значение ячейки в зеркале после записи/отмены в таблице
+
+        :param old_value: Прежнее значение ячейки (None - любое)
+        """
+        day = self.get_day(title)
+        if day is None:
+            return
+        with self._lock:
+            for ind in day.row_indexes(service, master):
+                row_service, row_master, slots = day.rows[ind]
+                if time_record in slots and (old_value is None or slots[time_record] == old_value.strip()):
+                    booking = (time_record, row_service, row_master)
+                    self._unindex_slot(day.title, slots[time_record], booking)
+                    slots[time_record] = value.strip()
+                    day.refresh_slot(ind, time_record)
+                    if slots[time_record] != '':
+                        self._clients.setdefault(slots[time_record], {}).setdefault(day.title, []).append(booking)
+                    return
+
+    def _unindex_slot(self, title: str, value: str, booking: tuple[str, str, str]) -> None:
+        """Удаляет одну запись из индекса клиентов (вызывать под self._lock)"""
+        by_title = self._clients.get(value)
+        if by_title is None or booking not in by_title.get(title, []):
+            return
+        by_title[title].remove(booking)
+        if not by_title[title]:
+            del by_title[title]
+        if not by_title:
+            del self._clients[value]
@@ -0,0 +1,341 @@
+"""
+Хранилища сессий пользователей: в памяти процесса или в Redis (общие для нескольких процессов бота)
+"""
+import asyncio
+import json
+import os
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from functools import lru_cache
+from threading import Lock
+from time import monotonic
+from cachetools import LRUCache
+from session_state import SessionState
+
+# Адрес Redis для сессий (redis://host:port/db); пусто - сессии хранятся в памяти процесса
+SESSION_REDIS_URL = os.environ.get('SESSION_REDIS_URL', '')
+# Время простоя в секундах, после которого сессия удаляется
+SESSION_IDLE_TTL = 60 * 60
+# Префикс ключей сессий в Redis (сессия - хэш по полям; прежние строковые ключи 'saloon_bot:session' истекают сами)
+SESSION_PREFIX = 'saloon_bot:sessions'
+# Поле хэша для значений, которые не являются SessionState
+VALUE_FIELD = 'value'
+
+# Отметка: сессии нет
+_MISSING = object()
+
+
+class SessionBackend(ABC):
+    """Интерфейс хранилища сессий по chat id"""
+
+    # класс сессий для восстановления из внешнего хранилища (наследник SessionState)
+    factory = None
+
+    @abstractmethod
+    def get(self, chat_id, default=None):
+        """Значение сессии (обращение продлевает её жизнь)"""
+
+    @abstractmethod
+    def __setitem__(self, chat_id, value) -> None:
+        """Сохраняет сессию"""
+
+    @abstractmethod
+    def pop(self, chat_id, default=None):
+        """Удаляет сессию и возвращает её значение"""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Удаляет все сессии"""
+
+    def expire(self) -> None:
+        """Удаляет сессии с истёкшим временем простоя"""
+
+    @abstractmethod
+    def metrics(self) -> dict:
+        """Метрики хранилища"""
+
+    def __getitem__(self, chat_id):
+        value = self.get(chat_id, _MISSING)
+        if value is _MISSING:
+            raise KeyError(chat_id)
+        return value
+
+    def __delitem__(self, chat_id) -> None:
+        if self.pop(chat_id, _MISSING) is _MISSING:
+            raise KeyError(chat_id)
+
+    def __contains__(self, chat_id) -> bool:
+        return self.get(chat_id, _MISSING) is not _MISSING
+
+
+class SessionStore(SessionBackend):
+    """
+    Хранилище сессий в памяти процесса по chat id с вытеснением по времени простоя.
+    Записи упорядочены по последнему обращению, поэтому устаревшие всегда в начале:
+    отчистка снимает их с головы без полного обхода.
+    """
+
+    def __init__(self, idle_ttl=60 * 60, maxsize=10000, timer=monotonic):
+        """
+        :param idle_ttl: Время простоя в секундах, после которого сессия удаляется
+        :param maxsize: Максимальное количество сессий (при переполнении удаляется самая старая)
+        :param timer: Источник времени (для тестов)
+        """
+        self.idle_ttl = idle_ttl
+        self.maxsize = maxsize
+        self.timer = timer
+        # chat_id -> [значение, время последнего обращения]
+        self._data = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def _expire(self, now: float) -> None:
+        """Удаляет сессии с истёкшим временем простоя (вызывать под self._lock)"""
+        while self._data:
+            _, (_, touched) = next(iter(self._data.items()))
+            if now - touched < self.idle_ttl:
+                break
+            self._data.popitem(last=False)
+            self.expired += 1
+
+    def expire(self) -> None:
+        """Удаляет сессии с истёкшим временем простоя"""
+        with self._lock:
+            self._expire(self.timer())
+
+    def get(self, chat_id, default=None):
+        """Значение сессии (обращение продлевает её жизнь)"""
+        with self._lock:
+            now = self.timer()
+            self._expire(now)
+            item = self._data.get(chat_id)
+            if item is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            item[1] = now
+            self._data.move_to_end(chat_id)
+            return item[0]
+
+    def __setitem__(self, chat_id, value) -> None:
+        with self._lock:
+            now = self.timer()
+            self._expire(now)
+            self._data[chat_id] = [value, now]
+            self._data.move_to_end(chat_id)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evicted += 1
+
+    def __delitem__(self, chat_id) -> None:
+        with self._lock:
+            del self._data[chat_id]
+
+    def pop(self, chat_id, default=None):
+        """Удаляет сессию и возвращает её значение"""
+        with self._lock:
+            item = self._data.pop(chat_id, None)
+            return default if item is None else item[0]
+
+    def __contains__(self, chat_id) -> bool:
+        with self._lock:
+            self._expire(self.timer())
+            return chat_id in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def clear(self) -> None:
+        """Удаляет все сессии"""
+        with self._lock:
+            self._data.clear()
+
+    def metrics(self) -> dict:
+        """Метрики хранилища"""
+        return {'size': len(self._data), 'maxsize': self.maxsize, 'hits': self.hits,
+                'misses': self.misses, 'expired': self.expired, 'evicted': self.evicted}
+
+
+class RedisSessionStore(SessionBackend):
+    """
+    Хранилище сессий в Redis: сессии доступны всем процессам бота.
+    Сессия - хэш по полям: при сохранении записываются только поля, изменённые с последнего чтения
+    этим процессом (в транзакции WATCH/MULTI), поэтому процессы, обрабатывающие один чат,
+    не затирают изменения друг друга.
+    Время простоя отслеживает сам Redis (TTL ключа продлевается при каждом обращении),
+    ограничение по памяти задаётся настройкой maxmemory сервера.
+    """
+
+    def __init__(self, client, name: str, idle_ttl=SESSION_IDLE_TTL, factory=None, prefix=SESSION_PREFIX,
+                 snapshots=10000):
+        """
+        :param client: Клиент Redis (redis.Redis или совместимый)
+        :param name: Название хранилища (часть ключа)
+        :param idle_ttl: Время простоя в секундах, после которого сессия удаляется
+        :param factory: Класс сессий (наследник SessionState); None - значения хранятся как есть (JSON)
+        :param prefix: Префикс ключей
+        :param snapshots: Количество сессий, прочитанных значений которых запоминаются
+            (сессия без снимка сохраняется целиком)
+        """
+        self.client = client
+        self.idle_ttl = idle_ttl
+        self.factory = factory
+        self._prefix = f'{prefix}:{name}:'
+        self._lock = Lock()
+        # chat_id -> поля сессии при последнем чтении/записи этим процессом
+        self._snapshots = LRUCache(maxsize=snapshots)
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, chat_id) -> str:
+        return f'{self._prefix}{chat_id}'
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    @staticmethod
+    def _dumps(value) -> dict:
+        """Поля хэша сессии: JSON каждого поля состояния"""
+        if isinstance(value, SessionState):
+            return {name: json.dumps(field, ensure_ascii=False) for name, field in value.to_state().items()}
+        return {VALUE_FIELD: json.dumps(value, ensure_ascii=False)}
+
+    def _loads(self, fields: dict):
+        if VALUE_FIELD in fields:
+            return json.loads(fields[VALUE_FIELD])
+        state = {name: json.loads(field) for name, field in fields.items()}
+        if self.factory is not None:
+            return self.factory.from_state(state)
+        return state
+
+    def _read(self, chat_id, delete: bool) -> dict:
+        """Поля сессии (str -> str) одним атомарным запросом с продлением или удалением ключа"""
+        key = self._key(chat_id)
+        pipe = self.client.pipeline()
+        pipe.hgetall(key)
+        if delete:
+            pipe.delete(key)
+        else:
+            pipe.expire(key, self.idle_ttl)
+        raw = pipe.execute()[0]
+        return {(name.decode() if isinstance(name, bytes) else name): (
+            field.decode() if isinstance(field, bytes) else field) for name, field in raw.items()}
+
+    def get(self, chat_id, default=None):
+        """Значение сессии (обращение продлевает её жизнь)"""
+        fields = self._read(chat_id, delete=False)
+        self._count(bool(fields))
+        with self._lock:
+            if fields:
+                self._snapshots[chat_id] = fields
+            else:
+                self._snapshots.pop(chat_id, None)
+        return self._loads(fields) if fields else default
+
+    def __setitem__(self, chat_id, value) -> None:
+        key = self._key(chat_id)
+        fields = self._dumps(value)
+        with self._lock:
+            snapshot = self._snapshots.get(chat_id)
+
+        def write(pipe) -> None:
+            # сессию удалили или её прочитанных полей нет - сохраняется целиком
+            full = snapshot is None or not pipe.exists(key)
+            changed = fields if full else {name: field for name, field in fields.items()
+                                           if snapshot.get(name) != field}
+            pipe.multi()
+            if full:
+                pipe.delete(key)
+            if changed:
+                pipe.hset(key, mapping=changed)
+            pipe.expire(key, self.idle_ttl)
+
+        # ключ изменился между WATCH и EXEC - транзакция повторяется с новой проверкой
+        self.client.transaction(write, key)
+        with self._lock:
+            self._snapshots[chat_id] = fields
+
+    def pop(self, chat_id, default=None):
+        """Удаляет сессию и возвращает её значение"""
+        fields = self._read(chat_id, delete=True)
+        with self._lock:
+            self._snapshots.pop(chat_id, None)
+        return self._loads(fields) if fields else default
+
+    def _keys(self) -> list:
+        return list(self.client.scan_iter(match=self._prefix + '*', count=1000))
+
+    def clear(self) -> None:
+        """Удаляет все сессии хранилища"""
+        keys = self._keys()
+        if keys:
+            self.client.delete(*keys)
+        with self._lock:
+            self._snapshots.clear()
+
+    def __len__(self) -> int:
+        return len(self._keys())
+
+    def metrics(self) -> dict:
+        """Метрики хранилища (size - обход ключей, не вызывать часто)"""
+        return {'size': len(self), 'hits': self.hits, 'misses': self.misses, 'idle_ttl': self.idle_ttl}
+
+
+class AsyncSessions:
+    """
+    Доступ к хранилищу сессий из асинхронного бота: обращения к Redis выполняются в пуле потоков
+    и не блокируют цикл событий, сессии в памяти процесса читаются сразу
+    """
+
+    def __init__(self, backend: SessionBackend):
+        """
+        :param backend: Хранилище сессий
+        """
+        self.backend = backend
+
+    async def run(self, func, *args):
+        """Вызывает func(*args), работающую с хранилищем, без блокировки цикла событий"""
+        if isinstance(self.backend, RedisSessionStore):
+            return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+        return func(*args)
+
+    async def get(self, chat_id, default=None):
+        """Значение сессии (обращение продлевает её жизнь)"""
+        return await self.run(self.backend.get, chat_id, default)
+
+    async def set(self, chat_id, value) -> None:
+        """Сохраняет сессию"""
+        await self.run(self.backend.__setitem__, chat_id, value)
+
+    async def pop(self, chat_id, default=None):
+        """Удаляет сессию и возвращает её значение"""
+        return await self.run(self.backend.pop, chat_id, default)
+
+
+@lru_cache(maxsize=None)
+def get_redis(url: str):
+    """Один клиент Redis (пул соединений) на адрес"""
+    import redis
+    return redis.Redis.from_url(url)
+
+
+def create_backend(name: str, factory=None, idle_ttl=SESSION_IDLE_TTL) -> SessionBackend:
+    """
+    Хранилище сессий: Redis, если задан SESSION_REDIS_URL, иначе в памяти процесса
+
+    :param name: Название хранилища
+    :param factory: Класс сессий для восстановления из Redis (наследник SessionState)
+    :param idle_ttl: Время простоя в секундах, после которого сессия удаляется
+    """
+    if SESSION_REDIS_URL:
+        return RedisSessionStore(get_redis(SESSION_REDIS_URL), name, idle_ttl, factory)
+    store = SessionStore(idle_ttl=idle_ttl)
+    store.factory = factory
+    return store
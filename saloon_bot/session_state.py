@@ -0,0 +1,221 @@
+"""
+Компактное состояние диалога клиента: выбор клиента хранится целыми ключами
+(id услуги, мастера и времени, порядковый номер даты), доступные даты и время - общие неизменяемые объекты
+"""
+from datetime import date
+from functools import lru_cache
+from threading import Lock
+from schedule_mirror import DATE_FORMAT, parse_date
+
+# Поля сессии, сохраняемые во внешнем хранилище
+STATE_FIELDS = ('client_id', 'lst_currant_date', 'dct_currant_time', 'lst_records',
+                'name_service', 'name_master', 'date_record', 'time_record')
+# Количество различных наборов доступных дат (и времени), общих для всех сессий
+SHARED_DATES_SIZE = 512
+
+
+class KeyTable:
+    """Общая для всех сессий таблица строк: строка <-> целый id (только добавление)"""
+
+    def __init__(self):
+        self._ids = {}
+        self._values = []
+        self._lock = Lock()
+
+    def id(self, value: str) -> int:
+        """id строки (новая строка получает следующий id)"""
+        key_id = self._ids.get(value)
+        if key_id is None:
+            with self._lock:
+                key_id = self._ids.get(value)
+                if key_id is None:
+                    key_id = self._ids[value] = len(self._values)
+                    self._values.append(value)
+        return key_id
+
+    def value(self, key_id: int) -> str:
+        """Строка по id"""
+        return self._values[key_id]
+
+
+# Услуги, мастера и время записи всех сессий
+SERVICES = KeyTable()
+MASTERS = KeyTable()
+TIMES = KeyTable()
+
+
+@lru_cache(maxsize=SHARED_DATES_SIZE)
+def date_title(ordinal: int) -> str:
+    """Название листа-даты по порядковому номеру даты (одна строка на дату для всех сессий)"""
+    return date.fromordinal(ordinal).strftime(DATE_FORMAT)
+
+
+@lru_cache(maxsize=SHARED_DATES_SIZE)
+def shared_dates(titles: tuple[str, ...]) -> frozenset[date]:
+    """
+    Доступные даты по названиям листов.
+    Одинаковые наборы дат (одна услуга и мастер) - один общий объект для всех сессий
+
+    :param titles: Названия листов-дат из кэша доступных дат
+    :return: Неизменяемое множество дат
+    """
+    return frozenset(d for d in map(parse_date, titles) if d is not None)
+
+
+@lru_cache(maxsize=SHARED_DATES_SIZE)
+def shared_times(times: tuple[str, ...]) -> tuple[str, ...]:
+    """
+    Свободное время даты: одинаковые наборы - один общий кортеж для всех сессий
+
+    :param times: Свободное время из зеркала расписания
+    """
+    return times
+
+
+def _key_id(table: KeyTable, value: str | None) -> int | None:
+    return None if value is None else table.id(value)
+
+
+def _key_value(table: KeyTable, key_id: int | None) -> str | None:
+    return None if key_id is None else table.value(key_id)
+
+
+class SessionState:
+    """
+    Состояние диалога клиента без __dict__.
+    Снаружи поля - строки, как их показывают обработчики; внутри хранятся только целые ключи
+    """
+
+    __slots__ = ('client_id', 'lst_currant_date', '_times', '_records',
+                 '_service', '_master', '_date', '_time')
+
+    def __init__(self, client_id: str):
+        # уникальный идентификатор для создания объекта
+        self.client_id = client_id
+        # доступные даты (общий frozenset из shared_dates)
+        self.lst_currant_date = None
+        # доступное время (общий кортеж из shared_times)
+        self._times = None
+        # записи клиента: (порядковый номер даты, id времени, id услуги, id мастера)
+        self._records = None
+
+        # id услуги и мастера в SERVICES и MASTERS (None - не выбраны / любой мастер)
+        self._service = None
+        self._master = None
+        # порядковый номер даты (date.toordinal)
+        self._date = None
+        # id времени в TIMES
+        self._time = None
+
+    @property
+    def name_service(self) -> str | None:
+        """Название выбранной услуги"""
+        return _key_value(SERVICES, self._service)
+
+    @name_service.setter
+    def name_service(self, value: str | None) -> None:
+        self._service = _key_id(SERVICES, value)
+
+    @property
+    def name_master(self) -> str | None:
+        """Имя выбранного мастера (None - любой мастер)"""
+        return _key_value(MASTERS, self._master)
+
+    @name_master.setter
+    def name_master(self, value: str | None) -> None:
+        self._master = _key_id(MASTERS, value)
+
+    @property
+    def date_record(self) -> str | None:
+        """Название листа-даты выбранной записи"""
+        return None if self._date is None else date_title(self._date)
+
+    @date_record.setter
+    def date_record(self, value: str | None) -> None:
+        if value is None:
+            self._date = None
+            return
+        date_sheet = parse_date(value)
+        if date_sheet is None:
+            raise ValueError(f'Not a date sheet title: {value!r}')
+        self._date = date_sheet.toordinal()
+
+    @property
+    def time_record(self) -> str | None:
+        """Время выбранной записи"""
+        return _key_value(TIMES, self._time)
+
+    @time_record.setter
+    def time_record(self, value: str | None) -> None:
+        self._time = _key_id(TIMES, value)
+
+    @property
+    def dct_currant_time(self) -> tuple[str, ...] | None:
+        """Свободное время выбранной даты"""
+        return self._times
+
+    @dct_currant_time.setter
+    def dct_currant_time(self, value) -> None:
+        self._times = None if value is None else shared_times(tuple(value))
+
+    @property
+    def lst_records(self) -> list[list[str]] | None:
+        """Записи клиента: [Дата, Время, Название услуги, Имя мастера]"""
+        if self._records is None:
+            return None
+        return [[date_title(day), TIMES.value(time_id), SERVICES.value(service),
+                 _key_value(MASTERS, master)]
+                for day, time_id, service, master in self._records]
+
+    @lst_records.setter
+    def lst_records(self, value) -> None:
+        self._records = None if value is None else [self._record_key(*record) for record in value]
+
+    @staticmethod
+    def _record_key(date_record: str, time_record: str, name_service: str, name_master: str) -> tuple:
+        """Компактный ключ записи клиента"""
+        return parse_date(date_record).toordinal(), TIMES.id(time_record), SERVICES.id(name_service), \
+            MASTERS.id(name_master)
+
+    def apply_record(self, client_record: str, search_criteria: str) -> None:
+        """
+        Отражает успешную запись/отмену в списке записей клиента (если он уже загружен)
+
+        :param client_record: Записанная строка клиента ('' - отмена)
+        :param search_criteria: Прежнее значение ячейки ('' - запись)
+        """
+        if not self._records or (search_criteria != '' and client_record != ''):
+            return
+        record = [self.date_record, self.time_record, self.name_service, self.name_master]
+        key = (self._date, self._time, self._service, self._master)
+        if search_criteria == '':
+            self._records.append(key)
+            print(f"[INFO] Record added to lst_records: {record}")
+        elif key in self._records:
+            self._records.remove(key)
+            print(f"[INFO] Record removed from lst_records: {record}")
+
+    def to_state(self) -> dict:
+        """Состояние сессии для внешнего хранилища (JSON-совместимое)"""
+        state = {name: getattr(self, name) for name in STATE_FIELDS}
+        if self.lst_currant_date is not None:
+            state['lst_currant_date'] = [x.strftime(DATE_FORMAT) for x in sorted(self.lst_currant_date)]
+        return state
+
+    @classmethod
+    def from_state(cls, state: dict):
+        """Восстанавливает сессию из состояния, сохранённого to_state"""
+        session = cls(state['client_id'])
+        for name in STATE_FIELDS[1:]:
+            setattr(session, name, state.get(name))
+        if session.lst_currant_date is not None:
+            session.lst_currant_date = shared_dates(tuple(session.lst_currant_date))
+        return session
+
+    def __str__(self):
+        return f'Инфо о клиенте:\n' \
+               f'{self.client_id=}\n' \
+               f'{self.name_service=}\n' \
+               f'{self.name_master=}\n' \
+               f'{self.date_record=}\n' \
+               f'{self.time_record=}'
@@ -0,0 +1,42 @@
+"""
+Настройки подключения к таблице Google Sheets и её структура
+"""
+from pytz import timezone
+
+myscope = ["https://www.googleapis.com/auth/spreadsheets",
+           "https://www.googleapis.com/auth/drive"]
+
+# Временная зона
+tz = timezone("Europe/Moscow")
+# Название файла json ключа
+CREDENTIALS_FILE = '../../OneDrive/Рабочий стол/saloon_bot/beauty-saloon-451808-531bdfb287e4.json'
+# Ключ таблицы
+SPREADSHEET_KEY = '1jP9nHvqzKg7yV4-jzeJRLedrHeoHiyvWDfE681tVzNE'
+# Страницы таблицы, которые должны игнорироваться во избежание проблем
+IGNOR_WORKSHEETS = ['Работники']
+# Страница таблицы, на которой перечислены все действующие работники и услуги
+NAME_SHEET_WORKERS = 'Работники'
+# Количество ближайших дней, на которые открыта запись
+AVAILABILITY_DAYS = 30
+# Названия основных колонок(очередность важна!)
+NAME_COL_SERVICE = 'Услуга'
+NAME_COL_MASTER = 'Мастер'
+# Квоты Sheets API на пользователя (сервисный аккаунт) в минуту
+SHEETS_READS_PER_MINUTE = 60
+SHEETS_WRITES_PER_MINUTE = 60
+# Пауза всех запросов квоты после ответа 429 (если api не прислало Retry-After), в секундах
+QUOTA_PAUSE_SECONDS = 10
+# Максимальное ожидание токена квоты в секундах (дальше - RateLimitTimeout и повтор по политике повторов)
+RATE_LIMIT_TIMEOUT_SECONDS = 30
+# Повторы временных ошибок api: число попыток, начальная и максимальная пауза в секундах
+RETRY_ATTEMPTS = 3
+RETRY_BASE_SECONDS = 1
+RETRY_MAX_SECONDS = 8
+# Предохранитель: временных ошибок подряд до размыкания и пауза до пробного запроса в секундах
+CIRCUIT_FAILURES = 5
+CIRCUIT_RESET_SECONDS = 30
+# Заголовок колонки контрольной суммы: после изменения таблицы целиком перечитываются только листы,
+# у которых она изменилась. Колонка идёт сразу за последней колонкой со временем (колонка ищется
+# по заголовку в первой строке), во второй строке - формула по данным листа без самой колонки, например
+# =SUMPRODUCT(LEN(A1:K200)*ROW(A1:K200)*COLUMN(A1:K200)). Листы без неё перечитываются при каждом изменении таблицы
+CHECKSUM_HEADER = 'Контроль'
@@ -0,0 +1,88 @@
+"""
+Блокировки чтения/записи на уровне отдельных листов таблицы
+"""
+from contextlib import contextmanager, ExitStack
+from threading import Condition, Lock
+
+
+class ReadWriteLock:
+    """Блокировка: много параллельных читателей или один писатель"""
+
+    def __init__(self):
+        self._cond = Condition(Lock())
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    def acquire_read(self) -> None:
+        """Захват на чтение (ждёт, пока нет писателя и писателей в очереди)"""
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+
+    def release_read(self) -> None:
+        """Освобождение чтения"""
+        with self._cond:
+            self._readers -= 1
+            if not self._readers:
+                self._cond.notify_all()
+
+    def acquire_write(self) -> None:
+        """Захват на запись"""
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+
+    def release_write(self) -> None:
+        """Освобождение записи"""
+        with self._cond:
+            self._writer = False
+            self._cond.notify_all()
+
+
+class SheetLocks:
+    """Реестр блокировок по названию листа"""
+
+    def __init__(self):
+        self._locks = {}
+        self._lock = Lock()
+
+    def get(self, title: str) -> ReadWriteLock:
+        """Блокировка листа (создаётся при первом обращении)"""
+        title = title.strip()
+        with self._lock:
+            if title not in self._locks:
+                self._locks[title] = ReadWriteLock()
+            return self._locks[title]
+
+    @contextmanager
+    def read(self, title: str):
+        """Чтение листа: параллельно с другими чтениями"""
+        rw_lock = self.get(title)
+        rw_lock.acquire_read()
+        try:
+            yield
+        finally:
+            rw_lock.release_read()
+
+    @contextmanager
+    def write(self, title: str):
+        """Запись в лист: исключительный доступ к одному листу"""
+        rw_lock = self.get(title)
+        rw_lock.acquire_write()
+        try:
+            yield
+        finally:
+            rw_lock.release_write()
+
+    @contextmanager
+    def read_many(self, titles: list[str]):
+        """Чтение нескольких листов (захват в отсортированном порядке без взаимоблокировок)"""
+        with ExitStack() as stack:
+            for title in sorted({title.strip() for title in titles}):
+                stack.enter_context(self.read(title))
+            yield
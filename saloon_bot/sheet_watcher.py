@@ -0,0 +1,171 @@
+"""
+Отслеживание изменений таблицы: версия файла в Google Drive и перезагрузка только изменившихся листов
+"""
+from contextlib import nullcontext
+from threading import Lock
+from typing import Callable
+from gspread.urls import DRIVE_FILES_API_V3_URL
+from schedule_mirror import ScheduleMirror
+
+
+def get_drive_version(client, file_id: str) -> str:
+    """
+    Версия файла в Google Drive: увеличивается при любом изменении таблицы
+
+    :param client: gspread.Client
+    :param file_id: Ключ таблицы
+    """
+    res = client.request('get', f'{DRIVE_FILES_API_V3_URL}/{file_id}',
+                         params={'fields': 'version', 'supportsAllDrives': True})
+    return res.json()['version']
+
+
+def records_digest(records: list[dict]) -> int:
+    """Контрольная сумма записей листа (заголовки и значения)"""
+    return hash((tuple(records[0]) if records else (),
+                 tuple(tuple(record.values()) for record in records)))
+
+
+class ScheduleWatcher:
+    """
+    Обновление зеркала расписания по изменениям таблицы.
+    Пока версия файла в Drive не изменилась, листы не читаются. После изменения читаются
+    контрольные суммы листов (колонка с формулой на листе), а целиком - только листы,
+    у которых контрольная сумма изменилась, новые листы и листы без контрольной суммы;
+    в зеркале заменяются только листы с другой контрольной суммой записей.
+    """
+
+    def __init__(self, mirror: ScheduleMirror,
+                 get_version: Callable[[], str],
+                 get_titles: Callable[[], list[str]],
+                 fetch_records: Callable[[list[str]], dict[str, list[dict]]],
+                 lock=None,
+                 on_change: Callable[[list[str]], None] | None = None,
+                 fetch_checksums: Callable[[list[str]], dict[str, str]] | None = None,
+                 checksum_header: str | None = None):
+        """
+        :param mirror: Зеркало расписания
+        :param get_version: Текущая версия таблицы
+        :param get_titles: Названия отслеживаемых листов (вызывается только после изменения версии)
+        :param fetch_records: Записи листов по названиям
+        :param lock: Контекстный менеджер по списку листов на время чтения и замены (блокировки записи)
+        :param on_change: Вызывается с названиями изменившихся/удалённых листов
+        :param fetch_checksums: Контрольные суммы листов по названиям ('' - на листе нет контрольной суммы);
+            None - после изменения версии читаются все листы
+        :param checksum_header: Заголовок колонки контрольной суммы: по прочитанным целиком листам
+            определяется, у каких листов она есть (контрольная сумма - значение в первой записи)
+        """
+        self.mirror = mirror
+        self.get_version = get_version
+        self.get_titles = get_titles
+        self.fetch_records = fetch_records
+        self.lock = lock or (lambda titles: nullcontext())
+        self.on_change = on_change
+        self.fetch_checksums = fetch_checksums
+        self.checksum_header = checksum_header
+        # версия таблицы, по которой построено зеркало; None - зеркало ещё не загружалось
+        self.version = None
+        self._digests = {}
+        # контрольные суммы листов, у которых они есть
+        self._checksums = {}
+        # листы без контрольной суммы, о которых уже предупреждали
+        self._warned = set()
+        self._poll_lock = Lock()
+        self.polls = 0
+        self.reloads = 0
+        self.fetched_sheets = 0
+        self.changed_sheets = 0
+
+    def poll(self) -> list[str]:
+        """
+        Проверяет версию таблицы и перезагружает изменившиеся листы
+
+        :return: Названия изменившихся/удалённых листов (при первой загрузке - все листы)
+        """
+        with self._poll_lock:
+            self.polls += 1
+            # версия читается до листов: изменение во время чтения будет замечено при следующей проверке
+            version = self.get_version()
+            if version == self.version:
+                return []
+            titles = self.get_titles()
+            with self.lock(titles):
+                checksums = self._fetch_checksums(titles)
+                stale = self._stale_titles(titles, checksums)
+                sheets = self.fetch_records(stale) if stale else {}
+                changed = self._apply(titles, sheets)
+            self._update_checksums(titles, checksums, sheets)
+            self.version = version
+            self.reloads += 1
+            self.fetched_sheets += len(sheets)
+            self.changed_sheets += len(changed)
+        if changed and self.on_change is not None:
+            self.on_change(changed)
+        return changed
+
+    def _fetch_checksums(self, titles: list[str]) -> dict[str, str]:
+        """
+        Контрольные суммы листов, у которых они были при прошлом чтении
+        (если таких листов нет, запрос не выполняется)
+        """
+        known = [title for title in titles if title in self._checksums]
+        if self.fetch_checksums is None or not known:
+            return {}
+        # контрольные суммы читаются до листов: изменение между чтениями будет замечено при следующей проверке
+        return self.fetch_checksums(known)
+
+    def _stale_titles(self, titles: list[str], checksums: dict[str, str]) -> list[str]:
+        """Листы, которые нужно прочитать целиком: новые, без контрольной суммы и с изменившейся контрольной суммой"""
+        if self.version is None:
+            return list(titles)
+        return [title for title in titles if title not in self._digests
+                or not checksums.get(title) or checksums[title] != self._checksums[title]]
+
+    def _apply(self, titles: list[str], sheets: dict[str, list[dict]]) -> list[str]:
+        """
+        Заменяет в зеркале листы с изменившимися записями и удаляет пропавшие листы
+
+        :return: Названия изменившихся/удалённых листов
+        """
+        digests = {title: self._digests[title] for title in titles if title in self._digests}
+        digests.update((title, records_digest(records)) for title, records in sheets.items())
+        if self.version is None:
+            self.mirror.load(sheets)
+            changed = list(sheets)
+        else:
+            changed = self._replace_changed(sheets, digests)
+        self._digests = digests
+        return changed
+
+    def _replace_changed(self, sheets: dict[str, list[dict]], digests: dict[str, int]) -> list[str]:
+        """Заменяет в загруженном зеркале листы с другой контрольной суммой записей и удаляет пропавшие листы"""
+        changed = [title for title in sheets if self._digests.get(title) != digests[title]]
+        for title in changed:
+            self.mirror.update_day(title, sheets[title])
+        removed = [title for title in self._digests if title not in digests]
+        for title in removed:
+            self.mirror.remove_day(title)
+        return changed + removed
+
+    def _update_checksums(self, titles: list[str], checksums: dict[str, str], sheets: dict[str, list[dict]]) -> None:
+        """Запоминает контрольные суммы: прочитанные отдельно и из колонки контрольной суммы прочитанных листов"""
+        current = dict(checksums)
+        if self.fetch_checksums is not None and self.checksum_header is not None:
+            current.update((title, self._sheet_checksum(title, records)) for title, records in sheets.items())
+        self._checksums = {title: current[title] for title in titles if current.get(title)}
+
+    def _sheet_checksum(self, title: str, records: list[dict]) -> str:
+        """Контрольная сумма прочитанного целиком листа; о листе без неё предупреждает один раз"""
+        checksum = str(records[0].get(self.checksum_header, '')) if records else ''
+        if checksum:
+            self._warned.discard(title)
+        elif title not in self._warned:
+            self._warned.add(title)
+            print(f"[WARNING] {title}: no '{self.checksum_header}' checksum column, "
+                  f"the sheet is re-read after every change of the spreadsheet")
+        return checksum
+
+    def stats(self) -> dict:
+        """Метрики: проверки версии, перечитывания таблицы, прочитанные и изменившиеся листы"""
+        return {'version': self.version, 'polls': self.polls, 'reloads': self.reloads,
+                'fetched_sheets': self.fetched_sheets, 'changed_sheets': self.changed_sheets}
@@ -0,0 +1,112 @@
+"""
+Объединение одновременных одинаковых запросов (single-flight):
+пока загрузка по ключу выполняется, остальные вызовы с тем же ключом ждут её результат
+"""
+import asyncio
+from threading import Event, Lock
+
+
+class _Call:
+    """Выполняющаяся загрузка и её результат"""
+
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Один запрос к api на ключ при одновременных обращениях из разных потоков"""
+
+    def __init__(self):
+        # ключ -> выполняющаяся загрузка
+        self._calls = {}
+        self._lock = Lock()
+        self.calls = 0
+        self.shared = 0
+
+    def do(self, key, func, *args):
+        """
+        Выполняет func(*args) или дожидается уже выполняющегося вызова с тем же ключом
+
+        :param key: Ключ загрузки (hashable)
+        :param func: Функция загрузки
+        :return: Результат func; исключение func получают все ожидающие вызовы
+        """
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.shared += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args)
+        except BaseException as ex:
+            call.error = ex
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def stats(self) -> dict:
+        """Количество вызовов, вызовов, получивших чужой результат, и выполняющихся загрузок"""
+        with self._lock:
+            return {'calls': self.calls, 'shared': self.shared, 'in_flight': len(self._calls)}
+
+
+class AsyncSingleFlight:
+    """Один запрос к api на ключ при одновременных обращениях из разных корутин"""
+
+    def __init__(self):
+        # ключ -> Future выполняющейся загрузки
+        self._calls = {}
+        self.calls = 0
+        self.shared = 0
+
+    async def do(self, key, func, *args):
+        """
+        Выполняет await func(*args) или дожидается уже выполняющегося вызова с тем же ключом
+
+        :param key: Ключ загрузки (hashable)
+        :param func: Корутинная функция загрузки
+        :return: Результат func; исключение func получают все ожидающие вызовы
+        """
+        self.calls += 1
+        future = self._calls.get(key)
+        if future is not None:
+            self.shared += 1
+            # отмена ожидающего не отменяет саму загрузку
+            return await asyncio.shield(future)
+
+        future = self._calls[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await func(*args)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as ex:
+            future.set_exception(ex)
+            # исключение уже получил вызвавший, без ожидающих asyncio не должен о нём предупреждать
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
+
+    def stats(self) -> dict:
+        """Количество вызовов, вызовов, получивших чужой результат, и выполняющихся загрузок"""
+        return {'calls': self.calls, 'shared': self.shared, 'in_flight': len(self._calls)}
@@ -4,7 +4,11 @@
 import datetime
 import calendar
 import typing
+from collections import namedtuple
+from functools import lru_cache
+from threading import Lock
 
+from cachetools import LRUCache
 from telebot import TeleBot
 from telebot.types import InlineKeyboardButton, InlineKeyboardMarkup, CallbackQuery
 
@@ -23,6 +27,23 @@ MONTHS = (
     "Декабрь",
 )
 DAYS = ("Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс")
+# Количество готовых клавиатур календаря в LRU-кэше
+CALENDAR_CACHE_SIZE = 1024
+
+# Готовые клавиатуры по ключу (имя, год, месяц, доступные дни месяца)
+_CALENDAR_CACHE = LRUCache(maxsize=CALENDAR_CACHE_SIZE)
+_CALENDAR_LOCK = Lock()
+
+
+class FrozenMarkup(InlineKeyboardMarkup):
+    """Клавиатура из кэша: сериализуется в JSON один раз, изменять после создания нельзя"""
+
+    _json = None
+
+    def to_json(self):
+        if self._json is None:
+            self._json = super().to_json()
+        return self._json
 
 
 class CallbackData:
@@ -126,15 +147,82 @@ class CallbackData:
         return True
 
 
-def create_calendar(lst_current_date: list[datetime.date], name: str = "calendar", year: int = None, month: int = None,
-                    ) -> InlineKeyboardMarkup:
+class CallbackCodec:
+    """
+    Compiled callback data codec: the schema is validated once on construction,
+    values are encoded with a prepared template and decoded with a single split
+    """
+
+    def __init__(self, prefix, *parts, sep=":"):
+        # те же проверки схемы, что и у CallbackData
+        CallbackData(prefix, *parts, sep=sep)
+        self.prefix = prefix
+        self.sep = sep
+        self._part_names = parts
+        self._count = len(parts)
+        self._empty = sep + sep
+        self._template = sep.join([prefix.replace("{", "{{").replace("}", "}}")] + ["{}"] * len(parts))
+        # результат parse: кортеж с полями-частями
+        self.type = namedtuple("CallbackParts", parts)
+
+    def new(self, *values) -> str:
+        """
+        Generate callback data
+
+        :param values: Values of all parts in schema order
+        :return: Callback data
+        """
+        if len(values) != self._count:
+            raise TypeError(f"Expected {self._count} values, got {len(values)}!")
+        data = self._template.format(*values)
+        # разделитель внутри значения или пустое значение меняют число частей/дают пустую часть
+        if data.count(self.sep) != self._count or self._empty in data or data.endswith(self.sep):
+            raise ValueError(f"Values {values!r} can't be empty or contain separator {self.sep!r}!")
+        if len(data) > 64:
+            raise ValueError("Resulted callback data is too long!")
+        return data
+
+    def parse(self, callback_data: str) -> tuple:
+        """
+        Parse data from the callback data
+
+        :param callback_data: Callback data
+        :return: Named tuple of parts (without prefix)
+        """
+        parts = callback_data.split(self.sep)
+        if len(parts) != self._count + 1 or parts[0] != self.prefix:
+            raise ValueError("Passed callback data can't be parsed with that codec.")
+        return self.type._make(parts[1:])
+
+
+@lru_cache(maxsize=CALENDAR_CACHE_SIZE)
+def get_calendar_codec(name: str) -> CallbackCodec:
+    """Кодек callback данных календаря с именем name"""
+    return CallbackCodec(name, "action", "year", "month", "day")
+
+
+def parse_calendar_data(callback_data: str) -> tuple:
+    """
+    Разбор callback данных календаря кодеком его имени
+
+    :param callback_data: Callback данные кнопки календаря
+    :return: Имя календаря и кортеж частей (action, year, month, day)
+    """
+    name = callback_data.partition(":")[0]
+    return name, get_calendar_codec(name).parse(callback_data)
+
+
+def create_calendar(lst_current_date: typing.Collection[datetime.date], name: str = "calendar", year: int = None, month: int = None,
+                    counts: typing.Mapping[datetime.date, int] = None) -> InlineKeyboardMarkup:
     """
     Create a built-in inline keyboard with calendar
+    (готовые клавиатуры берутся из LRU-кэша, их нельзя изменять)
 
     :param lst_current_date: Список доступных дат для записи в формате datetime.date
     :param name: Имя календаря
     :param year: Год используемый календарём, если не используете текущий год.
     :param month: Месяц используемый календарём, если не используете текущий месяц.
+    :param counts: Количество свободного времени по датам (показывается на кнопках доступных дат)
     :return: Возвращает объект InlineKeyboardMarkup с календарём.
     """
 
@@ -145,11 +233,31 @@ def create_calendar(lst_current_date: list[datetime.date], name: str = "calendar
     if month is None:
         month = now_day.month
 
-    calendar_callback = CallbackData(name, "action", "year", "month", "day")
+    # клавиатура зависит только от доступных дней отображаемого месяца и количества свободного времени в них
+    counts = counts or {}
+    days = frozenset((x.day, counts.get(x, 0)) for x in lst_current_date if x.month == month and x.year == year)
+    key = (name, year, month, days)
+    with _CALENDAR_LOCK:
+        keyboard = _CALENDAR_CACHE.get(key)
+    if keyboard is None:
+        keyboard = _build_calendar(name, year, month, days)
+        with _CALENDAR_LOCK:
+            _CALENDAR_CACHE[key] = keyboard
+    return keyboard
+
+
+def _build_calendar(name: str, year: int, month: int, days: frozenset) -> FrozenMarkup:
+    """
+    Строит клавиатуру календаря на месяц
+
+    :param days: Пары (номер доступного дня месяца, количество свободного времени - 0, если неизвестно)
+    """
+    counts = dict(days)
+    calendar_callback = get_calendar_codec(name)
     data_ignore = calendar_callback.new("IGNORE", year, month, "!")
     data_months = calendar_callback.new("MONTHS", year, month, "!")
 
-    keyboard = InlineKeyboardMarkup(row_width=7)
+    keyboard = FrozenMarkup(row_width=7)
 
     keyboard.add(
         InlineKeyboardButton(
@@ -168,10 +276,10 @@ def create_calendar(lst_current_date: list[datetime.date], name: str = "calendar
                 row.append(InlineKeyboardButton(
                     " ", callback_data=data_ignore))
             else:
-                if datetime.date(year, month, day) in lst_current_date:
+                if day in counts:
                     row.append(
                         InlineKeyboardButton(
-                            str(day) + '✅',
+                            f'{day}✅{counts[day]}' if counts[day] else f'{day}✅',
                             callback_data=calendar_callback.new(
                                 "DAY", year, month, day),
                         )
@@ -218,7 +326,7 @@ def create_months_calendar(
     if year is None:
         year = datetime.datetime.now().year
 
-    calendar_callback = CallbackData(name, "action", "year", "month", "day")
+    calendar_callback = get_calendar_codec(name)
 
     keyboard = InlineKeyboardMarkup()
 
@@ -237,6 +345,49 @@ def create_months_calendar(
     return keyboard
 
 
+# Действия перелистывания календаря, для которых клавиатура пересоздаётся
+NAVIGATION_ACTIONS = ("PREVIOUS-MONTH", "NEXT-MONTH", "MONTHS", "MONTH")
+
+
+def get_navigation_markup(
+        name: str,
+        action: str,
+        year: int,
+        month: int,
+        lst_currant_date: list,
+        counts: dict = None
+) -> InlineKeyboardMarkup:
+    """
+    Создаёт клавиатуру для действия перелистывания календаря
+
+    :param name: Имя календаря
+    :param action: Одно из NAVIGATION_ACTIONS
+    :param year: Год из callback данных
+    :param month: Месяц из callback данных
+    :param lst_currant_date: Список доступных дат для записи в формате date
+    :param counts: Количество свободного времени по датам
+    :return: InlineKeyboardMarkup
+    """
+    current = datetime.datetime(int(year), int(month), 1)
+    if action == "PREVIOUS-MONTH":
+        preview_month = current - datetime.timedelta(days=1)
+        return create_calendar(
+            name=name, year=int(preview_month.year), month=int(preview_month.month),
+            lst_current_date=lst_currant_date, counts=counts
+        )
+    if action == "NEXT-MONTH":
+        next_month = current + datetime.timedelta(days=31)
+        return create_calendar(
+            name=name, year=int(next_month.year), month=int(next_month.month),
+            lst_current_date=lst_currant_date, counts=counts
+        )
+    if action == "MONTHS":
+        return create_months_calendar(name=name, year=current.year)
+    return create_calendar(
+        name=name, year=int(year), month=int(month),
+        lst_current_date=lst_currant_date, counts=counts)
+
+
 def calendar_query_handler(
         bot: TeleBot,
         call: CallbackQuery,
@@ -245,7 +396,8 @@ def calendar_query_handler(
         year: int,
         month: int,
         day: int,
-        lst_currant_date: list
+        lst_currant_date: list,
+        counts: dict = None
 ) -> None or datetime.datetime:
     """
     The method creates a new calendar if the forward or backward button is pressed
@@ -260,10 +412,10 @@ def calendar_query_handler(
     :param action:
     :param name:
     :param lst_currant_date: Список доступных дат для записи в формате date
+    :param counts: Количество свободного времени по датам
     :return: Returns a tuple
     """
 
-    current = datetime.datetime(int(year), int(month), 1)
     if action == "IGNORE":
         bot.answer_callback_query(callback_query_id=call.id, text='Тут ничего нет')
         return False, None
@@ -272,46 +424,12 @@ def calendar_query_handler(
         return False, None
     elif action == "DAY":
         return datetime.datetime(int(year), int(month), int(day))
-    elif action == "PREVIOUS-MONTH":
-        preview_month = current - datetime.timedelta(days=1)
-        bot.edit_message_text(
-            text=call.message.text,
-            chat_id=call.message.chat.id,
-            message_id=call.message.message_id,
-            reply_markup=create_calendar(
-                name=name, year=int(preview_month.year), month=int(preview_month.month),
-                lst_current_date=lst_currant_date
-            ),
-        )
-        return None
-    elif action == "NEXT-MONTH":
-        next_month = current + datetime.timedelta(days=31)
-        bot.edit_message_text(
-            text=call.message.text,
-            chat_id=call.message.chat.id,
-            message_id=call.message.message_id,
-            reply_markup=create_calendar(
-                name=name, year=int(next_month.year), month=int(next_month.month),
-                lst_current_date=lst_currant_date
-            ),
-        )
-        return None
-    elif action == "MONTHS":
-        bot.edit_message_text(
-            text=call.message.text,
-            chat_id=call.message.chat.id,
-            message_id=call.message.message_id,
-            reply_markup=create_months_calendar(name=name, year=current.year),
-        )
-        return None
-    elif action == "MONTH":
+    elif action in NAVIGATION_ACTIONS:
         bot.edit_message_text(
             text=call.message.text,
             chat_id=call.message.chat.id,
             message_id=call.message.message_id,
-            reply_markup=create_calendar(
-                name=name, year=int(year), month=int(month),
-                lst_current_date=lst_currant_date),
+            reply_markup=get_navigation_markup(name, action, year, month, lst_currant_date, counts),
         )
         return None
     elif action == "MENU":
@@ -327,3 +445,48 @@ def calendar_query_handler(
         #     chat_id=call.message.chat.id, message_id=call.message.message_id
         # )
         return None
+
+
+async def async_calendar_query_handler(
+        bot,
+        call: CallbackQuery,
+        name: str,
+        action: str,
+        year: int,
+        month: int,
+        day: int,
+        lst_currant_date: list,
+        counts: dict = None
+) -> None or datetime.datetime:
+    """
+    Асинхронная версия calendar_query_handler для telebot.async_telebot.AsyncTeleBot
+
+    :param bot: Объект AsyncTeleBot
+    :param call: CallbackQueryHandler data
+    :param lst_currant_date: Список доступных дат для записи в формате date
+    :param counts: Количество свободного времени по датам
+    :return: То же, что calendar_query_handler
+    """
+    if action == "IGNORE":
+        await bot.answer_callback_query(callback_query_id=call.id, text='Тут ничего нет')
+        return False, None
+    elif action == "DAY_EMPTY":
+        await bot.answer_callback_query(callback_query_id=call.id, text='Свободного времени нет')
+        return False, None
+    elif action == "DAY":
+        return datetime.datetime(int(year), int(month), int(day))
+    elif action in NAVIGATION_ACTIONS:
+        await bot.edit_message_text(
+            text=call.message.text,
+            chat_id=call.message.chat.id,
+            message_id=call.message.message_id,
+            reply_markup=get_navigation_markup(name, action, year, month, lst_currant_date, counts),
+        )
+        return None
+    elif action == "MENU":
+        return "MENU", None
+    elif action == "RETURN":
+        return "RETURN", None
+    else:
+        await bot.answer_callback_query(callback_query_id=call.id, text="ERROR!")
+        return None
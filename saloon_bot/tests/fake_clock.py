@@ -0,0 +1,13 @@
+"""
+Общие вспомогательные объекты тестов
+"""
+
+
+class FakeClock:
+    """Время, которое идёт только вручную: подставляется вместо monotonic"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
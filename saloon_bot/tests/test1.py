@@ -1,8 +1,7 @@
 import unittest
-from datetime import datetime, timedelta
 
 # Импортируем нужные переменные и функции из модуля clear_dict
-from clear_dict import CLIENT_DICT, CALENDAR_DICT, TIMER_DICT, clear_unused_info, clear_all_dict
+from clear_dict import CLIENT_DICT, CALENDAR_DICT, clear_unused_info, clear_all_dict
 
 # Заглушка для имитации реального объекта клиента
 class MockClient:
@@ -28,14 +27,10 @@ class TestUserInfoCleanup(unittest.TestCase):
         # Добавляем фиктивный календарь
         CALENDAR_DICT[self.chat_id] = "Test Calendar"
 
-        # Устанавливаем таймер более чем 60 минут назад, чтобы подходил под условие очистки
-        TIMER_DICT[self.chat_id] = datetime.now() - timedelta(days=2)
-
     # Метод, выполняющийся после каждого теста — очищает все словари
     def tearDown(self):
         CLIENT_DICT.clear()
         CALENDAR_DICT.clear()
-        TIMER_DICT.clear()
 
     # Тест на функцию clear_unused_info
     def test_clear_unused_info(self):
@@ -67,7 +62,6 @@ class TestUserInfoCleanup(unittest.TestCase):
         # Проверяем, что ключ chat_id удалён из всех словарей
         self.assertNotIn(self.chat_id, CLIENT_DICT)
         self.assertNotIn(self.chat_id, CALENDAR_DICT)
-        self.assertNotIn(self.chat_id, TIMER_DICT)
 
     # Тест на корректную работу при попытке очистки несуществующего chat_id
     def test_clear_nonexistent_chat_id(self):
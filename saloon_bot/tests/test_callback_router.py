@@ -0,0 +1,72 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+
+from callback_router import AsyncCallbackRouter, CallbackRouter, UNMATCHED
+
+
+class TestCallbackRouter(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+        self.router = CallbackRouter()
+        for prefix in ('CANCEL', 'APPROVE', 'APP_REC', 'TIME'):
+            self.router.prefix(prefix)(self.handler(prefix + '*'))
+        self.router.exact('CANCEL_RECORD')(self.handler('CANCEL_RECORD'))
+
+    def handler(self, name):
+        return lambda call: self.calls.append((name, call.data))
+
+    # Точное совпадение приоритетнее префикса, порядок регистрации не важен
+    def test_resolve(self):
+        for data, route in (('CANCEL_RECORD', 'CANCEL_RECORD'), ('CANCEL 1', 'CANCEL*'),
+                            ('APPROVECANCEL 1', 'APPROVE*'), ('APP_REC', 'APP_REC*'),
+                            ('TIME10:00', 'TIME*'), ('UNKNOWN', UNMATCHED)):
+            self.assertEqual(self.router.resolve(data)[0], route)
+
+    # Самый длинный префикс побеждает
+    def test_longest_prefix(self):
+        self.router.prefix('CANCEL_')(self.handler('CANCEL_*'))
+        self.router.dispatch(SimpleNamespace(data='CANCEL_1'))
+        self.router.dispatch(SimpleNamespace(data='CANCEL 1'))
+        self.assertEqual(self.calls, [('CANCEL_*', 'CANCEL_1'), ('CANCEL*', 'CANCEL 1')])
+
+    def test_stats(self):
+        self.router.exact('FAIL')(lambda call: 1 / 0)
+        self.router.dispatch(SimpleNamespace(data='TIME10:00'))
+        self.router.dispatch(SimpleNamespace(data='TIME11:00'))
+        self.router.dispatch(SimpleNamespace(data='UNKNOWN'))
+        with self.assertRaises(ZeroDivisionError):
+            self.router.dispatch(SimpleNamespace(data='FAIL'))
+        stats = self.router.stats()
+        self.assertEqual(stats['TIME*']['calls'], 2)
+        self.assertEqual(stats[UNMATCHED]['calls'], 1)
+        self.assertEqual(stats['FAIL']['errors'], 1)
+
+    # Ошибка зарегистрированного типа передаётся обработчику ошибок и учитывается в метриках
+    def test_on_error(self):
+        errors = []
+        self.router.exact('FAIL')(lambda call: 1 / 0)
+        self.router.on_error(ArithmeticError)(lambda call, ex: errors.append((call.data, type(ex))))
+        self.router.dispatch(SimpleNamespace(data='FAIL'))
+        self.assertEqual(errors, [('FAIL', ZeroDivisionError)])
+        self.assertEqual(self.router.stats()['FAIL']['errors'], 1)
+        self.router.exact('KEY')(lambda call: {}['missing'])
+        with self.assertRaises(KeyError):
+            self.router.dispatch(SimpleNamespace(data='KEY'))
+
+    def test_async(self):
+        router = AsyncCallbackRouter()
+        calls = []
+
+        @router.prefix('TIME')
+        async def handler(call):
+            calls.append(call.data)
+
+        asyncio.run(router.dispatch(SimpleNamespace(data='TIME10:00')))
+        self.assertEqual(calls, ['TIME10:00'])
+        self.assertEqual(router.stats()['TIME*']['calls'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
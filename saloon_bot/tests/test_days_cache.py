@@ -0,0 +1,70 @@
+import unittest
+from datetime import datetime
+
+from days_cache import DaysCache
+from schedule_mirror import ScheduleMirror
+from fake_clock import FakeClock
+
+
+class TestDaysCache(unittest.TestCase):
+
+    def setUp(self):
+        self.timer = FakeClock()
+        self.cache = DaysCache(maxsize=2, ttl=60, timer=self.timer)
+
+    # Ключом является пара (услуга, мастер), None - любой мастер
+    def test_get_set(self):
+        self.cache.set('Маникюр', None, ['22.05.25'])
+        self.cache.set('Маникюр', 'Крапивина Юлия', [])
+        self.assertEqual(self.cache.get('Маникюр', None), ('22.05.25',))
+        self.assertEqual(self.cache.get('Маникюр', 'Крапивина Юлия'), ())
+        self.assertIsNone(self.cache.get('Стрижка', None))
+        self.assertEqual(self.cache.stats(), {'size': 2, 'maxsize': 2, 'hits': 2, 'misses': 1})
+
+    # У каждой записи свой TTL
+    def test_ttl_per_entry(self):
+        self.cache.set('Маникюр', None, ['22.05.25'])
+        self.cache.set('Стрижка', None, ['23.05.25'], ttl=600)
+        self.timer.now = 61
+        self.assertIsNone(self.cache.get('Маникюр', None))
+        self.assertEqual(self.cache.get('Стрижка', None), ('23.05.25',))
+
+    # При переполнении вытесняется давно не использованная запись
+    def test_lru_eviction(self):
+        self.cache.set('Маникюр', None, [])
+        self.cache.set('Стрижка', None, [])
+        self.cache.get('Маникюр', None)
+        self.cache.set('Педикюр', None, [])
+        self.assertIsNone(self.cache.get('Стрижка', None))
+        self.assertIsNotNone(self.cache.get('Маникюр', None))
+
+
+    # Запись/отмена обновляет дату у всех мастеров услуги, другие услуги не затрагиваются
+    def test_update_date(self):
+        cache = DaysCache(maxsize=10, ttl=60, timer=self.timer)
+        cache.set('Маникюр', None, ['22.05.25', '24.05.25'])
+        cache.set('Маникюр', 'Крапивина Юлия', ['22.05.25'])
+        cache.set('Стрижка', None, ['22.05.25'])
+        cache.update_date('Маникюр', '22.05.25', lambda master: master is None)
+        cache.update_date('Маникюр', '23.05.25', lambda master: True)
+        self.assertEqual(cache.get('Маникюр', None), ('22.05.25', '23.05.25', '24.05.25'))
+        self.assertEqual(cache.get('Маникюр', 'Крапивина Юлия'), ('23.05.25',))
+        self.assertEqual(cache.get('Стрижка', None), ('22.05.25',))
+        cache.pop_service('Маникюр')
+        self.assertIsNone(cache.get('Маникюр', None))
+
+    # Предзагрузка заполняет кэш для всех мастеров услуги и для любого мастера
+    def test_prefetch(self):
+        mirror = ScheduleMirror('Услуга', 'Мастер')
+        mirror.load({'22.05.25': [{'Услуга': 'Маникюр', 'Мастер': 'А', '13:00': ''},
+                                  {'Услуга': 'Маникюр', 'Мастер': 'Б', '13:00': 'id: 1'}]})
+        cache = DaysCache(maxsize=10, ttl=60, timer=self.timer)
+        count = cache.prefetch(mirror, {'Маникюр': ['А', 'Б']}, datetime(2025, 5, 22, 12, 0))
+        self.assertEqual(count, 3)
+        self.assertEqual(cache.get('Маникюр', None), ('22.05.25',))
+        self.assertEqual(cache.get('Маникюр', 'А'), ('22.05.25',))
+        self.assertEqual(cache.get('Маникюр', 'Б'), ())
+
+
+if __name__ == '__main__':
+    unittest.main()
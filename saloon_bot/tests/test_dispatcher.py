@@ -0,0 +1,53 @@
+import unittest
+from threading import Event
+from time import sleep
+
+from telebot.types import Update
+from dispatcher import ChatDispatcher, get_chat_id
+
+
+class TestChatDispatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.dispatcher = ChatDispatcher(workers=4, queue_size=10)
+
+    def tearDown(self):
+        self.dispatcher.shutdown()
+
+    # Задачи одного чата выполняются строго в порядке поступления
+    def test_order_within_chat(self):
+        result = []
+        for i in range(10):
+            self.dispatcher.submit(1, lambda x: (sleep(0.001 * (10 - x)), result.append(x)), i)
+        self.dispatcher.shutdown()
+        self.assertEqual(result, list(range(10)))
+
+    # Долгая задача одного чата не блокирует другие чаты
+    def test_parallel_between_chats(self):
+        release = Event()
+        done = Event()
+        self.dispatcher.submit(1, release.wait, 5)
+        self.dispatcher.submit(2, done.set)
+        self.assertTrue(done.wait(1))
+        release.set()
+
+    # При переполнении очереди задача не принимается
+    def test_queue_limit(self):
+        release = Event()
+        dispatcher = ChatDispatcher(workers=1, queue_size=2)
+        self.assertTrue(dispatcher.submit(1, release.wait, 5, block=False))
+        self.assertTrue(dispatcher.submit(1, release.wait, 5, block=False))
+        self.assertFalse(dispatcher.submit(2, release.wait, 5, block=False))
+        release.set()
+        dispatcher.shutdown()
+
+    def test_get_chat_id(self):
+        update = Update.de_json({"update_id": 1, "callback_query": {
+            "id": "1", "from": {"id": 5, "is_bot": False, "first_name": "Test"},
+            "message": {"message_id": 7, "date": 0, "chat": {"id": 12345, "type": "private"}},
+            "chat_instance": "1", "data": "MENU"}})
+        self.assertEqual(get_chat_id(update), 12345)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,172 @@
+import unittest
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import gspread
+import requests
+from google.oauth2.credentials import Credentials
+
+from retry_policy import RetryPolicy
+from schedule_mirror import ScheduleMirror
+
+# Модуль подключается к таблице при импорте: без файла ключа и сети
+with patch('google.oauth2.service_account.Credentials.from_service_account_file',
+           return_value=Credentials(token='test')), \
+        patch('gspread.Client.open_by_key'):
+    import google_sheet
+
+RECORDS = [
+    {'Услуга': 'Маникюр', 'Мастер': 'Крапивина Юлия', '10:00': '', '13:00': 'id: 1'},
+    {'Услуга': 'Маникюр', 'Мастер': 'Иванова Анна', '10:00': '', '13:00': ''},
+]
+
+
+class FakeSpreadsheet:
+    """Ячейки таблицы, как их видят values_get/values_update"""
+
+    def __init__(self, cells: dict, errors=(), sheets=None):
+        self.cells = cells
+        # листы, которые читаются целиком: {название: записи get_all_records()}
+        self.sheets = sheets or {}
+        self.updates = []
+        # ошибки после записи: запись доходит до таблицы, но ответ не получен
+        self.errors = list(errors)
+
+    def values_get(self, cell):
+        value = self.cells.get(cell, '')
+        return {'values': [[value]]} if value else {}
+
+    def worksheet(self, title):
+        if title not in self.sheets:
+            raise gspread.exceptions.WorksheetNotFound(title)
+        return SimpleNamespace(get_all_records=lambda: [dict(record) for record in self.sheets[title]])
+
+    def values_update(self, cell, params=None, body=None):
+        self.cells[cell] = body['values'][0][0]
+        self.updates.append(cell)
+        if self.errors:
+            raise self.errors.pop(0)
+
+
+class TestSetTimeCas(unittest.TestCase):
+
+    def setUp(self):
+        self.mirror = ScheduleMirror('Услуга', 'Мастер')
+        self.mirror.load({'22.05.25': [dict(record) for record in RECORDS]})
+        self.now = datetime(2025, 5, 21, 12, 0)
+        for name, value in (('SCHEDULE', self.mirror),
+                            ('SHEETS_RETRY', RetryPolicy(3, 0, 0, google_sheet.is_transient_error,
+                                                         sleep=lambda delay: None))):
+            patcher = patch.object(google_sheet, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.session = google_sheet.GoogleSheets(1)
+        self.session.name_service = 'Маникюр'
+        self.session.date_record = '22.05.25'
+        self.session.time_record = '10:00'
+
+    def set_time(self, sheet: FakeSpreadsheet, client_record='id: 9', search_criteria='') -> bool:
+        with patch.object(google_sheet, 'sh', sheet):
+            cells = self.mirror.get_day('22.05.25').slot_cells('Маникюр', None, self.session.time_record,
+                                                               search_criteria)
+            return self.session._set_time_cas(cells, client_record, search_criteria)
+
+    # Ячейка не изменилась с чтения зеркала: запись выполняется
+    def test_swap(self):
+        sheet = FakeSpreadsheet({})
+        self.assertTrue(self.set_time(sheet))
+        self.assertEqual(sheet.updates, ["'22.05.25'!C2"])
+        self.assertEqual(sheet.cells["'22.05.25'!C2"], 'id: 9')
+        self.assertEqual(self.session.name_master, 'Крапивина Юлия')
+        self.assertEqual(self.mirror.find_records('id: 9', self.now),
+                         [['22.05.25', '10:00', 'Маникюр', 'Крапивина Юлия']])
+
+    # Все подходящие ячейки уже заняты в таблице: запись отклоняется, в таблицу ничего не пишется
+    def test_changed_cell_rejected(self):
+        sheet = FakeSpreadsheet({"'22.05.25'!C2": 'id: 5', "'22.05.25'!C3": 'id: 6'})
+        self.assertFalse(self.set_time(sheet))
+        self.assertEqual(sheet.updates, [])
+        self.assertIsNone(self.session.name_master)
+
+    # После отклонения зеркало исправляется по прочитанным ячейкам, запись идёт в следующую свободную
+    def test_mirror_corrected(self):
+        sheet = FakeSpreadsheet({"'22.05.25'!C2": 'id: 5'})
+        self.assertTrue(self.set_time(sheet))
+        self.assertEqual(sheet.updates, ["'22.05.25'!C3"])
+        self.assertEqual(self.session.name_master, 'Иванова Анна')
+        self.assertEqual(self.mirror.find_records('id: 5', self.now),
+                         [['22.05.25', '10:00', 'Маникюр', 'Крапивина Юлия']])
+        self.assertEqual(self.mirror.free_time('22.05.25', 'Маникюр', None, self.now), ['13:00'])
+
+    # Запись дошла до таблицы, но ответ потерян: повторяется только запись той же ячейки, клиент в одной ячейке
+    def test_write_landed_then_error(self):
+        sheet = FakeSpreadsheet({}, errors=[requests.exceptions.ConnectionError('reset')])
+        self.assertTrue(self.set_time(sheet))
+        self.assertEqual(sheet.updates, ["'22.05.25'!C2", "'22.05.25'!C2"])
+        self.assertEqual(sheet.cells, {"'22.05.25'!C2": 'id: 9'})
+        self.assertEqual(self.mirror.find_records('id: 9', self.now),
+                         [['22.05.25', '10:00', 'Маникюр', 'Крапивина Юлия']])
+
+    # Ячейка уже содержит запись клиента (прошлая запись дошла до таблицы): это успех, повторной записи нет
+    def test_already_written(self):
+        sheet = FakeSpreadsheet({"'22.05.25'!C2": 'id: 9'})
+        self.assertTrue(self.set_time(sheet))
+        self.assertEqual(sheet.updates, [])
+        self.assertEqual(self.session.name_master, 'Крапивина Юлия')
+
+    # Отмена, которая уже дошла до таблицы, тоже считается успешной
+    def test_cancel_already_applied(self):
+        self.session.time_record = '13:00'
+        sheet = FakeSpreadsheet({})
+        self.assertTrue(self.set_time(sheet, '', 'id: 1'))
+        self.assertEqual(sheet.updates, [])
+        self.assertEqual(self.mirror.find_records('id: 1', self.now), [])
+
+    # Отклонённая api запись и исчерпанные повторы сетевой ошибки обрабатываются одинаково
+    def test_write_failed(self):
+        response = SimpleNamespace(status_code=400, text='bad request', json=lambda: {'error': 'bad request'})
+        for error in ([gspread.exceptions.APIError(response)], [requests.exceptions.ConnectionError('reset')] * 3):
+            with self.subTest(error=error[0]):
+                self.assertFalse(self.set_time(FakeSpreadsheet({}, errors=error)))
+                self.assertIsNone(self.session.name_master)
+                self.assertEqual(self.mirror.find_records('id: 9', self.now), [])
+
+    # Через set_time: запись дошла до таблицы, но все повторы получили ошибку - клиент видит неудачу;
+    # повторное нажатие находит свою запись и не занимает вторую ячейку
+    def test_set_time_retried_by_client(self):
+        sheet = FakeSpreadsheet({}, errors=[requests.exceptions.ConnectionError('reset')] * 3)
+        with patch.object(google_sheet, 'sh', sheet):
+            self.assertFalse(self.session.set_time('id: 9'))
+            self.assertTrue(self.session.set_time('id: 9'))
+        self.assertEqual(sheet.cells, {"'22.05.25'!C2": 'id: 9'})
+        self.assertEqual(self.mirror.find_records('id: 9', self.now),
+                         [['22.05.25', '10:00', 'Маникюр', 'Крапивина Юлия']])
+
+    # Листа нет в зеркале: он читается целиком до блокировки записи, запись идёт по ячейкам из зеркала
+    def test_sheet_not_in_mirror(self):
+        self.session.date_record = '24.05.25'
+        sheet = FakeSpreadsheet({}, sheets={'24.05.25': RECORDS})
+        with patch.object(google_sheet, 'sh', sheet):
+            self.assertTrue(self.session.set_time('id: 9'))
+            self.session.date_record = '25.05.25'
+            self.assertFalse(self.session.set_time('id: 9'))
+        self.assertEqual(sheet.cells, {"'24.05.25'!C2": 'id: 9'})
+        self.assertIsNotNone(self.mirror.get_day('24.05.25'))
+
+
+class TestChecksums(unittest.TestCase):
+
+    # Колонка контрольной суммы ищется по заголовку, на листе без неё контрольная сумма пустая
+    def test_checksum_column_by_header(self):
+        response = {'valueRanges': [{'values': [['Услуга', 'Мастер', '10:00', 'Контроль'], ['Маникюр', 'А', '', '42']]},
+                                    {'values': [['Услуга', 'Мастер', '10:00', '13:00'], ['Маникюр', 'А']]},
+                                    {}]}
+        sheet = SimpleNamespace(values_batch_get=lambda ranges: response)
+        with patch.object(google_sheet, 'sh', sheet):
+            self.assertEqual(google_sheet.batch_get_checksums(['22.05.25', '23.05.25', '24.05.25']),
+                             {'22.05.25': '42', '23.05.25': '', '24.05.25': ''})
+
+
+if __name__ == '__main__':
+    unittest.main()
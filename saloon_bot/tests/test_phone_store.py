@@ -0,0 +1,51 @@
+import os
+import tempfile
+import unittest
+
+from phone_store import PhoneStore
+
+
+class TestPhoneStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'clients.sqlite3')
+        self.store = PhoneStore(self.path, cache_size=2)
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp_dir.cleanup()
+
+    def test_get_set(self):
+        self.assertIsNone(self.store.get(12345))
+        self.store.set(12345, '+79000000000', 'test')
+        self.store.set(54321, '')
+        self.assertEqual(self.store.get(12345), '+79000000000')
+        self.assertEqual(self.store.get(54321), '')
+
+    # Телефоны сохраняются после перезапуска
+    def test_persistence(self):
+        self.store.set(12345, '+79000000000')
+        store = PhoneStore(self.path)
+        self.assertEqual(store.get(12345), '+79000000000')
+        store.close()
+
+    # Повторные чтения найденных клиентов идут из кэша, отсутствующих - из базы
+    def test_cache(self):
+        self.store.set(12345, '+79000000000')
+        self.store.get(12345)
+        self.store.get(99999)
+        self.store.get(99999)
+        self.assertEqual((self.store.hits, self.store.misses), (1, 2))
+
+    # Телефон, сохранённый другим процессом, виден после того, как клиента не было в базе
+    def test_shared_store(self):
+        other = PhoneStore(self.path)
+        self.assertIsNone(self.store.get(12345))
+        other.set(12345, '+79000000000')
+        self.assertEqual(self.store.get(12345), '+79000000000')
+        other.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+import unittest
+from threading import Thread, Event
+from time import sleep
+
+from rate_limiter import TokenBucket, SheetsRateLimiter, RateLimitTimeout, BOOKING, BROWSE, BACKGROUND
+from retry_policy import ServiceUnavailable
+from fake_clock import FakeClock
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        # 1 токен в секунду, запас 2 токена
+        self.bucket = TokenBucket('read', 1, 2, self.clock)
+
+    # Запас выдаётся без ожидания, дальше - по скорости пополнения
+    def test_burst_and_refill(self):
+        self.assertEqual(self.bucket.acquire(), 0.0)
+        self.assertEqual(self.bucket.acquire(), 0.0)
+        self.assertRaises(RateLimitTimeout, self.bucket.acquire, BROWSE, 0)
+        self.clock.now += 1
+        self.assertEqual(self.bucket.acquire(), 0.0)
+        # запас не превышает capacity
+        self.clock.now += 100
+        for _ in range(2):
+            self.bucket.acquire()
+        self.assertRaises(RateLimitTimeout, self.bucket.acquire, BROWSE, 0)
+        stats = self.bucket.stats()
+        self.assertEqual(stats['acquired'], 5)
+        self.assertEqual(stats['waiting'], 0)
+
+    # После ответа 429 токены не выдаются до конца паузы, запас не накапливается
+    def test_pause(self):
+        self.bucket.pause(10)
+        self.clock.now += 5
+        self.assertRaises(RateLimitTimeout, self.bucket.acquire, BOOKING, 0)
+        self.clock.now += 6
+        self.assertEqual(self.bucket.acquire(), 0.0)
+        self.assertRaises(RateLimitTimeout, self.bucket.acquire, BOOKING, 0)
+        self.assertEqual(self.bucket.stats()['quota_errors'], 1)
+
+    # Ожидание токена попадает в метрики
+    def test_throttled_metrics(self):
+        bucket = TokenBucket('write', 50, 1)
+        bucket.acquire()
+        self.assertGreater(bucket.acquire(BOOKING), 0)
+        stats = bucket.stats()
+        self.assertEqual(stats['throttled'], {'booking': 1, 'browse': 0, 'background': 0})
+        self.assertGreater(stats['wait_seconds'], 0)
+
+
+class TestPriority(unittest.TestCase):
+
+    # Пока ждёт запись клиента, просмотр не забирает освободившийся токен
+    def test_booking_first(self):
+        bucket = TokenBucket('read', 20, 1)
+        bucket.acquire()
+        order = []
+        started = Event()
+
+        def request(priority, name):
+            started.set()
+            bucket.acquire(priority)
+            order.append(name)
+
+        browse = Thread(target=request, args=(BACKGROUND, 'background'))
+        browse.start()
+        started.wait(1)
+        sleep(0.01)
+        booking = Thread(target=request, args=(BOOKING, 'booking'))
+        booking.start()
+        browse.join(2)
+        booking.join(2)
+        self.assertEqual(order, ['booking', 'background'])
+
+    # Приоритет задаётся для потока, вложенный блок его не понижает
+    def test_thread_priority(self):
+        limiter = SheetsRateLimiter(60, 60)
+        self.assertEqual(limiter.current_priority, BROWSE)
+        with limiter.priority(BOOKING):
+            with limiter.priority(BACKGROUND):
+                self.assertEqual(limiter.current_priority, BOOKING)
+            priority = []
+            thread = Thread(target=lambda: priority.append(limiter.current_priority))
+            thread.start()
+            thread.join()
+            self.assertEqual(priority, [BROWSE])
+        self.assertEqual(limiter.current_priority, BROWSE)
+
+    # GET расходует квоту чтения, остальные методы - квоту записи
+    def test_buckets(self):
+        limiter = SheetsRateLimiter(60, 30)
+        self.assertIs(limiter.bucket('get'), limiter.read)
+        self.assertIs(limiter.bucket('put'), limiter.write)
+        self.assertEqual(limiter.write.capacity, 5)
+        limiter.acquire('post')
+        self.assertEqual(limiter.stats()['write']['acquired'], 1)
+        self.assertEqual(limiter.stats()['read']['acquired'], 0)
+
+    # Токены, взятые заранее, расходуются без ожидания, неиспользованные возвращаются
+    def test_reserve(self):
+        limiter = SheetsRateLimiter(6, 60, burst_seconds=20)
+        self.assertEqual(limiter.read.capacity, 2)
+        with limiter.reserve('get', 2):
+            self.assertRaises(RateLimitTimeout, limiter.read.acquire, BROWSE, 0)
+            self.assertEqual(limiter.acquire('get', timeout=0), 0.0)
+        # второй токен не понадобился и вернулся в квоту
+        self.assertEqual(limiter.acquire('get', timeout=0), 0.0)
+        self.assertRaises(RateLimitTimeout, limiter.acquire, 'get', 0)
+        # в другом потоке заранее взятые токены не действуют
+        with limiter.reserve('put'):
+            credit = []
+            thread = Thread(target=lambda: credit.append(limiter._credit()))
+            thread.start()
+            thread.join()
+            self.assertEqual(credit, [{}])
+
+    # Ожидание заранее взятых токенов ограничено: по истечении времени полученные токены возвращаются
+    def test_reserve_timeout(self):
+        clock = FakeClock()
+        limiter = SheetsRateLimiter(6, 60, burst_seconds=20, clock=clock)
+        with self.assertRaises(RateLimitTimeout):
+            with limiter.reserve('get', 3, timeout=0):
+                pass
+        self.assertEqual(limiter._credit(), {})
+        for _ in range(2):
+            self.assertEqual(limiter.acquire('get', timeout=0), 0.0)
+        self.assertRaises(RateLimitTimeout, limiter.acquire, 'get', 0)
+
+    # Общий срок ограничивает суммарное ожидание всех запросов блока, вложенный блок его не продлевает
+    def test_deadline(self):
+        clock = FakeClock()
+        limiter = SheetsRateLimiter(6, 60, burst_seconds=20, clock=clock)
+        with limiter.deadline(5):
+            limiter.acquire('get', timeout=30)
+            clock.now += 5
+            with limiter.deadline(60):
+                with self.assertRaises(ServiceUnavailable):
+                    limiter.acquire('get', timeout=30)
+                    limiter.acquire('get', timeout=30)
+        # вне блока действует только timeout запроса
+        clock.now += 10
+        self.assertEqual(limiter.acquire('get', timeout=0), 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,222 @@
+import asyncio
+import unittest
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import aiohttp
+
+from async_sheets import AsyncSheetsClient, is_transient_error
+from retry_policy import CircuitBreaker, RetryPolicy, RetryError, CircuitOpenError, CLOSED, OPEN, HALF_OPEN
+from fake_clock import FakeClock
+
+
+class QuotaError(Exception):
+    """Временная ошибка api (429)"""
+
+
+class TestRetryPolicy(unittest.TestCase):
+
+    def setUp(self):
+        self.sleeps = []
+        # rand возвращает верхнюю границу интервала, чтобы проверить рост паузы
+        self.policy = RetryPolicy(3, 1, 3, lambda ex: isinstance(ex, QuotaError),
+                                  sleep=self.sleeps.append, rand=lambda low, high: high)
+
+    # Временная ошибка повторяется, пауза растёт до max_delay
+    def test_retry_transient(self):
+        calls = []
+
+        @self.policy
+        def load():
+            calls.append(1)
+            if len(calls) < 3:
+                raise QuotaError('429')
+            return 'ok'
+
+        self.assertEqual(load(), 'ok')
+        self.assertEqual(self.sleeps, [1, 2])
+        self.assertEqual(self.policy.stats()['retries'], 2)
+
+    # Число попыток ограничено, исходная ошибка сохраняется в __cause__
+    def test_exhausted(self):
+        @self.policy
+        def load():
+            raise QuotaError('429')
+
+        with self.assertRaises(RetryError) as cm:
+            load()
+        self.assertIsInstance(cm.exception.__cause__, QuotaError)
+        self.assertEqual(self.sleeps, [1, 2])
+        self.assertEqual(self.policy.stats()['exhausted'], 1)
+
+    # Ошибки в коде (переименованная колонка) не повторяются
+    def test_programming_error(self):
+        calls = []
+
+        @self.policy
+        def load():
+            calls.append(1)
+            return {}['Услуга']
+
+        self.assertRaises(KeyError, load)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(self.sleeps, [])
+
+    # Вложенные вызовы не умножают число попыток
+    def test_nested(self):
+        calls = []
+
+        @self.policy
+        def inner():
+            calls.append(1)
+            raise QuotaError('429')
+
+        @self.policy
+        def outer():
+            return inner()
+
+        self.assertRaises(RetryError, outer)
+        self.assertEqual(len(calls), 3)
+
+    # Если api недоступно, отдаётся запасной результат, None - исключение
+    def test_fallback(self):
+        stale = {}
+
+        @self.policy(fallback=lambda: stale.get('services'))
+        def load():
+            raise CircuitOpenError('open')
+
+        self.assertRaises(CircuitOpenError, load)
+        stale['services'] = {'Маникюр': ['Крапивина Юлия']}
+        self.assertEqual(load(), stale['services'])
+        self.assertEqual(self.policy.stats()['fallbacks'], 1)
+        self.assertEqual(self.sleeps, [])
+
+    # Контекст scope открывается один раз на все попытки вызова
+    def test_scope(self):
+        scopes = []
+
+        @contextmanager
+        def scope():
+            scopes.append('enter')
+            yield
+            scopes.append('exit')
+
+        policy = RetryPolicy(3, 1, 3, lambda ex: isinstance(ex, QuotaError), sleep=self.sleeps.append,
+                             rand=lambda low, high: high, scope=scope)
+        calls = []
+
+        @policy
+        def load():
+            calls.append(1)
+            if len(calls) < 3:
+                raise QuotaError('429')
+            return 'ok'
+
+        self.assertEqual(load(), 'ok')
+        self.assertEqual(scopes, ['enter', 'exit'])
+
+    # Корутины повторяются с async_sleep, а не с блокирующим sleep
+    def test_async_retry(self):
+        async_sleeps = []
+
+        async def fake_sleep(delay):
+            async_sleeps.append(delay)
+
+        policy = RetryPolicy(3, 1, 3, lambda ex: isinstance(ex, QuotaError), sleep=self.sleeps.append,
+                             rand=lambda low, high: high, async_sleep=fake_sleep)
+        calls = []
+
+        @policy
+        async def load():
+            calls.append(1)
+            if len(calls) < 2:
+                raise QuotaError('429')
+            return 'ok'
+
+        self.assertEqual(asyncio.run(load()), 'ok')
+        self.assertEqual(async_sleeps, [1])
+        self.assertEqual(self.sleeps, [])
+
+
+class TestAsyncSheetsClient(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(3, 30, self.clock)
+
+        async def no_sleep(delay):
+            pass
+
+        policy = RetryPolicy(3, 1, 3, is_transient_error, async_sleep=no_sleep)
+        self.client = AsyncSheetsClient(None, 'key', retry=policy, breaker=self.breaker)
+        self.responses = []
+
+        async def send(method, path, **kwargs):
+            response = self.responses.pop(0)
+            if isinstance(response, Exception):
+                raise response
+            return response
+
+        self.client._send = send
+
+    @staticmethod
+    def response_error(status):
+        return aiohttp.ClientResponseError(SimpleNamespace(real_url='/values/A1'), (), status=status)
+
+    # 503 повторяется, успешный ответ замыкает предохранитель
+    def test_retry_transient(self):
+        self.responses = [self.response_error(503), {'values': []}]
+        self.assertEqual(asyncio.run(self.client.request('GET', '/values/A1')), {'values': []})
+        self.assertEqual(self.breaker.stats()['failures'], 0)
+
+    # Ошибка в запросе (400) не повторяется и не размыкает предохранитель
+    def test_client_error(self):
+        self.responses = [self.response_error(400)]
+        self.assertRaises(aiohttp.ClientResponseError, asyncio.run, self.client.request('GET', '/values/A1'))
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    # Исчерпанные попытки размыкают предохранитель, следующий запрос к api не отправляется
+    def test_circuit_opens(self):
+        self.responses = [aiohttp.ClientConnectionError(), asyncio.TimeoutError(), self.response_error(429)]
+        self.assertRaises(RetryError, asyncio.run, self.client.request('GET', '/values/A1'))
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertRaises(CircuitOpenError, asyncio.run, self.client.request('GET', '/values/A1'))
+        self.assertEqual(self.responses, [])
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(2, 30, self.clock)
+
+    def test_open_and_reset(self):
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertRaises(CircuitOpenError, self.breaker.check)
+        # после паузы пропускается один пробный запрос
+        self.clock.now += 30
+        self.assertTrue(self.breaker.allow())
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.assertFalse(self.breaker.allow())
+        # ошибка пробного запроса снова размыкает предохранитель
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, OPEN)
+        self.clock.now += 30
+        self.breaker.check()
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.stats(), {'state': CLOSED, 'failures': 0, 'opened': 2, 'rejected': 2})
+
+    # Успешный ответ сбрасывает счётчик ошибок подряд
+    def test_success_resets(self):
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CLOSED)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import unittest
+from datetime import datetime, time
+
+from schedule_mirror import DaySchedule, ScheduleMirror, values_to_records
+
+# Записи листа в формате get_all_records()
+RECORDS = [
+    {'Услуга': 'Маникюр', 'Мастер': 'Крапивина Юлия', '10:00': '', '13:00': 'id: 1', '16:00': ''},
+    {'Услуга': 'Маникюр', 'Мастер': 'Иванова Анна', '10:00': 'id: 2', '13:00': '', '16:00': 'id: 3'},
+    {'Услуга': 'Стрижка', 'Мастер': 'Иванова Анна', '10:00': 'id: 1', '13:00': 'id: 4', '16:00': 'id: 5'},
+]
+
+
+class TestScheduleMirror(unittest.TestCase):
+
+    def setUp(self):
+        self.mirror = ScheduleMirror('Услуга', 'Мастер')
+        self.mirror.load({'22.05.25': RECORDS, '23.05.25': RECORDS, 'Работники': []})
+        self.now = datetime(2025, 5, 22, 12, 0)
+
+    # Листы, не являющиеся датой, в зеркало не попадают
+    def test_load_skips_not_date(self):
+        self.assertTrue(self.mirror.loaded)
+        self.assertIsNone(self.mirror.get_day('Работники'))
+        self.assertIsNotNone(self.mirror.get_day('22.05.25'))
+
+    # Для сегодняшнего дня учитывается только время позже текущего
+    def test_free_time(self):
+        self.assertEqual(self.mirror.free_time('22.05.25', 'Маникюр', None, self.now), ['13:00', '16:00'])
+        self.assertEqual(self.mirror.free_time('23.05.25', 'Маникюр', None, self.now),
+                         ['10:00', '13:00', '16:00'])
+        self.assertEqual(self.mirror.free_time('22.05.25', 'Маникюр', 'Иванова Анна', self.now), ['13:00'])
+        self.assertEqual(self.mirror.free_time('24.05.25', 'Маникюр', None, self.now), [])
+
+    def test_available_days(self):
+        self.assertEqual(self.mirror.available_days('Маникюр', None, self.now), ['22.05.25', '23.05.25'])
+        self.assertEqual(self.mirror.available_days('Стрижка', None, self.now), [])
+
+    # Количество свободного времени по датам, счётчики обновляются после записи
+    def test_heatmap(self):
+        self.assertEqual(self.mirror.heatmap('Маникюр', None, self.now), {'22.05.25': 2, '23.05.25': 3})
+        self.assertEqual(self.mirror.heatmap('Маникюр', 'Иванова Анна', self.now), {'22.05.25': 1, '23.05.25': 1})
+        self.assertEqual(self.mirror.heatmap('Маникюр', None, self.now, count_days=0), {'22.05.25': 2})
+        self.mirror.set_slot('22.05.25', '13:00', 'Маникюр', 'Иванова Анна', 'id: 9', '')
+        self.assertEqual(self.mirror.heatmap('Маникюр', 'Иванова Анна', self.now), {'23.05.25': 1})
+
+    # Матрица свободных слотов: колонки времени по возрастанию, даже если на листе они не по порядку
+    def test_slot_matrix(self):
+        day = DaySchedule('24.05.25', [{'Услуга': 'Маникюр', 'Мастер': 'А', '9:30': '', '13:00': 'id: 1', '10:00': ''},
+                                       {'Услуга': 'Маникюр', 'Мастер': 'Б', '9:30': 'id: 2', '13:00': '', '10:00': ''}],
+                          'Услуга', 'Мастер')
+        self.assertEqual(day.slot_times, ('9:30', '10:00', '13:00'))
+        self.assertEqual(day.free.tolist(), [[True, True, False], [False, True, True]])
+        self.assertEqual(day.free_times('Маникюр', 'Б'), ['10:00', '13:00'])
+        self.assertEqual(day.free_times('Маникюр', None, time(9, 59, 30)), ['10:00', '13:00'])
+        self.assertEqual(day.free_count('Маникюр', 'А', time(10, 0)), 0)
+        self.assertFalse(day.has_free('Стрижка', None))
+        self.assertEqual(DaySchedule('25.05.25', [], 'Услуга', 'Мастер').free_times('Маникюр', None), [])
+
+    # Листы с одинаковыми заголовками и строками делят одну разобранную раскладку
+    def test_shared_layout(self):
+        first, second = self.mirror.get_day('22.05.25'), self.mirror.get_day('23.05.25')
+        self.assertIs(first.parsed_times, second.parsed_times)
+        self.assertIs(first.master_rows, second.master_rows)
+        self.assertIsNot(first.free, second.free)
+        self.mirror.set_slot('22.05.25', '10:00', 'Маникюр', 'Крапивина Юлия', 'id: 9', '')
+        self.assertEqual(self.mirror.free_time('23.05.25', 'Маникюр', 'Крапивина Юлия', self.now),
+                         ['10:00', '16:00'])
+
+    def test_find_records(self):
+        self.assertEqual(self.mirror.find_records('id: 1', self.now),
+                         [['22.05.25', '13:00', 'Маникюр', 'Крапивина Юлия'],
+                          ['23.05.25', '10:00', 'Стрижка', 'Иванова Анна'],
+                          ['23.05.25', '13:00', 'Маникюр', 'Крапивина Юлия']])
+
+    # По умолчанию записи ищутся на весь горизонт записи (AVAILABILITY_DAYS), а не на неделю
+    def test_find_records_horizon(self):
+        self.mirror.update_day('12.06.25', RECORDS)
+        self.assertIn(['12.06.25', '13:00', 'Маникюр', 'Крапивина Юлия'], self.mirror.find_records('id: 1', self.now))
+        self.assertEqual(self.mirror.available_days('Маникюр', None, self.now), ['22.05.25', '23.05.25', '12.06.25'])
+
+    # Индекс клиентов обновляется при записи, отмене и замене листа
+    def test_client_index_updates(self):
+        self.mirror.set_slot('23.05.25', '16:00', 'Маникюр', 'Крапивина Юлия', 'id: 1', '')
+        self.mirror.set_slot('23.05.25', '10:00', 'Стрижка', 'Иванова Анна', '', 'id: 1')
+        self.assertEqual(self.mirror.find_records('id: 1', self.now)[1:],
+                         [['23.05.25', '13:00', 'Маникюр', 'Крапивина Юлия'],
+                          ['23.05.25', '16:00', 'Маникюр', 'Крапивина Юлия']])
+        self.mirror.update_day('23.05.25', RECORDS[1:2])
+        self.mirror.remove_day('22.05.25')
+        self.assertEqual(self.mirror.find_records('id: 1', self.now), [])
+        self.assertEqual(self.mirror.find_records('id: 3', self.now), [['23.05.25', '16:00', 'Маникюр', 'Иванова Анна']])
+
+    # Запись в ячейку сразу отражается в зеркале
+    def test_set_slot(self):
+        self.mirror.set_slot('23.05.25', '10:00', 'Маникюр', 'Крапивина Юлия', 'id: 9', '')
+        self.assertEqual(self.mirror.free_time('23.05.25', 'Маникюр', 'Крапивина Юлия', self.now), ['16:00'])
+
+
+    # Координаты ячеек считаются с 1, первая строка листа - заголовки
+    def test_slot_cells(self):
+        day = self.mirror.get_day('22.05.25')
+        self.assertEqual(day.slot_cells('Маникюр', None, '13:00', ''), [(3, 4, 'Иванова Анна')])
+        self.assertEqual(day.slot_cells('Маникюр', None, '10:00', ''), [(2, 3, 'Крапивина Юлия')])
+        self.assertEqual(day.slot_cells('Стрижка', None, '10:00', 'id: 1'), [(4, 3, 'Иванова Анна')])
+        self.assertEqual(day.slot_cells('Маникюр', None, '11:00', ''), [])
+
+    # Пустые ячейки в конце строки values.batchGet не возвращает
+    def test_values_to_records(self):
+        values = [['Услуга', 'Мастер', '10:00', '13:00'], ['Маникюр', 'Иванова Анна', 'id: 2']]
+        self.assertEqual(values_to_records(values),
+                         [{'Услуга': 'Маникюр', 'Мастер': 'Иванова Анна', '10:00': 'id: 2', '13:00': ''}])
+        self.assertEqual(values_to_records([]), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
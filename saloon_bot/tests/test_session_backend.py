@@ -0,0 +1,133 @@
+import asyncio
+import threading
+import unittest
+from datetime import date
+
+from session_backend import AsyncSessions, RedisSessionStore, SessionBackend, SessionStore
+from session_state import SessionState, shared_dates
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+
+def make_session() -> SessionState:
+    session = SessionState(12345)
+    session.name_service = 'Маникюр'
+    session.date_record = '22.05.25'
+    session.lst_currant_date = shared_dates(('22.05.25', '23.05.25'))
+    session.lst_records = [['22.05.25', '13:00', 'Маникюр', 'Крапивина Юлия']]
+    return session
+
+
+class TestSessionState(unittest.TestCase):
+
+    # Состояние сессии переживает сериализацию, набор дат остаётся общим
+    def test_round_trip(self):
+        session = SessionState.from_state(make_session().to_state())
+        self.assertEqual(session.name_service, 'Маникюр')
+        self.assertEqual(session.date_record, '22.05.25')
+        self.assertIs(session.lst_currant_date, shared_dates(('22.05.25', '23.05.25')))
+        self.assertEqual(session.lst_records, [['22.05.25', '13:00', 'Маникюр', 'Крапивина Юлия']])
+        self.assertIsNone(session.time_record)
+
+
+@unittest.skipIf(fakeredis is None, 'fakeredis не установлен')
+class TestRedisSessionStore(unittest.TestCase):
+
+    def setUp(self):
+        self.server = fakeredis.FakeServer()
+        self.store = self.make_store()
+
+    def make_store(self, name='client') -> RedisSessionStore:
+        return RedisSessionStore(fakeredis.FakeRedis(server=self.server), name, idle_ttl=60, factory=SessionState)
+
+    # Сессия, сохранённая одним процессом, видна другому
+    def test_shared_between_processes(self):
+        self.store[12345] = make_session()
+        session = self.make_store().get(12345)
+        self.assertIsInstance(session, SessionState)
+        self.assertEqual(session.lst_currant_date, frozenset({date(2025, 5, 22), date(2025, 5, 23)}))
+
+    # Время простоя хранит Redis, обращение его продлевает
+    def test_idle_ttl(self):
+        self.store[12345] = make_session()
+        key = 'saloon_bot:sessions:client:12345'
+        self.store.client.expire(key, 5)
+        self.store.get(12345)
+        self.assertGreater(self.store.client.ttl(key), 5)
+
+    # Два процесса меняют разные поля одной сессии - сохраняются оба изменения
+    def test_concurrent_update(self):
+        self.store[12345] = make_session()
+        other = self.make_store()
+        first = self.store.get(12345)
+        second = other.get(12345)
+        first.name_master = 'Крапивина Юлия'
+        second.time_record = '13:00'
+        self.store[12345] = first
+        other[12345] = second
+        session = self.make_store().get(12345)
+        self.assertEqual((session.name_master, session.time_record, session.name_service),
+                         ('Крапивина Юлия', '13:00', 'Маникюр'))
+
+    # Сессия, удалённая другим процессом, сохраняется целиком
+    def test_update_after_pop(self):
+        self.store[12345] = make_session()
+        session = self.store.get(12345)
+        self.make_store().pop(12345)
+        session.time_record = '13:00'
+        self.store[12345] = session
+        session = self.make_store().get(12345)
+        self.assertEqual((session.client_id, session.name_service, session.time_record),
+                         (12345, 'Маникюр', '13:00'))
+
+    # Асинхронный бот обращается к Redis из пула потоков, не блокируя цикл событий
+    def test_async_sessions(self):
+        sessions = AsyncSessions(self.store)
+
+        async def run():
+            await sessions.set(12345, make_session())
+            session = await sessions.get(12345)
+            return session.name_service, await sessions.run(threading.get_ident)
+
+        name_service, thread = asyncio.run(run())
+        self.assertEqual(name_service, 'Маникюр')
+        self.assertNotEqual(thread, threading.get_ident())
+        self.assertIsInstance(asyncio.run(sessions.pop(12345)), SessionState)
+        self.assertNotIn(12345, self.store)
+
+    def test_pop_clear(self):
+        calendars = RedisSessionStore(fakeredis.FakeRedis(server=self.server), 'calendar')
+        calendars[1] = '1'
+        self.store[1] = make_session()
+        self.assertEqual(calendars.pop(1), '1')
+        self.assertIsNone(calendars.pop(1))
+        self.assertNotIn(1, calendars)
+        self.store.clear()
+        self.assertEqual(len(self.store), 0)
+
+
+class TestSessionStoreInterface(unittest.TestCase):
+
+    def test_missing_key(self):
+        store = SessionStore()
+        with self.assertRaises(KeyError):
+            del store[1]
+        store[1] = 'a'
+        del store[1]
+        self.assertNotIn(1, store)
+
+    # Хранилище без всех методов интерфейса не создаётся
+    def test_abstract(self):
+        class Incomplete(SessionBackend):
+            def get(self, chat_id, default=None):
+                return default
+
+        self.assertRaises(TypeError, SessionBackend)
+        self.assertRaises(TypeError, Incomplete)
+
+
+if __name__ == '__main__':
+    unittest.main()
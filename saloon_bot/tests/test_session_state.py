@@ -0,0 +1,62 @@
+import unittest
+from datetime import date, datetime
+
+from session_state import SessionState, shared_dates, SERVICES
+
+
+class TestSessionState(unittest.TestCase):
+
+    # У сессии нет __dict__, лишние атрибуты не заводятся
+    def test_slots(self):
+        session = SessionState(12345)
+        self.assertFalse(hasattr(session, '__dict__'))
+        with self.assertRaises(AttributeError):
+            session.unknown = 1
+
+    # Одинаковые наборы дат - один общий объект
+    def test_shared_dates(self):
+        dates = shared_dates(('22.05.25', '23.05.25', 'Сотрудники'))
+        self.assertEqual(dates, frozenset({date(2025, 5, 22), date(2025, 5, 23)}))
+        self.assertIs(shared_dates(('22.05.25', '23.05.25', 'Сотрудники')), dates)
+
+    # Дата записи, собранная в разных сессиях, хранится одной строкой
+    def test_date_record_interned(self):
+        first, second = SessionState(1), SessionState(2)
+        first.date_record = datetime(2025, 5, 22).strftime('%d.%m.%y')
+        second.date_record = datetime(2025, 5, 22).strftime('%d.%m.%y')
+        self.assertIs(first.date_record, second.date_record)
+        first.date_record = None
+        self.assertIsNone(first.date_record)
+
+    # Выбор клиента хранится целыми ключами, свободное время - общий кортеж
+    def test_compact_keys(self):
+        first, second = SessionState(1), SessionState(2)
+        for session in (first, second):
+            session.name_service = 'Маникюр'
+            session.date_record = '22.05.25'
+            session.dct_currant_time = ['10:00', '13:00']
+        self.assertEqual(first._service, SERVICES.id('Маникюр'))
+        self.assertEqual(first._date, date(2025, 5, 22).toordinal())
+        self.assertEqual(first.name_service, 'Маникюр')
+        self.assertIsNone(first.name_master)
+        self.assertIs(first.dct_currant_time, second.dct_currant_time)
+        first.lst_records = [['22.05.25', '13:00', 'Маникюр', 'Крапивина Юлия']]
+        self.assertEqual(first.lst_records, [['22.05.25', '13:00', 'Маникюр', 'Крапивина Юлия']])
+        self.assertIsInstance(first._records[0][0], int)
+
+    # Запись и отмена отражаются в загруженном списке записей клиента
+    def test_apply_record(self):
+        session = SessionState(1)
+        session.date_record, session.time_record, session.name_service, session.name_master = \
+            '22.05.25', '10:00', 'Маникюр', 'Крапивина Юлия'
+        session.apply_record('id: 1', '')
+        self.assertIsNone(session.lst_records)
+        session.lst_records = [['23.05.25', '13:00', 'Маникюр', 'Крапивина Юлия']]
+        session.apply_record('id: 1', '')
+        self.assertIn(['22.05.25', '10:00', 'Маникюр', 'Крапивина Юлия'], session.lst_records)
+        session.apply_record('', 'id: 1')
+        self.assertEqual(session.lst_records, [['23.05.25', '13:00', 'Маникюр', 'Крапивина Юлия']])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+
+from session_backend import SessionStore
+from fake_clock import FakeClock
+
+
+class TestSessionStore(unittest.TestCase):
+
+    def setUp(self):
+        self.timer = FakeClock()
+        self.store = SessionStore(idle_ttl=60, maxsize=3, timer=self.timer)
+
+    # Сессия удаляется после idle_ttl секунд простоя
+    def test_idle_expire(self):
+        self.store[1] = 'a'
+        self.timer.now = 59
+        self.assertEqual(self.store.get(1), 'a')
+        self.timer.now = 118
+        self.assertIn(1, self.store)
+        self.timer.now = 200
+        self.store.expire()
+        self.assertNotIn(1, self.store)
+        self.assertEqual(self.store.metrics()['expired'], 1)
+
+    # Обращение продлевает жизнь сессии, истекают только простаивающие
+    def test_touch_refresh(self):
+        self.store[1] = 'a'
+        self.store[2] = 'b'
+        self.timer.now = 50
+        self.store.get(1)
+        self.timer.now = 100
+        self.store.expire()
+        self.assertIn(1, self.store)
+        self.assertNotIn(2, self.store)
+
+    # При переполнении вытесняется сессия, к которой дольше всего не обращались
+    def test_maxsize(self):
+        for chat_id in range(3):
+            self.store[chat_id] = chat_id
+        self.store.get(0)
+        self.store[3] = 3
+        self.assertEqual(len(self.store), 3)
+        self.assertNotIn(1, self.store)
+        self.assertEqual(self.store[0], 0)
+        self.assertEqual(self.store.metrics()['evicted'], 1)
+
+    def test_missing(self):
+        self.assertIsNone(self.store.get(1))
+        self.assertIsNone(self.store.pop(1))
+        with self.assertRaises(KeyError):
+            self.store[1]
+
+
+if __name__ == '__main__':
+    unittest.main()
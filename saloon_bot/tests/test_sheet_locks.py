@@ -0,0 +1,50 @@
+import unittest
+from threading import Thread, Event
+
+from sheet_locks import SheetLocks
+
+
+class TestSheetLocks(unittest.TestCase):
+
+    def setUp(self):
+        self.locks = SheetLocks()
+
+    # Запускает function в отдельном потоке и сообщает, успела ли она выполниться
+    def run_in_thread(self, function, timeout=0.2) -> bool:
+        done = Event()
+
+        def target():
+            function()
+            done.set()
+
+        Thread(target=target, daemon=True).start()
+        return done.wait(timeout)
+
+    def write(self, title):
+        with self.locks.write(title):
+            pass
+
+    def read(self, title):
+        with self.locks.read(title):
+            pass
+
+    # Чтение и запись разных листов не блокируют друг друга
+    def test_different_sheets_parallel(self):
+        with self.locks.write('22.05.25'):
+            self.assertTrue(self.run_in_thread(lambda: self.write('23.05.25')))
+            self.assertTrue(self.run_in_thread(lambda: self.read('23.05.25')))
+
+    # Несколько чтений одного листа идут параллельно, запись ждёт их окончания
+    def test_same_sheet(self):
+        with self.locks.read('22.05.25'):
+            self.assertTrue(self.run_in_thread(lambda: self.read('22.05.25')))
+            self.assertFalse(self.run_in_thread(lambda: self.write('22.05.25')))
+
+    def test_read_many_blocks_writes(self):
+        with self.locks.read_many(['23.05.25', '22.05.25', '22.05.25']):
+            self.assertFalse(self.run_in_thread(lambda: self.write('23.05.25')))
+            self.assertTrue(self.run_in_thread(lambda: self.write('24.05.25')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+import unittest
+from contextlib import redirect_stdout
+from datetime import datetime
+from io import StringIO
+from types import SimpleNamespace
+
+from schedule_mirror import ScheduleMirror
+from sheet_watcher import ScheduleWatcher, get_drive_version
+
+
+def make_records(value_1000=''):
+    return [{'Услуга': 'Маникюр', 'Мастер': 'Крапивина Юлия', '10:00': value_1000, '13:00': ''}]
+
+
+class FakeDrive:
+    """Таблица с версией, как её видит Drive API"""
+
+    def __init__(self):
+        self.version = '1'
+        self.sheets = {'22.05.25': make_records(), '23.05.25': make_records()}
+        self.reads = 0
+        self.fetched = []
+        self.checksum_requests = []
+        self.no_checksum = set()
+
+    def edit(self, title, records):
+        self.sheets[title] = records
+        self.version = str(int(self.version) + 1)
+
+    # колонка контрольной суммы: формула по данным листа во второй строке (у листа без формулы колонки нет)
+    def checksum(self, title):
+        return '' if title in self.no_checksum else str(hash(str(self.sheets[title])))
+
+    def fetch(self, titles):
+        self.reads += 1
+        self.fetched.append(list(titles))
+        sheets = {}
+        for title in titles:
+            records = [dict(record) for record in self.sheets[title]]
+            if records and title not in self.no_checksum:
+                for record in records:
+                    record['Контроль'] = ''
+                records[0]['Контроль'] = self.checksum(title)
+            sheets[title] = records
+        return sheets
+
+    def checksums(self, titles):
+        self.checksum_requests.append(list(titles))
+        return {title: self.checksum(title) for title in titles}
+
+    # интерфейс gspread.Client.request для get_drive_version
+    def request(self, method, url, params=None):
+        return SimpleNamespace(json=lambda: {'version': self.version})
+
+
+class TestScheduleWatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.drive = FakeDrive()
+        self.mirror = ScheduleMirror('Услуга', 'Мастер')
+        self.changes = []
+        self.watcher = ScheduleWatcher(self.mirror, lambda: get_drive_version(self.drive, 'key'),
+                                       lambda: list(self.drive.sheets), self.drive.fetch,
+                                       on_change=self.changes.append)
+        self.now = datetime(2025, 5, 22, 9, 0)
+
+    # Пока версия не изменилась, листы не читаются
+    def test_no_reads_without_changes(self):
+        self.assertEqual(self.watcher.poll(), ['22.05.25', '23.05.25'])
+        self.assertTrue(self.mirror.loaded)
+        self.assertEqual(self.watcher.poll(), [])
+        self.assertEqual(self.watcher.poll(), [])
+        self.assertEqual(self.drive.reads, 1)
+        self.assertEqual(self.watcher.stats()['polls'], 3)
+
+    # После ручной правки одного листа в зеркале заменяется только он
+    def test_reload_changed_sheet(self):
+        self.watcher.poll()
+        untouched = self.mirror.get_day('23.05.25')
+        self.drive.edit('22.05.25', make_records('id: 1'))
+        self.assertEqual(self.watcher.poll(), ['22.05.25'])
+        self.assertIs(self.mirror.get_day('23.05.25'), untouched)
+        self.assertEqual(self.mirror.free_time('22.05.25', 'Маникюр', None, self.now), ['13:00'])
+        self.assertEqual(self.changes[-1], ['22.05.25'])
+
+    # По контрольным суммам целиком перечитываются только изменившиеся листы и листы без контрольной суммы
+    def test_fetch_only_changed(self):
+        watcher = self.checksum_watcher()
+        self.drive.sheets['Работники'] = []
+        self.drive.no_checksum.add('Работники')
+        watcher.poll()
+        self.drive.edit('22.05.25', make_records('id: 1'))
+        self.assertEqual(watcher.poll(), ['22.05.25'])
+        self.assertEqual(self.drive.fetched[-1], ['22.05.25', 'Работники'])
+        # изменение версии без изменения листов (например, форматирование)
+        self.drive.version = '10'
+        self.assertEqual(watcher.poll(), [])
+        self.assertEqual(self.drive.fetched[-1], ['Работники'])
+        # новый лист читается, удалённый пропадает из зеркала
+        del self.drive.sheets['23.05.25']
+        self.drive.sheets['24.05.25'] = make_records()
+        self.drive.version = '11'
+        self.assertEqual(sorted(watcher.poll()), ['23.05.25', '24.05.25'])
+        self.assertEqual(self.drive.fetched[-1], ['Работники', '24.05.25'])
+        self.assertIsNotNone(self.mirror.get_day('24.05.25'))
+        self.assertIsNone(self.mirror.get_day('23.05.25'))
+        self.assertEqual(watcher.stats()['fetched_sheets'], 8)
+        # контрольные суммы запрашиваются только у листов, где они были при прошлом чтении
+        self.assertEqual(self.drive.checksum_requests, [['22.05.25', '23.05.25'], ['22.05.25', '23.05.25'],
+                                                        ['22.05.25']])
+
+    # Без контрольных сумм они не запрашиваются, о каждом листе предупреждение выводится один раз;
+    # после добавления формулы лист перестаёт перечитываться
+    def test_no_checksums(self):
+        watcher = self.checksum_watcher()
+        self.drive.no_checksum.update(self.drive.sheets)
+        log = StringIO()
+        with redirect_stdout(log):
+            watcher.poll()
+            self.drive.edit('22.05.25', make_records('id: 1'))
+            self.assertEqual(watcher.poll(), ['22.05.25'])
+        self.assertEqual(self.drive.checksum_requests, [])
+        self.assertEqual(self.drive.fetched[-1], ['22.05.25', '23.05.25'])
+        self.assertEqual(log.getvalue().count('[WARNING]'), 2)
+        self.drive.no_checksum.discard('23.05.25')
+        self.drive.edit('22.05.25', make_records('id: 2'))
+        with redirect_stdout(log):
+            watcher.poll()
+            self.drive.edit('22.05.25', make_records('id: 3'))
+            self.assertEqual(watcher.poll(), ['22.05.25'])
+        self.assertEqual(self.drive.fetched[-1], ['22.05.25'])
+        self.assertEqual(self.drive.checksum_requests, [['23.05.25']])
+        self.assertEqual(log.getvalue().count('[WARNING]'), 2)
+
+    def checksum_watcher(self):
+        return ScheduleWatcher(self.mirror, lambda: self.drive.version, lambda: list(self.drive.sheets),
+                               self.drive.fetch, fetch_checksums=self.drive.checksums, checksum_header='Контроль')
+
+    # Удалённый лист пропадает из зеркала
+    def test_removed_sheet(self):
+        self.watcher.poll()
+        del self.drive.sheets['23.05.25']
+        self.drive.version = '2'
+        self.assertEqual(self.watcher.poll(), ['23.05.25'])
+        self.assertIsNone(self.mirror.get_day('23.05.25'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import asyncio
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+from time import sleep
+
+from single_flight import AsyncSingleFlight, SingleFlight
+
+
+class TestSingleFlight(unittest.TestCase):
+
+    def setUp(self):
+        self.flight = SingleFlight()
+        self.release = Event()
+        self.loads = []
+
+    def load(self, key):
+        self.loads.append(key)
+        self.release.wait(5)
+        return [key]
+
+    # Одновременные вызовы с одним ключом получают результат одной загрузки
+    def test_coalesce(self):
+        with ThreadPoolExecutor(10) as executor:
+            futures = [executor.submit(self.flight.do, 'services', self.load, 'services') for _ in range(10)]
+            while self.flight.stats()['calls'] < 10:
+                sleep(0.001)
+            self.release.set()
+            results = [future.result() for future in futures]
+        self.assertEqual(self.loads, ['services'])
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertEqual(self.flight.stats(), {'calls': 10, 'shared': 9, 'in_flight': 0})
+
+    # Разные ключи загружаются независимо, после завершения ключ загружается заново
+    def test_keys(self):
+        self.release.set()
+        self.flight.do('a', self.load, 'a')
+        self.flight.do('b', self.load, 'b')
+        self.flight.do('a', self.load, 'a')
+        self.assertEqual(self.loads, ['a', 'b', 'a'])
+
+    # Исключение загрузки получают все ожидающие
+    def test_error(self):
+        def fail():
+            self.release.wait(5)
+            raise ValueError('quota')
+
+        with ThreadPoolExecutor(3) as executor:
+            futures = [executor.submit(self.flight.do, 'services', fail) for _ in range(3)]
+            while self.flight.stats()['calls'] < 3:
+                sleep(0.001)
+            self.release.set()
+            for future in futures:
+                self.assertRaises(ValueError, future.result)
+        self.assertEqual(self.flight.stats()['in_flight'], 0)
+
+
+class TestAsyncSingleFlight(unittest.IsolatedAsyncioTestCase):
+
+    async def test_coalesce(self):
+        flight = AsyncSingleFlight()
+        loads = []
+
+        async def load():
+            loads.append(1)
+            await asyncio.sleep(0.01)
+            return {'Маникюр': []}
+
+        results = await asyncio.gather(*(flight.do('services', load) for _ in range(5)))
+        self.assertEqual(len(loads), 1)
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertEqual(flight.stats(), {'calls': 5, 'shared': 4, 'in_flight': 0})
+
+    async def test_error(self):
+        flight = AsyncSingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError('quota')
+
+        results = await asyncio.gather(*(flight.do('services', fail) for _ in range(3)), return_exceptions=True)
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import json
+import unittest
+from datetime import date
+
+from telebot_calendar import CallbackCodec, CallbackData, create_calendar, get_calendar_codec, parse_calendar_data
+
+
+def day_buttons(keyboard) -> dict:
+    """Текст кнопки -> callback_data для кнопок-дней"""
+    return {button['text']: button['callback_data']
+            for row in json.loads(keyboard.to_json())['inline_keyboard'][2:-1]
+            for button in row if button['text'].strip()}
+
+
+class TestCalendar(unittest.TestCase):
+
+    # Доступные дни отмечены, остальные - нет
+    def test_marks(self):
+        keyboard = create_calendar([date(2025, 5, 22), date(2025, 6, 1)], 'CAL1', 2025, 5)
+        buttons = day_buttons(keyboard)
+        self.assertEqual(buttons['22✅'], 'CAL1:DAY:2025:5:22')
+        self.assertEqual(buttons['1'], 'CAL1:DAY_EMPTY:2025:5:1')
+        self.assertEqual(len(buttons), 31)
+
+    # На кнопках доступных дат показывается количество свободного времени
+    def test_counts(self):
+        keyboard = create_calendar([date(2025, 5, 22), date(2025, 5, 23)], 'CAL3', 2025, 5,
+                                   counts={date(2025, 5, 22): 4})
+        buttons = day_buttons(keyboard)
+        self.assertEqual(buttons['22✅4'], 'CAL3:DAY:2025:5:22')
+        self.assertIn('23✅', buttons)
+
+    # Одинаковые доступные дни месяца - одна готовая клавиатура
+    def test_cache(self):
+        keyboard = create_calendar(frozenset({date(2025, 5, 22)}), 'CAL2', 2025, 5)
+        same = create_calendar([date(2025, 5, 22), date(2025, 6, 1)], 'CAL2', 2025, 5)
+        other = create_calendar([date(2025, 5, 23)], 'CAL2', 2025, 5)
+        self.assertIs(keyboard, same)
+        self.assertIsNot(keyboard, other)
+        self.assertIs(keyboard.to_json(), same.to_json())
+
+
+class TestCallbackCodec(unittest.TestCase):
+
+    def setUp(self):
+        self.codec = CallbackCodec('CAL', 'action', 'year', 'month', 'day')
+
+    # Кодек совместим с CallbackData
+    def test_compatible(self):
+        data = self.codec.new('DAY', 2025, 5, 22)
+        self.assertEqual(data, CallbackData('CAL', 'action', 'year', 'month', 'day').new('DAY', 2025, 5, 22))
+        parts = self.codec.parse(data)
+        self.assertEqual(parts, ('DAY', '2025', '5', '22'))
+        self.assertEqual(parts.day, '22')
+
+    def test_invalid(self):
+        for values in (('DAY', 2025, 5), ('DAY', 2025, 5, ''), ('DAY', '20:25', 5, 22), ('DAY' * 30, 2025, 5, 22)):
+            with self.assertRaises((TypeError, ValueError)):
+                self.codec.new(*values)
+        for data in ('CAL:DAY:2025:5', 'OTHER:DAY:2025:5:22'):
+            with self.assertRaises(ValueError):
+                self.codec.parse(data)
+
+    # Обработчик календаря разбирает данные кодеком по имени календаря из данных
+    def test_parse_calendar_data(self):
+        data = get_calendar_codec('CALENDAR1').new('DAY', 2025, 5, 22)
+        name, (action, year, month, day) = parse_calendar_data(data)
+        self.assertEqual((name, action, year, month, day), ('CALENDAR1', 'DAY', '2025', '5', '22'))
+        self.assertRaises(ValueError, parse_calendar_data, 'CALENDAR1:DAY:2025:5')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import json
+import unittest
+from threading import Thread, Event
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+from webhook import WebhookServer
+
+# Записанное обновление Telegram (нажатие кнопки главного меню)
+UPDATE = {
+    "update_id": 1001,
+    "callback_query": {
+        "id": "42",
+        "from": {"id": 12345, "is_bot": False, "first_name": "Test", "username": "test"},
+        "message": {"message_id": 7, "date": 1747900000,
+                    "chat": {"id": 12345, "type": "private"}, "text": "Выберите пункт меню:"},
+        "chat_instance": "1",
+        "data": "RECORD",
+    },
+}
+
+
+# Заглушка бота: запоминает полученные обновления
+class FakeBot:
+    def __init__(self):
+        self.updates = []
+        self.received = Event()
+
+    def process_new_updates(self, updates):
+        self.updates.extend(updates)
+        self.received.set()
+
+
+class TestWebhookServer(unittest.TestCase):
+
+    def setUp(self):
+        self.bot = FakeBot()
+        self.server = WebhookServer(self.bot, 'secret', host='127.0.0.1', port=0)
+        Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+
+    def post(self, body: bytes, secret='secret', path='/webhook') -> int:
+        request = Request(f'http://127.0.0.1:{self.server.port}{path}', data=body, method='POST',
+                          headers={'X-Telegram-Bot-Api-Secret-Token': secret})
+        try:
+            with urlopen(request, timeout=5) as response:
+                return response.status
+        except HTTPError as error:
+            return error.code
+
+    # Обновление передаётся обработчикам бота
+    def test_dispatch_update(self):
+        self.assertEqual(self.post(json.dumps(UPDATE).encode()), 200)
+        self.assertTrue(self.bot.received.wait(5))
+        self.assertEqual(self.bot.updates[0].update_id, 1001)
+        self.assertEqual(self.bot.updates[0].callback_query.data, 'RECORD')
+
+    # Запросы без верного секрета и с неверным телом отклоняются
+    def test_reject(self):
+        self.assertEqual(self.post(json.dumps(UPDATE).encode(), secret='wrong'), 403)
+        self.assertEqual(self.post(json.dumps(UPDATE).encode(), path='/other'), 404)
+        self.assertEqual(self.post(b'not json'), 400)
+        self.assertEqual(self.bot.updates, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+"""
+Приём обновлений Telegram через webhook (альтернатива long polling)
+
+Запуск: python webhook.py
+Локальная проверка: curl -X POST -H 'X-Telegram-Bot-Api-Secret-Token: <secret>' \
+    -d @update.json http://127.0.0.1:8443/webhook
+"""
+import hmac
+import json
+import os
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from telebot.types import Update
+from dispatcher import ChatDispatcher, get_chat_id
+
+# Адрес, на котором слушает встроенный HTTP сервер
+WEBHOOK_HOST = os.environ.get('WEBHOOK_HOST', '0.0.0.0')
+WEBHOOK_PORT = int(os.environ.get('WEBHOOK_PORT', 8443))
+# Путь и внешний URL webhook (за reverse proxy с HTTPS)
+WEBHOOK_PATH = '/webhook'
+WEBHOOK_URL = os.environ.get('WEBHOOK_URL', '')
+# Секрет, который Telegram передаёт в заголовке X-Telegram-Bot-Api-Secret-Token
+WEBHOOK_SECRET = os.environ.get('WEBHOOK_SECRET', '')
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+
+class WebhookServer:
+    """HTTP сервер, принимающий обновления и передающий их обработчикам бота через ChatDispatcher"""
+
+    def __init__(self, bot, secret_token: str, host=WEBHOOK_HOST, port=WEBHOOK_PORT, path=WEBHOOK_PATH,
+                 dispatcher: ChatDispatcher | None = None):
+        """
+        :param bot: Объект TeleBot (нужен метод process_new_updates)
+        :param secret_token: Ожидаемое значение заголовка X-Telegram-Bot-Api-Secret-Token
+        :param host: Адрес сервера
+        :param port: Порт сервера (0 - любой свободный)
+        :param path: Путь webhook
+        :param dispatcher: Пул обработки обновлений (по умолчанию - с настройками dispatcher.py)
+        """
+        if not secret_token:
+            raise ValueError('Webhook secret token must be set')
+        self.bot = bot
+        self.secret_token = secret_token
+        self.path = path
+        self.dispatcher = dispatcher if dispatcher is not None else ChatDispatcher()
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+
+    @property
+    def port(self) -> int:
+        """Фактический порт сервера"""
+        return self.httpd.server_address[1]
+
+    def _make_handler(self):
+        """Класс обработчика HTTP запросов, привязанный к серверу"""
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """Обработчик POST запросов от Telegram"""
+
+            def do_POST(self):  # pylint: disable=invalid-name
+                """Принимает одно обновление"""
+                self.send_response(server.handle(self.path, self.headers.get(SECRET_HEADER, ''),
+                                                 self.rfile.read(int(self.headers.get('Content-Length', 0)))))
+                self.end_headers()
+
+            def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+                """Не логируем каждый запрос"""
+
+        return Handler
+
+    def handle(self, path: str, secret_token: str, body: bytes) -> int:
+        """
+        Проверяет запрос и ставит обновление в очередь обработки
+
+        :return: HTTP код ответа
+        """
+        if path != self.path:
+            return 404
+        if not hmac.compare_digest(secret_token.encode(), self.secret_token.encode()):
+            return 403
+        try:
+            update = Update.de_json(json.loads(body))
+        except (ValueError, KeyError, TypeError):
+            return 400
+        if not self.dispatcher.submit(get_chat_id(update), self.process, update, block=False):
+            # очередь переполнена, Telegram повторит доставку позже
+            return 503
+        return 200
+
+    def process(self, update: Update) -> None:
+        """Передаёт обновление обработчикам бота"""
+        self.bot.process_new_updates([update])
+
+    def serve_forever(self) -> None:
+        """Запускает сервер (блокирует поток)"""
+        self.httpd.serve_forever()
+
+    def shutdown(self) -> None:
+        """Останавливает сервер и дожидается обработки принятых обновлений"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.dispatcher.shutdown()
+
+
+if __name__ == '__main__':
+    from main import bot
+    from google_sheet import warm_up
+
+    warm_up()
+
+    # обработчики выполняются в пуле ChatDispatcher, а не во внутреннем пуле TeleBot
+    bot.threaded = False
+    bot.remove_webhook()
+    bot.set_webhook(url=WEBHOOK_URL + WEBHOOK_PATH, secret_token=WEBHOOK_SECRET)
+    WebhookServer(bot, WEBHOOK_SECRET).serve_forever()